@@ -121,7 +121,6 @@ class GeminiClient:
                 
                 # Ensure all required keys exist with defaults
                 defaults = {
-                    "bill_id": "UNKNOWN",
                     "vendor": "Unknown Vendor",
                     "category": "Uncategorized",
                     "date": "2024-01-01",
@@ -153,6 +152,13 @@ class GeminiClient:
                 except:
                     data["subtotal"] = 0.0
 
+                # No printed ID: derive one from the receipt, so the same
+                # photo extracted twice is caught as a duplicate
+                if not data.get("bill_id") or str(data["bill_id"]).strip().upper() in ("UNKNOWN", "NULL", "N/A"):
+                    from ocr.text_parser import fallback_bill_id  # type: ignore
+                    data["bill_id"] = fallback_bill_id(data["vendor"], data["date"], data["amount"],
+                                                       image.tobytes() if hasattr(image, "tobytes") else b"")
+
                 return data
             return None
         except Exception as e:
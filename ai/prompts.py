@@ -3,7 +3,7 @@ RECEIPT_EXTRACTION_PROMPT = """
 You are an expert receipt parser. Your job is to extract structured data from the provided receipt image/text.
 Return ONLY a valid JSON object with the following schema:
 {
-    "bill_id": "string (invoice number or receipt ID, or generated if missing)",
+    "bill_id": "string (invoice number or receipt ID as printed, or null if none is printed)",
     "vendor": "string (store name)",
     "category": "string (e.g., Food, Grocery, Shopping, Transport, Medical, Utility, etc.)",
     "date": "string (YYYY-MM-DD format)",
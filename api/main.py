@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, UploadFile, File
 from typing import List, Optional
 from pydantic import BaseModel
 import sys
@@ -7,14 +7,27 @@ import os
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from database.db import init_db
 from database.queries import fetch_all_receipts, search_receipts, get_receipt_by_id
+from database.jobs import new_batch_id, enqueue_job, get_batch_progress, list_batch_jobs
+from contextlib import asynccontextmanager
 from datetime import datetime
 import uvicorn
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Make sure the job queue table exists even when the API runs on its own
+    # (at startup, not import, so importing this module touches no database)
+    init_db()
+    yield
+
+
 app = FastAPI(
     title="Receipt Vault Analyzer API",
     description="REST API for ERP integration and external data access",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- Schemas ---
@@ -127,5 +140,29 @@ async def process_image(file_url: str):
     # Logic to fetch and process image using existing parse_receipt
     return {"status": "WIP", "message": "File upload endpoint designed. Ready for multipart implementation."}
 
+# --- Background OCR jobs ---
+# Processed by `python -m services.ocr_worker` (or the Streamlit app's worker pool)
+
+@app.post("/api/v1/jobs")
+async def create_ocr_jobs(files: List[UploadFile] = File(...), user_email: Optional[str] = None):
+    """Queue receipt files for background OCR; poll the returned status URL for progress."""
+    batch_id = new_batch_id()
+    job_ids = [enqueue_job(batch_id, f.filename or "upload", await f.read(), user_email) for f in files]
+    return {"batch_id": batch_id, "job_ids": job_ids, "status_url": f"/api/v1/jobs/{batch_id}"}
+
+@app.get("/api/v1/jobs/{batch_id}")
+def get_ocr_jobs(batch_id: str):
+    """Progress counters and per-file results of a queued batch."""
+    progress = get_batch_progress(batch_id)
+    if not progress["total"]:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return {**progress, "jobs": list_batch_jobs(batch_id)}
+
+@app.get("/api/v1/ocr/engine-stats")
+def get_ocr_engine_stats():
+    """Learned OCR cascade statistics and the current step order per template / quality bucket."""
+    from ocr.engine_registry import get_registry
+    return get_registry().snapshot()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
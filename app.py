@@ -25,6 +25,15 @@ if "init_done" not in st.session_state:
     init_db()
     st.session_state["init_done"] = True
 
+@st.cache_resource
+def _warm_up_ocr():
+    # Once per server process: PaddleOCR loads in the background, not on the first upload
+    from ocr.paddle_engine import warm_up_paddle  # type: ignore
+    warm_up_paddle(wait=False)
+    return True
+
+_warm_up_ocr()
+
 if "page"          not in st.session_state: st.session_state["page"]          = "landing"
 if "authenticated" not in st.session_state: st.session_state["authenticated"] = False
 if "language"      not in st.session_state: st.session_state["language"]      = "en"
@@ -0,0 +1,114 @@
+import multiprocessing as mp
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+_SAMPLE_LINES = [
+    "DMART AVENUE SUPERMARTS",
+    "TAX INVOICE",
+    "Bill No: 4821-775",
+    "Date: 14/03/2024",
+    "2 Milk 1L 120.00",
+    "Bread Brown 45.00",
+    "Basmati Rice 5kg 610.00",
+    "Sunflower Oil 1L 155.00",
+    "Sub Total 930.00",
+    "CGST 2.5% 23.25",
+    "SGST 2.5% 23.25",
+    "Grand Total 976.50",
+    "Thank you, visit again",
+]
+
+
+# ================= SYNTHETIC IMAGES =================
+def render_photo(width: int = 4000, height: int = 3000, angle: float = 0.0,
+                 lines: List[str] = _SAMPLE_LINES) -> np.ndarray:
+    """
+    Renders a phone-photo-like grayscale image: a white receipt with text on a
+    darker textured background, optionally rotated by `angle` degrees.
+    """
+    rng = np.random.default_rng(7)
+    photo = rng.normal(90, 12, (height, width)).clip(0, 255).astype(np.uint8)
+
+    rw, rh = int(width * 0.35), int(height * 0.85)
+    receipt = np.full((rh, rw), 245, np.uint8)
+    scale = rw / 900
+    y = int(90 * scale)
+    for line in lines:
+        cv2.putText(receipt, line, (int(40 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.3 * scale, 20, max(1, int(2 * scale)), cv2.LINE_AA)
+        y += int(70 * scale)
+
+    x0, y0 = (width - rw) // 2, (height - rh) // 2
+    photo[y0:y0 + rh, x0:x0 + rw] = receipt
+
+    if angle:
+        M = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        photo = cv2.warpAffine(photo, M, (width, height), borderMode=cv2.BORDER_REPLICATE)
+    return photo
+
+
+# ================= MEASUREMENT =================
+def timed(fn: Callable, *args, repeat: int = 3) -> Tuple[float, Any]:
+    """Returns (best wall time in ms, last result)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, result
+
+
+def _reset_peak_rss() -> None:
+    # Linux lets a process reset its own high-water mark; elsewhere the
+    # imports done before fn() runs stay inside the baseline
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _child(fn: Callable, args: tuple, queue) -> None:
+    _reset_peak_rss()
+    base = _peak_rss_mb()
+    fn(*args)
+    queue.put((base, _peak_rss_mb()))
+
+
+def peak_rss_delta_mb(fn: Callable, *args) -> float:
+    """Runs fn in a fresh process and returns how far it raised peak RSS (MB)."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(fn, args, queue))
+    proc.start()
+    base, peak = queue.get()
+    proc.join()
+    return peak - base
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    """Prints a list of dicts as an aligned text table."""
+    if not rows:
+        return
+    cols = list(rows[0].keys())
+    widths = {c: max(len(c), *(len(f"{r[c]}") for r in rows)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(f"{r[c]}".ljust(widths[c]) for c in cols))
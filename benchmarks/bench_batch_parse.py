@@ -0,0 +1,103 @@
+"""
+Batch parsing throughput: a plain parse_receipt loop vs. parse_receipts_batch
+(ocr/batch_parse.py) by worker count, plus the re-parse backfill
+(services/reparse.py) end to end on a scratch database.
+
+    python -m benchmarks.bench_batch_parse [--count 5000] [--workers 1 2 4 8]
+
+Uses the parser benchmark's noisy corpus. Pool outputs must match the loop
+exactly; exits 1 otherwise. Worker counts above
+the machine's cores are still run, so the table shows where scaling stops.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks._common import print_table
+from benchmarks.bench_text_parser import build_corpus
+from database.db import get_db, init_db
+from ocr.batch_parse import parse_receipts_batch
+from ocr.ocr_result import OcrResult, OcrToken
+from ocr.text_parser import parse_receipt
+from services.reparse import reparse
+
+
+def _comparable(outcome) -> Any:
+    return outcome[:2]
+
+
+def _stored_read(text: str) -> str:
+    tokens = [OcrToken(word, 0.9, line=i) for i, line in enumerate(text.splitlines()) for word in line.split()]
+    return OcrResult.from_tokens("tesseract", tokens).to_json()
+
+
+def _backfill(texts: List[str], workers: int) -> Dict[str, Any]:
+    db = get_db()
+    with db:
+        db.execute("DELETE FROM receipts")
+        db.executemany(
+            "INSERT INTO receipts (bill_id, vendor, date, amount, tax, subtotal, category, ocr_source) "
+            "VALUES (?, 'Unknown Vendor', '2024-01-01', 0, 0, 0, 'Uncategorized', ?)",
+            [(f"R{i}", _stored_read(t)) for i, t in enumerate(texts)],
+        )
+    return reparse(workers=workers, progress=False)
+
+
+def _run(args) -> bool:
+    texts = build_corpus(args.count, args.seed)
+    print(f"corpus: {len(texts)} receipts, {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    baseline = [parse_receipt(t) for t in texts]
+    loop_s = time.perf_counter() - start
+    rows = [{"run": "parse_receipt loop", "workers": 1, "receipts_per_s": f"{len(texts) / loop_s:.0f}",
+             "speed-up": "1.00x", "matches": "-"}]
+    expected = [_comparable(o) for o in baseline]
+
+    mismatched = False
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        outcomes = parse_receipts_batch(texts, workers=workers)
+        wall = time.perf_counter() - start
+        same = sum(_comparable(o) == e for o, e in zip(outcomes, expected))
+        mismatched |= same != len(texts)
+        rows.append({"run": "parse_receipts_batch", "workers": workers,
+                     "receipts_per_s": f"{len(texts) / wall:.0f}", "speed-up": f"{loop_s / wall:.2f}x",
+                     "matches": f"{same}/{len(texts)}"})
+
+    for workers in sorted(set(args.workers)):
+        report = _backfill(texts, workers)
+        rows.append({"run": "reparse (report only)", "workers": workers,
+                     "receipts_per_s": f"{report['receipts_per_s']:.0f}",
+                     "speed-up": f"{report['receipts_per_s'] * loop_s / len(texts):.2f}x",
+                     "matches": f"{report['changed']} would change"})
+    print_table(rows)
+    return mismatched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batch parsing throughput by worker count.")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # A scratch database (database.db opens receipts.db in the working
+    # directory), so no process picks up locally learned vendor categories
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            init_db()
+            mismatched = _run(args)
+        finally:
+            os.chdir(cwd)
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
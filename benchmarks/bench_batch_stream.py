@@ -0,0 +1,121 @@
+"""
+Batch upload memory benchmark: the previous prefetching loop vs. the
+bounded streaming pipeline (services/batch_stream.py).
+
+    python -m benchmarks.bench_batch_stream [--sizes 10 50 100] [--width 4000]
+
+Every run gets a fresh process and a batch of phone-photo sized JPEGs
+(generated before measuring, since Streamlit holds the uploads either way)
+and reports how far the batch raised peak RSS. The previous loop is
+emulated as it behaved under Streamlit: a window of decoded photos in
+flight, and two full-size previews per file (original + greyscale) that
+st.image keeps for the rest of the run. The pipeline keeps thumbnails only.
+Uses whichever OCR engines are installed; with none, OCR finds no text
+and the numbers cover decode, crop and quality gate alone.
+"""
+import argparse
+import io
+import multiprocessing as mp
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+from benchmarks._common import _peak_rss_mb, _reset_peak_rss, print_table, render_photo
+
+
+def _jpeg(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _sources(count: int, width: int) -> List[Tuple[str, bytes]]:
+    height = width * 3 // 4
+    return [(f"photo_{i:04d}.jpg", _jpeg(Image.fromarray(render_photo(width, height, angle=(i % 7) - 3.0))))
+            for i in range(count)]
+
+
+def _previous_loop(files: List[Tuple[str, bytes]], workers: int) -> int:
+    from ocr.pipeline import extract_receipt_ocr, load_receipt_image
+
+    previews: List[bytes] = []
+    results = []
+    pending: deque = deque()
+    files_iter = iter(files)
+    with ThreadPoolExecutor(workers) as pool:
+        while True:
+            while len(pending) < workers * 2:
+                nxt = next(files_iter, None)
+                if nxt is None:
+                    break
+                img = load_receipt_image(nxt[1], nxt[0])
+                pending.append((img, pool.submit(extract_receipt_ocr, img)))
+            if not pending:
+                break
+            img, future = pending.popleft()
+            previews += [_jpeg(img), _jpeg(img.convert("L"))]
+            results.append(future.result()[:3])
+    return sum(len(p) for p in previews)
+
+
+def _streaming(files: List[Tuple[str, bytes]], workers: int) -> int:
+    from services.batch_stream import make_extract_stage, stream_batch
+
+    items = list(stream_batch(files, make_extract_stage(None), workers=workers))
+    return sum(len(item.thumbnail or b"") for item in items)
+
+
+def _run(mode: str, count: int, width: int, queue) -> None:
+    from config.config import OCR_WORKERS
+    from ocr.paddle_engine import warm_up_paddle
+    import services.batch_stream  # noqa: F401  (imports stay out of the measurement)
+    from ocr.engine_registry import get_registry
+
+    # Synthetic photos must not train the production cascade statistics (ocr_engine_stats)
+    get_registry().persist = False
+
+    files = _sources(count, width)
+    warm_up_paddle()
+
+    _reset_peak_rss()
+    base = _peak_rss_mb()
+    start = time.perf_counter()
+    retained = (_previous_loop if mode == "previous" else _streaming)(files, OCR_WORKERS)
+    wall = time.perf_counter() - start
+    queue.put({
+        "peak_rss_mb": f"{_peak_rss_mb() - base:.0f}",
+        "previews_mb": f"{retained / 2**20:.1f}",
+        "uploads_mb": f"{sum(len(b) for _, b in files) / 2**20:.0f}",
+        "wall_s": f"{wall:.1f}",
+        "ms_per_file": f"{wall * 1000 / count:.0f}",
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Peak RSS of batch uploads by batch size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--width", type=int, default=4000, help="photo width in px (4:3)")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    rows: List[Dict[str, Any]] = []
+    for count in args.sizes:
+        for mode in ("previous", "streaming"):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(mode, count, args.width, queue))
+            proc.start()
+            proc.join()
+            result = queue.get() if proc.exitcode == 0 else {"peak_rss_mb": f"failed (exit {proc.exitcode})"}
+            rows.append({"files": count, "pipeline": mode, **result})
+
+    for row in rows:
+        for col in ("previews_mb", "uploads_mb", "wall_s", "ms_per_file"):
+            row.setdefault(col, "-")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
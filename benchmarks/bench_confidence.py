@@ -0,0 +1,87 @@
+"""
+Parse confidence benchmark: does the per-field confidence of
+ocr/text_parser.py predict which fields are right, and how many receipts
+would still need an escalation (PaddleOCR, Gemini) at each threshold?
+
+    python -m benchmarks.bench_confidence [--count 6000] [--seed 3] [--thresholds 0.3 0.5 0.8]
+
+Receipts are synthetic (benchmarks/synthetic_receipts.py) with OCR noise
+at 0, 5, 15 or 30% of characters. The first table is field accuracy per
+(field, source) next to the confidence the source is given; the second is
+per threshold: receipts escalated, escalations avoided, and how many
+receipts have every key field right among the kept and the escalated.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from benchmarks._common import print_table
+from benchmarks.bench_text_parser import _noisy
+from benchmarks.synthetic_receipts import LAYOUTS, GroundTruth, generate_lines
+from ocr.categories import get_category_cache
+from ocr.text_parser import KEY_FIELDS, SOURCE_CONFIDENCE, parse_confidence, parse_receipt
+from ocr.vendors import get_vendor_canonicalizer
+
+_FIELDS = KEY_FIELDS + ("tax", "subtotal")
+_NOISE = (0.0, 0.05, 0.15, 0.3)
+
+
+def _correct(field: str, got: Any, truth: GroundTruth) -> bool:
+    want = getattr(truth, field)
+    if isinstance(want, float):
+        return isinstance(got, (int, float)) and abs(got - want) < 0.011
+    if field == "vendor":
+        got, want = str(got).lower(), str(want).lower()
+        return want in got or got in want
+    return str(got) == str(want)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-field parse confidence vs. field accuracy.")
+    parser.add_argument("--count", type=int, default=6000)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.5, 0.8])
+    args = parser.parse_args()
+
+    # Parsing must not write learned categories or vendors into receipts.db
+    get_category_cache().persist = False
+    get_vendor_canonicalizer().persist = False
+
+    rng = random.Random(args.seed)
+    layouts = list(LAYOUTS)
+    by_source: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+    receipts: List[Tuple[float, bool]] = []
+    start = time.perf_counter()
+    for i in range(args.count):
+        truth = generate_lines(rng, layouts[i % len(layouts)])[1]
+        text = _noisy(truth.text, rng, rng.choice(_NOISE))
+        provenance = {}
+        data, _items = parse_receipt(text, provenance=provenance)
+        for field in _FIELDS:
+            counts = by_source[(field, provenance[field].source)]
+            counts[0] += _correct(field, data[field], truth)
+            counts[1] += 1
+        receipts.append((parse_confidence(provenance), all(_correct(f, data[f], truth) for f in KEY_FIELDS)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.count:,} receipts, {len(layouts)} layouts, {elapsed / args.count * 1e3:.2f} ms per parse")
+    print_table([{"field": field, "source": source, "confidence": SOURCE_CONFIDENCE[source],
+                  "receipts": n, "correct": f"{ok / n:.0%}"}
+                 for (field, source), (ok, n) in sorted(by_source.items())])
+    print()
+    rows = []
+    for threshold in args.thresholds:
+        escalated = [right for conf, right in receipts if conf < threshold]
+        kept = [right for conf, right in receipts if conf >= threshold]
+        rows.append({"threshold": threshold,
+                     "escalated": f"{len(escalated)} ({len(escalated) / len(receipts):.0%})",
+                     "avoided": f"{len(kept) / len(receipts):.0%}",
+                     "kept_all_right": f"{sum(kept) / len(kept):.0%}" if kept else "-",
+                     "escalated_all_right": f"{sum(escalated) / len(escalated):.0%}" if escalated else "-"})
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Date extraction benchmark: the engine in ocr/dates.py vs. the three date
+paths it replaced (the parser's regex + strptime _extract_date, its
+template MM/DD swapping and utils/helpers.clean_date's strptime loop).
+
+    python -m benchmarks.bench_dates [--count 1000000] [--seed 1]
+
+Every string is one date from a two-year range in one of the layouts
+below, as a receipt line ("Date: 14/03/2024"); clean_date gets the bare
+token, as its callers pass it. US layouts go through the template path
+(month first). Reports µs per string and how many came out as the right
+ISO date, per layout and overall; "engine, no memo" normalizes every
+match afresh. The lines in _NOT_DATES (prices and codes next to month
+words) must give no date; the run exits 1 if the engine finds one.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks._common import print_table
+from benchmarks._reference_parser import _extract_date as _old_extract_date
+from ocr import dates
+from ocr.dates import find_date
+
+# layout -> (format, read month first)
+_LAYOUTS: Dict[str, Tuple[str, bool]] = {
+    "2024-03-14": ("%Y-%m-%d", False),
+    "14/03/2024": ("%d/%m/%Y", False),
+    "14-03-2024": ("%d-%m-%Y", False),
+    "14.03.2024": ("%d.%m.%Y", False),
+    "14/03/24": ("%d/%m/%y", False),
+    "03/14/2024 (US)": ("%m/%d/%Y", True),
+    "03/14/24 (US)": ("%m/%d/%y", True),
+    "14 Mar 2024": ("%d %b %Y", False),
+    "14-Mar-24": ("%d-%b-%y", False),
+    "March 14, 2024": ("%B %d, %Y", False),
+}
+
+# Receipt lines the engine must not read a date from
+_NOT_DATES = [
+    "Mayo 1 20.00", "Mayo 20.00", "Dec 20.00", "Sept 10.99", "Order 417-77235-2024",
+]
+
+
+def _old_template_date(raw: str, text: str) -> str:
+    """The template-date normalization parse_receipt ran before ocr/dates.py."""
+    try:
+        if re.match(r"\d{4}-\d{2}-\d{2}", raw):
+            return raw
+        if "/" in raw:
+            parts = raw.split("/")
+            if len(parts) == 3:
+                if len(parts[2]) == 2: parts[2] = "20" + parts[2]
+                mm, dd, yyyy = parts[0], parts[1], parts[2]
+                if int(mm) > 12:
+                    mm, dd = dd, mm
+                return f"{yyyy}-{mm}-{dd}"
+        return raw
+    except Exception:
+        return _old_extract_date(text)
+
+
+def _old_clean_date(text: str) -> Optional[date]:
+    """utils/helpers.clean_date before ocr/dates.py."""
+    if not text:
+        return None
+    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y"):
+        try:
+            return datetime.strptime(text.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _old_parser(token: str, line: str, us: bool) -> str:
+    return _old_template_date(token, line) if us else _old_extract_date(line)
+
+
+def _engine(token: str, line: str, us: bool) -> Optional[str]:
+    return find_date(line, day_first=not us)
+
+
+def _engine_no_memo(token: str, line: str, us: bool) -> Optional[str]:
+    for m in dates._DATE.finditer(line.lower()):
+        iso = dates._normalize(m, not us)
+        if iso:
+            return iso
+    return None
+
+
+def _clean_date(token: str, line: str, us: bool) -> Optional[str]:
+    parsed = _old_clean_date(token)
+    return parsed.isoformat() if parsed else None
+
+
+_CANDIDATES: Dict[str, Callable[[str, str, bool], Optional[str]]] = {
+    "old parser": _old_parser,
+    "old clean_date": _clean_date,
+    "engine": _engine,
+    "engine, no memo": _engine_no_memo,
+}
+
+
+def build_strings(count: int, seed: int) -> List[Tuple[str, str, str, bool, str]]:
+    """(layout, token, line, US, expected ISO date) per string."""
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    names = list(_LAYOUTS)
+    strings = []
+    for _ in range(count):
+        d = start + timedelta(days=rng.randrange(730))
+        layout = rng.choice(names)
+        fmt, us = _LAYOUTS[layout]
+        token = d.strftime(fmt)
+        strings.append((layout, token, f"Date: {token}", us, d.isoformat()))
+    return strings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Date extraction: ocr/dates.py vs. the functions it replaced.")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    strings = build_strings(args.count, args.seed)
+    per_layout: Dict[str, Dict[str, List[int]]] = {name: {} for name in _LAYOUTS}
+    totals = []
+    for label, fn in _CANDIDATES.items():
+        dates._memo.clear()
+        outputs = []
+        start = time.perf_counter()
+        for _layout, token, line, us, _expected in strings:
+            outputs.append(fn(token, line, us))
+        elapsed = time.perf_counter() - start
+        right = 0
+        for (layout, *_rest, expected), out in zip(strings, outputs):
+            ok = out == expected
+            right += ok
+            counts = per_layout[layout].setdefault(label, [0, 0])
+            counts[0] += ok
+            counts[1] += 1
+        totals.append({"function": label, "us_per_string": f"{elapsed / len(strings) * 1e6:.2f}",
+                       "strings_per_s": f"{len(strings) / elapsed:,.0f}",
+                       "correct": f"{right / len(strings):.1%}"})
+
+    print(f"{len(strings):,} date strings, {len(_LAYOUTS)} layouts")
+    print_table([{"layout": name, **{label: f"{ok / n:.0%}" for label, (ok, n) in results.items()}}
+                 for name, results in per_layout.items()])
+    print()
+    print_table(totals)
+    print()
+    negatives = [{"line": line, "engine": find_date(line) or "-", "ok": "yes" if find_date(line) is None else "NO"}
+                 for line in _NOT_DATES]
+    print_table(negatives)
+    sys.exit(1 if any(n["ok"] != "yes" for n in negatives) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Deskew benchmark: legacy full-image minAreaRect vs. projection-profile
+estimation on a downsampled copy.
+
+    python -m benchmarks.bench_deskew
+
+Reports latency, peak RSS and angle error on rotated synthetic receipts.
+"""
+import os
+import tempfile
+from typing import List
+
+import cv2
+import numpy as np
+
+from benchmarks._common import peak_rss_delta_mb, print_table, render_photo, timed
+from ocr.image_preprocessing import deskew, estimate_skew_angle
+
+_ANGLES = [-12.0, -6.5, -2.0, -0.5, 0.0, 1.0, 3.5, 8.0]
+
+
+def _legacy_angle(img: np.ndarray) -> float:
+    # Verbatim angle logic of the former "advanced" preprocessing mode
+    coords = np.column_stack(np.where(img > 0))
+    angle = cv2.minAreaRect(coords)[-1]
+    return -(90 + angle) if angle < -45 else -angle
+
+
+def _legacy_deskew(img: np.ndarray) -> np.ndarray:
+    angle = _legacy_angle(img)
+    (h, w) = img.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(img, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+def _photo(angle: float) -> np.ndarray:
+    return render_photo(3024, 4032, angle=angle)
+
+
+def _load(path: str) -> np.ndarray:
+    return np.load(path)
+
+
+def _run_legacy(path: str) -> None:
+    _legacy_deskew(np.load(path))
+
+
+def _run_new(path: str) -> None:
+    deskew(np.load(path))
+
+
+def main(argv: List[str]) -> None:
+    rows = []
+    for angle in _ANGLES:
+        img = _photo(angle)
+        legacy_ms, _ = timed(_legacy_deskew, img, repeat=1)
+        new_ms, _ = timed(deskew, img)
+        # A perfect correction angle is the negated rotation that was applied
+        rows.append({
+            "rotation": f"{angle:+.1f}",
+            "legacy_err": f"{abs(_legacy_angle(img) + angle):.2f}",
+            "new_err": f"{abs(estimate_skew_angle(img) + angle):.2f}",
+            "legacy_ms": f"{legacy_ms:.0f}",
+            "new_ms": f"{new_ms:.0f}",
+        })
+    print_table(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.npy")
+        np.save(path, _photo(3.5))
+        load_mb = peak_rss_delta_mb(_load, path)
+        print(f"\nPeak RSS above loading a 12 MP photo ({load_mb:.0f} MB):")
+        print(f"  legacy: {peak_rss_delta_mb(_run_legacy, path) - load_mb:.0f} MB")
+        print(f"  new:    {peak_rss_delta_mb(_run_new, path) - load_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    import sys
+    main(sys.argv[1:])
@@ -0,0 +1,368 @@
+"""
+Golden-corpus regression suite for the text parser: accuracy, latency and
+worst-case inputs.
+
+    python -m benchmarks.bench_golden [--fuzz 2000] [--max-ms 50] [--update-baseline]
+    python -m benchmarks.bench_golden --write-corpus    # regenerate the synthetic part
+
+benchmarks/golden/corpus.json is versioned OCR text with the fields a
+correct parse returns: hand-written receipts (split GST, service charge,
+multi-line tax, OCR-damaged labels, rupee signs, ...) and receipts from the
+synthetic layouts, each with the template it should match, plus raw
+amount strings for _clean_amount. Reports:
+
+  * per-field accuracy of parse_receipt (amounts to the cent, items as an
+    exact list), template and _clean_amount accuracy
+  * per-receipt latency percentiles (best of --repeat runs) and receipts/s
+  * a fuzzer: runs of regex-sensitive characters and tokens, exploding
+    line counts and heavily damaged corpus receipts; any parse over
+    --max-ms (best of three) is flagged, and one that runs away is cut off
+
+Exits 1 if a field's accuracy falls below benchmarks/golden/baseline.json,
+p99 latency exceeds the baseline's by more than --latency-factor (latency
+is machine-dependent; the baseline records the machine that wrote it) or
+the fuzzer flags an input (too slow, or parse_receipt raised).
+--update-baseline records the current run.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks._common import print_table
+from benchmarks.bench_text_parser import _noisy
+from benchmarks.synthetic_receipts import _ITEMS, LAYOUTS, generate_lines
+from ocr.categories import get_category_cache
+from ocr.templates import get_matching_template
+from ocr.text_parser import _clean_amount, parse_receipt
+from ocr.vendors import get_vendor_canonicalizer
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+CORPUS = GOLDEN_DIR / "corpus.json"
+BASELINE = GOLDEN_DIR / "baseline.json"
+
+_AMOUNT_FIELDS = ("amount", "tax", "subtotal")
+_FIELDS = ("vendor", "bill_id", "date", *_AMOUNT_FIELDS, "category", "items")
+# A fallback bill ID is a hash of the receipt; the corpus accepts any as this
+_ANY_FALLBACK_ID = "BILL-*"
+
+
+# ================= CORPUS =================
+def load_corpus(path: Path = CORPUS) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _synthetic_entries(seed: int, per_layout: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    entries = []
+    for layout in LAYOUTS:
+        for i in range(per_layout):
+            _, truth = generate_lines(rng, layout)
+            entries.append({
+                "id": f"{layout.lower().replace(' ', '-')}-{i:02d}",
+                "source": f"synthetic:{layout}",
+                "template": layout if layout != "Generic GST" else None,
+                "text": truth.text,
+                "expected": {
+                    "vendor": truth.vendor, "bill_id": truth.bill_id, "date": truth.date,
+                    "amount": truth.amount, "tax": truth.tax, "subtotal": truth.subtotal,
+                    "items": [[it["Item"], it["Price"]] for it in truth.items],
+                },
+            })
+    for n in (50, 150, 400):
+        entries.append(_long_entry(rng, n))
+    return entries
+
+
+def _long_entry(rng: random.Random, n_items: int) -> Dict[str, Any]:
+    """A grocery receipt with `n_items` item lines and split GST on separate lines."""
+    bill_id = f"{rng.randint(1000, 9999)}-{rng.randint(10, 99)}"
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    lines = ["FRESH MART SUPERSTORE", "TAX INVOICE", f"Bill No: {bill_id}", f"Date: {day:02d}/{month:02d}/2024"]
+    items = []
+    for _ in range(n_items):
+        name, price = rng.choice(_ITEMS), round(rng.uniform(1, 60), 2)
+        items.append([name, price])
+        lines.append(f"{rng.randint(1, 4)} {name} {price:.2f}" if rng.random() < 0.5 else f"{name} {price:.2f}")
+    subtotal = round(sum(p for _, p in items), 2)
+    half = round(subtotal * 0.025, 2)
+    lines += [f"Sub Total {subtotal:.2f}", "CGST 2.5%", f"{half:.2f}", "SGST 2.5%", f"{half:.2f}",
+              f"Grand Total {subtotal + 2 * half:.2f}"]
+    return {
+        "id": f"long-{n_items}", "source": "synthetic:long", "template": None, "text": "\n".join(lines),
+        "expected": {"vendor": "FRESH MART SUPERSTORE", "bill_id": bill_id, "date": f"2024-{month:02d}-{day:02d}",
+                     "amount": round(subtotal + 2 * half, 2), "tax": round(2 * half, 2), "subtotal": subtotal,
+                     "category": "Grocery", "items": items},
+    }
+
+
+def write_corpus(seed: int, per_layout: int, path: Path = CORPUS) -> Dict[str, Any]:
+    """Regenerates the synthetic receipts, keeping the hand-written ones; bumps the version on change."""
+    corpus = load_corpus(path) if path.exists() else {"version": 0, "receipts": [], "amounts": []}
+    hand = [r for r in corpus["receipts"] if r["source"] == "hand"]
+    receipts = hand + _synthetic_entries(seed, per_layout)
+    if receipts != corpus["receipts"]:
+        corpus["version"] += 1
+        corpus["receipts"] = receipts
+    corpus["seed"] = seed
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(corpus, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+    return corpus
+
+
+# ================= ACCURACY =================
+def _field_ok(field: str, expected: Any, got: Any) -> bool:
+    if field in _AMOUNT_FIELDS:
+        return abs(float(got or 0.0) - expected) < 0.005
+    if field == "items":
+        return [[i["Item"], round(i["Price"], 2)] for i in got] == expected
+    if expected == _ANY_FALLBACK_ID:
+        return str(got).startswith("BILL-")
+    if field == "vendor":
+        return str(got).strip().lower() == expected.lower()
+    return got == expected
+
+
+def _parse(text: str) -> Tuple[Dict[str, Any], List[dict]]:
+    return parse_receipt(text)
+
+
+def score(corpus: Dict[str, Any]) -> Tuple[Dict[str, float], List[Tuple[str, str, Any, Any]]]:
+    """Accuracy per field (of the receipts that expect it), plus the misses."""
+    hits, totals = Counter(), Counter()
+    misses = []
+    for r in corpus["receipts"]:
+        data, items = _parse(r["text"])
+        got = {**data, "items": items}
+        for field in _FIELDS:
+            expected = r["expected"].get(field)
+            if expected is None:
+                continue
+            totals[field] += 1
+            if _field_ok(field, expected, got.get(field)):
+                hits[field] += 1
+            else:
+                misses.append((r["id"], field, expected, got.get(field)))
+        if "template" in r:
+            totals["template"] += 1
+            template = get_matching_template(r["text"])
+            if (template.name if template else None) == r["template"]:
+                hits["template"] += 1
+            else:
+                misses.append((r["id"], "template", r["template"], template.name if template else None))
+    for raw, expected in corpus.get("amounts", []):
+        totals["_clean_amount"] += 1
+        got = _clean_amount(raw)
+        if abs(got - expected) < 0.005:
+            hits["_clean_amount"] += 1
+        else:
+            misses.append((repr(raw), "_clean_amount", expected, got))
+    return {f: hits[f] / totals[f] for f in totals}, misses
+
+
+# ================= LATENCY =================
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def latency(texts: List[str], repeat: int) -> Dict[str, float]:
+    """Per-receipt parse latency percentiles in ms (best of `repeat` runs each)."""
+    per_receipt = []
+    for text in texts:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _parse(text)
+            best = min(best, time.perf_counter() - start)
+        per_receipt.append(best * 1000)
+    per_receipt.sort()
+    return {"p50": _percentile(per_receipt, 0.50), "p90": _percentile(per_receipt, 0.90),
+            "p99": _percentile(per_receipt, 0.99), "max": per_receipt[-1],
+            "receipts_per_s": len(texts) / (sum(per_receipt) / 1000)}
+
+
+# ================= FUZZER =================
+# Characters and tokens the parser's patterns treat specially
+_RUN_CHARS = " \t0123456789.,#/-:₹x*|aO"
+_RUN_TOKENS = ["1 ", "1.", "1,", "12/", "1-", "total ", "sub ", "gst ", "tax ", "bill no ", "# ", "₹ ",
+               "a ", " x", "12.00 ", "cgst 9% ", "inv ", "t0tal "]
+_PREFIXES = ["", "total ", "Item ", "2 ", "bill no ", "# ", "Sub Total ", "GST 18% "]
+_SUFFIXES = ["", " 12.00", "x", " 5", ".00", " ₹ 45.00", "\n12.00"]
+
+
+def fuzz_inputs(texts: List[str], seed: int, count: int, max_len: int) -> Iterator[Tuple[str, str]]:
+    """(description, text) pairs of adversarial inputs."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        n = min(max_len, int(rng.expovariate(1 / (max_len / 4))) + 1)
+        kind = rng.randrange(4)
+        if kind == 0:
+            c, pre, suf = rng.choice(_RUN_CHARS), rng.choice(_PREFIXES), rng.choice(_SUFFIXES)
+            yield f"{pre!r} + {c!r}*{n} + {suf!r}", pre + c * n + suf
+        elif kind == 1:
+            tok = rng.choice(_RUN_TOKENS)
+            k = max(1, n // len(tok))
+            yield f"{tok!r}*{k}", tok * k
+        elif kind == 2:
+            line = rng.choice(rng.choice(texts).splitlines() or ["TOTAL 1.00"])
+            k = max(1, n // (len(line) + 1))
+            yield f"{line!r} x {k} lines", "\n".join([line] * k)
+        else:
+            i = rng.randrange(len(texts))
+            text = _noisy(texts[i], rng, rng.uniform(0.3, 0.7))
+            c = rng.choice(_RUN_CHARS)
+            at = rng.randint(0, len(text))
+            yield f"corpus[{i}] damaged + {c!r}*{n}", text[:at] + c * n + text[at:]
+
+
+class _Runaway(Exception):
+    pass
+
+
+@contextmanager
+def _time_limit(seconds: float):
+    """Aborts the body after `seconds` (regex matching checks for signals); no-op without setitimer."""
+    if not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def _raise(*_):
+        raise _Runaway()
+
+    previous = signal.signal(signal.SIGALRM, _raise)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _timed_parse(text: str, limit_s: float) -> float:
+    """Parse time in ms; inf if it ran past `limit_s`."""
+    start = time.perf_counter()
+    try:
+        with _time_limit(limit_s):
+            _parse(text)
+    except _Runaway:
+        return float("inf")
+    return (time.perf_counter() - start) * 1000
+
+
+def fuzz(texts: List[str], seed: int, count: int, max_len: int,
+         max_ms: float) -> Tuple[List[Tuple[float, str, int]], List[Tuple[str, str]]]:
+    """
+    Runs the fuzzer. Returns (ms, description, length) of every input over
+    `max_ms`, slowest first, and (description, error) of every input
+    parse_receipt raised on.
+    """
+    limit_s = max(1.0, 20 * max_ms / 1000)
+    slow, crashed = [], []
+    for desc, text in fuzz_inputs(texts, seed, count, max_len):
+        try:
+            ms = _timed_parse(text, limit_s)
+            if ms > max_ms:
+                # Best of three, so a scheduler hiccup is not a finding
+                ms = min(ms, _timed_parse(text, limit_s), _timed_parse(text, limit_s))
+        except Exception as e:
+            crashed.append((desc, f"{type(e).__name__}: {e}"))
+            continue
+        if ms > max_ms:
+            slow.append((ms, desc, len(text)))
+    return sorted(slow, reverse=True), crashed
+
+
+# ================= REPORT =================
+def _regressions(accuracy: Dict[str, float], lat: Dict[str, float], baseline: Dict[str, Any],
+                 version: int, latency_factor: float) -> List[str]:
+    if baseline.get("corpus_version") != version:
+        print(f"\nbaseline is for corpus v{baseline.get('corpus_version')}, corpus is v{version}: "
+              "not comparing (run with --update-baseline)")
+        return []
+    found = [f"{f} accuracy {accuracy.get(f, 0.0):.1%} < baseline {rate:.1%}"
+             for f, rate in baseline["accuracy"].items() if accuracy.get(f, 0.0) < rate - 1e-4]
+    p99 = baseline["latency_ms"]["p99"]
+    if lat["p99"] > p99 * latency_factor:
+        found.append(f"p99 latency {lat['p99']:.2f} ms > {latency_factor}x baseline {p99:.2f} ms")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Golden-corpus parser accuracy, latency and fuzzing.")
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per receipt")
+    parser.add_argument("--fuzz", type=int, default=2000, help="fuzzer inputs (0 to skip)")
+    parser.add_argument("--fuzz-len", type=int, default=4000, help="longest fuzzer input (chars)")
+    parser.add_argument("--max-ms", type=float, default=50.0, help="flag any single parse slower than this")
+    parser.add_argument("--latency-factor", type=float, default=3.0, help="allowed p99 slow-down vs. the baseline")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--update-baseline", action="store_true", help="record this run as the baseline")
+    parser.add_argument("--write-corpus", action="store_true", help="regenerate the synthetic receipts and exit")
+    parser.add_argument("--per-layout", type=int, default=15, help="synthetic receipts per layout (--write-corpus)")
+    args = parser.parse_args()
+
+    if args.write_corpus:
+        corpus = write_corpus(args.seed, args.per_layout, args.corpus)
+        print(f"wrote {args.corpus}: v{corpus['version']}, {len(corpus['receipts'])} receipts")
+        return
+
+    # Categories and vendor names learned from the local database would change the results
+    get_category_cache().persist = False
+    get_vendor_canonicalizer().persist = False
+    corpus = load_corpus(args.corpus)
+    texts = [r["text"] for r in corpus["receipts"]]
+    print(f"corpus v{corpus['version']}: {len(texts)} receipts, {len(corpus.get('amounts', []))} amount strings")
+
+    accuracy, misses = score(corpus)
+    print_table([{"field": f, "accuracy": f"{rate:.1%}"} for f, rate in accuracy.items()])
+    by_field = Counter(field for _, field, _, _ in misses)
+    for field, n in by_field.most_common():
+        rid, _, expected, got = next(m for m in misses if m[1] == field)
+        if field == "items":
+            got = [[i["Item"], i["Price"]] for i in got]
+        print(f"  {field}: {n} misses, e.g. {rid}: expected {expected!r}, got {got!r}")
+
+    lat = latency(texts, args.repeat)
+    print(f"\nlatency: p50 {lat['p50']:.2f} ms · p90 {lat['p90']:.2f} ms · p99 {lat['p99']:.2f} ms · "
+          f"max {lat['max']:.2f} ms · {lat['receipts_per_s']:.0f} receipts/s")
+
+    slow: List[Tuple[float, str, int]] = []
+    crashed: List[Tuple[str, str]] = []
+    if args.fuzz:
+        start = time.perf_counter()
+        slow, crashed = fuzz(texts, args.seed, args.fuzz, args.fuzz_len, args.max_ms)
+        print(f"\nfuzzer: {args.fuzz} inputs up to {args.fuzz_len} chars in {time.perf_counter() - start:.1f} s, "
+              f"{len(slow)} over {args.max_ms:g} ms, {len(crashed)} raised")
+        for ms, desc, length in slow[:10]:
+            shown = "ran away" if ms == float("inf") else f"{ms:.0f} ms"
+            print(f"  {shown:>9}  {length:>6} chars  {desc[:100]}")
+        for desc, error in crashed[:10]:
+            print(f"  {'raised':>9}  {desc[:60]}: {error[:80]}")
+
+    if args.update_baseline:
+        baseline = {"corpus_version": corpus["version"], "machine": f"{sys.platform}, {os.cpu_count()} CPUs",
+                    "accuracy": {f: round(rate, 4) for f, rate in accuracy.items()},
+                    "latency_ms": {k: round(v, 3) for k, v in lat.items() if k != "receipts_per_s"}}
+        args.baseline.write_text(json.dumps(baseline, indent=1) + "\n")
+        print(f"\nwrote {args.baseline}")
+        regressions = []
+    else:
+        baseline: Optional[Dict[str, Any]] = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+        regressions = _regressions(accuracy, lat, baseline, corpus["version"], args.latency_factor) if baseline else []
+    for r in regressions:
+        print(f"REGRESSION: {r}")
+    if regressions or slow or crashed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Intake benchmark: full-resolution decode vs. draft() decode + text-height
+normalization on large phone photos.
+
+    python -m benchmarks.bench_intake [image_dir]
+
+Without a directory, a corpus of synthetic 12 MP JPEGs is generated.
+"""
+import os
+import sys
+import tempfile
+from typing import List
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks._common import peak_rss_delta_mb, print_table, render_photo, timed
+from ocr.intake import normalize_resolution, open_receipt_image
+
+
+def _legacy_intake(path: str) -> np.ndarray:
+    return np.array(Image.open(path).convert("L"))
+
+
+def _new_intake(path: str) -> np.ndarray:
+    return np.array(normalize_resolution(open_receipt_image(path)).convert("L"))
+
+
+def _synthetic_corpus(out_dir: str, count: int = 4) -> List[str]:
+    paths = []
+    for i in range(count):
+        path = os.path.join(out_dir, f"phone_{i}.jpg")
+        cv2.imwrite(path, render_photo(4032, 3024, angle=i - 1.5), [cv2.IMWRITE_JPEG_QUALITY, 92])
+        paths.append(path)
+    return paths
+
+
+def main(argv: List[str]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        if argv:
+            paths = sorted(
+                os.path.join(argv[0], f) for f in os.listdir(argv[0])
+                if f.lower().endswith((".jpg", ".jpeg", ".png"))
+            )
+        else:
+            paths = _synthetic_corpus(tmp)
+
+        rows = []
+        for path in paths:
+            legacy_ms, legacy = timed(_legacy_intake, path)
+            new_ms, new = timed(_new_intake, path)
+            rows.append({
+                "file": os.path.basename(path),
+                "legacy_px": f"{legacy.shape[1]}x{legacy.shape[0]}",
+                "intake_px": f"{new.shape[1]}x{new.shape[0]}",
+                "legacy_ms": f"{legacy_ms:.0f}",
+                "intake_ms": f"{new_ms:.0f}",
+                "legacy_rss_mb": f"{peak_rss_delta_mb(_legacy_intake, path):.0f}",
+                "intake_rss_mb": f"{peak_rss_delta_mb(_new_intake, path):.0f}",
+            })
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
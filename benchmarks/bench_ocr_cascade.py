@@ -0,0 +1,158 @@
+"""
+OCR cascade benchmark on the synthetic receipt corpus: per-stage latency
+and field-level accuracy against ground truth.
+
+    python -m benchmarks.bench_ocr_cascade [corpus_dir] [--count N] [--strength S]
+
+Without a corpus directory a temporary one is generated with
+benchmarks.synthetic_receipts. Stages whose engine is not installed
+(Tesseract, PaddleOCR) are skipped. "parse (perfect text)" runs the parser
+on the rendered text, so parser regressions show up separately from OCR
+ones.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks._common import print_table
+from benchmarks.synthetic_receipts import write_corpus
+from ocr.boundary import crop_receipt
+from ocr.engine_registry import get_registry
+from ocr.image_preprocessing import preprocess_image
+from ocr.quality import assess_quality
+from ocr.paddle_service import backend_available
+from ocr.pipeline import extract_receipt_ocr, load_receipt_image
+from ocr.text_parser import parse_receipt
+
+try:
+    import pytesseract
+    pytesseract.get_tesseract_version()
+    from ocr.tesseract_engine import extract_result_tesseract
+except Exception:
+    extract_result_tesseract = None
+
+if backend_available():
+    from ocr.paddle_engine import extract_result_paddle, warm_up_paddle
+else:
+    extract_result_paddle = None
+
+_FIELDS = ["vendor", "bill_id", "date", "amount", "tax", "subtotal"]
+_PSMS = [3, 6, 11]
+
+
+def _field_hits(data: Optional[Dict[str, Any]], truth: Dict[str, Any]) -> Dict[str, bool]:
+    if not data:
+        return {f: False for f in _FIELDS}
+    hits = {}
+    for f in _FIELDS:
+        got, want = data.get(f), truth[f]
+        if isinstance(want, float):
+            hits[f] = isinstance(got, (int, float)) and abs(got - want) < 0.011
+        elif f == "vendor":
+            hits[f] = str(want).lower() in str(got or "").lower()
+        else:
+            hits[f] = str(got or "").strip() == str(want)
+    return hits
+
+
+def _run(stages: Dict[str, List[float]], name: str, fn: Callable, *args) -> Any:
+    start = time.perf_counter()
+    result = fn(*args)
+    stages[name].append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def _corpus(args) -> Tuple[Path, Optional[tempfile.TemporaryDirectory]]:
+    if args.corpus:
+        return Path(args.corpus), None
+    tmp = tempfile.TemporaryDirectory(prefix="receipt_corpus_")
+    write_corpus(tmp.name, args.count, seed=1, strength=args.strength)
+    return Path(tmp.name), tmp
+
+
+def bench(corpus: Path) -> Tuple[Dict[str, List[float]], Dict[str, Dict[str, List[bool]]], List[int]]:
+    stages: Dict[str, List[float]] = defaultdict(list)
+    # accuracy[run][field] -> hits, run is "pipeline" or "parse (perfect text)"
+    accuracy: Dict[str, Dict[str, List[bool]]] = defaultdict(lambda: defaultdict(list))
+    by_layout: Dict[str, Dict[str, List[bool]]] = defaultdict(lambda: defaultdict(list))
+    passes: List[int] = []
+
+    for path in sorted(corpus.glob("*.png")) + sorted(corpus.glob("*.jpg")):
+        truth_path = path.with_suffix(".json")
+        if not truth_path.exists():
+            continue
+        truth = json.loads(truth_path.read_text())
+
+        img = _run(stages, "load", load_receipt_image, path.read_bytes(), path.name)
+        cropped = _run(stages, "crop", crop_receipt, img)
+        _run(stages, "quality gate", assess_quality, cropped)
+        for mode in ("simple", "advanced"):
+            prepared = _run(stages, f"preprocess {mode}", preprocess_image, cropped, mode)
+            if extract_result_tesseract and mode == "simple":
+                for psm in _PSMS:
+                    _run(stages, f"tesseract psm {psm}", extract_result_tesseract, prepared, psm)
+        if extract_result_paddle:
+            _run(stages, "paddleocr", extract_result_paddle, cropped)
+
+        data, _items = _run(stages, "parse (perfect text)", parse_receipt, truth["text"])
+        for f, ok in _field_hits(data, truth).items():
+            accuracy["parse (perfect text)"][f].append(ok)
+
+        timings: Dict[str, float] = {}
+        data, _items, _err, report = _run(stages, "pipeline total", extract_receipt_ocr, img, timings)
+        stages["pipeline parse"].append(timings.get("parse_ms", 0.0))
+        passes.append(report.pass_count)
+        for f, ok in _field_hits(data, truth).items():
+            accuracy["pipeline"][f].append(ok)
+            by_layout[truth["layout"]][f].append(ok)
+
+    for layout, fields in by_layout.items():
+        accuracy[f"pipeline · {layout}"] = fields
+    return stages, accuracy, passes
+
+
+def _pct(values: List[bool]) -> str:
+    return f"{100 * sum(values) / len(values):.0f}%" if values else "-"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Per-stage OCR latency and field accuracy.")
+    parser.add_argument("corpus", nargs="?", help="directory of <n>.png + <n>.json (default: generate one)")
+    parser.add_argument("--count", type=int, default=35, help="receipts to generate without a corpus")
+    parser.add_argument("--strength", type=float, default=1.0, help="degradation of generated receipts")
+    args = parser.parse_args(argv)
+
+    # Synthetic reads must not train the production cascade statistics (ocr_engine_stats)
+    get_registry().persist = False
+    corpus, tmp = _corpus(args)
+    if extract_result_paddle:
+        warm_up_paddle()
+    try:
+        stages, accuracy, passes = bench(corpus)
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+    print(f"Engines: tesseract={'yes' if extract_result_tesseract else 'no'}, "
+          f"paddleocr={'yes' if extract_result_paddle else 'no'}")
+    if passes:
+        print(f"Mean OCR passes per receipt: {statistics.mean(passes):.2f}\n")
+
+    print_table([{
+        "stage": name,
+        "n": len(ms),
+        "mean_ms": f"{statistics.mean(ms):.1f}",
+        "p50_ms": f"{statistics.median(ms):.1f}",
+        "p95_ms": f"{sorted(ms)[int(0.95 * (len(ms) - 1))]:.1f}",
+    } for name, ms in stages.items() if ms])
+    print()
+    print_table([{"run": run, **{f: _pct(fields[f]) for f in _FIELDS}} for run, fields in accuracy.items()])
+
+
+if __name__ == "__main__":
+    main()
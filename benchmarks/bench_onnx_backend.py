@@ -0,0 +1,90 @@
+"""
+PP-OCR backend benchmark: PaddlePaddle vs. onnxruntime (fp32 and int8) on
+the same synthetic corpus.
+
+    python -m benchmarks.bench_onnx_backend [--count N] [--threads T]
+
+Each backend runs in a fresh process and reports import + model load time,
+peak RSS and per-image latency. Backends that are not installed (or whose
+ONNX models are missing from ONNX_MODEL_DIR) are skipped.
+"""
+import argparse
+import multiprocessing as mp
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from benchmarks._common import _peak_rss_mb, _reset_peak_rss, print_table
+from benchmarks.synthetic_receipts import LAYOUTS, generate
+
+
+def _corpus(count: int):
+    rng = random.Random(1)
+    names = list(LAYOUTS)
+    return [generate(rng, names[i % len(names)])[0].convert("RGB") for i in range(count)]
+
+
+def _run_backend(backend: str, int8: bool, threads: int, count: int, queue) -> None:
+    import os
+    os.environ["PADDLE_BACKEND"] = backend
+    os.environ["ONNX_INT8"] = "1" if int8 else "0"
+    os.environ["ONNX_THREADS"] = str(threads)
+    images = _corpus(count)
+
+    _reset_peak_rss()
+    base = _peak_rss_mb()
+    start = time.perf_counter()
+    from ocr.paddle_service import PaddleOcrService, backend_available
+    if not backend_available(backend):
+        queue.put(None)
+        return
+    service = PaddleOcrService(backend=backend)
+    service.warm_up()
+    load_s = time.perf_counter() - start
+
+    latencies: List[float] = []
+    chars = 0
+    for img in images:
+        t = time.perf_counter()
+        chars += len(service.recognize(img).text)
+        latencies.append((time.perf_counter() - t) * 1000)
+    service.stop()
+
+    queue.put({
+        "load_s": f"{load_s:.2f}",
+        "peak_rss_mb": f"{_peak_rss_mb() - base:.0f}",
+        "mean_ms": f"{statistics.mean(latencies):.0f}",
+        "p95_ms": f"{sorted(latencies)[int(0.95 * (len(latencies) - 1))]:.0f}",
+        "chars": chars,
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PaddlePaddle vs. onnxruntime PP-OCR backends.")
+    parser.add_argument("--count", type=int, default=14)
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads (0 = all cores)")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    rows: List[Dict[str, Any]] = []
+    for name, backend, int8 in (("paddle", "paddle", False), ("onnx fp32", "onnx", False),
+                                ("onnx int8", "onnx", True)):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(backend, int8, args.threads, args.count, queue))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            result = {"load_s": f"failed (exit {proc.exitcode})"}
+        else:
+            result = queue.get() or {"load_s": "not installed"}
+        rows.append({"backend": name, **result})
+
+    for row in rows:
+        for col in ("peak_rss_mb", "mean_ms", "p95_ms", "chars"):
+            row.setdefault(col, "-")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
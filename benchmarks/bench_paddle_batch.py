@@ -0,0 +1,58 @@
+"""
+PaddleOCR batching benchmark: per-image cost of sequential ocr() calls
+(the old extract_text_paddle) vs. one PaddleOcrService batch.
+
+    python -m benchmarks.bench_paddle_batch [--count N]
+
+Needs the paddleocr package; exits with a note otherwise.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks._common import print_table
+from benchmarks.synthetic_receipts import LAYOUTS, generate
+from ocr.paddle_service import PaddleOcrService, _to_result, backend_available
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sequential vs. batched PaddleOCR.")
+    parser.add_argument("--count", type=int, default=16)
+    args = parser.parse_args()
+
+    if not backend_available():
+        print("The configured PP-OCR backend is not installed; nothing to benchmark")
+        return
+
+    rng = random.Random(1)
+    names = list(LAYOUTS)
+    images = [generate(rng, names[i % len(names)])[0].convert("RGB") for i in range(args.count)]
+
+    service = PaddleOcrService()
+    service.warm_up()
+    engine = service._engine
+
+    arrays = [np.array(img) for img in images]
+    start = time.perf_counter()
+    sequential = [_to_result(engine.ocr(a, cls=True)) for a in arrays]
+    seq_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    batched = service.recognize_many(images)
+    batch_ms = (time.perf_counter() - start) * 1000
+    service.stop()
+
+    same = sum(s.text == b.text for s, b in zip(sequential, batched))
+    print_table([
+        {"mode": "sequential", "images": len(images), "total_ms": f"{seq_ms:.0f}",
+         "per_image_ms": f"{seq_ms / len(images):.0f}", "chars": sum(len(r.text) for r in sequential)},
+        {"mode": "batched", "images": len(images), "total_ms": f"{batch_ms:.0f}",
+         "per_image_ms": f"{batch_ms / len(images):.0f}", "chars": sum(len(r.text) for r in batched)},
+    ])
+    print(f"\nIdentical text: {same}/{len(images)}")
+
+
+if __name__ == "__main__":
+    main()
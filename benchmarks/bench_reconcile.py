@@ -0,0 +1,103 @@
+"""
+Subtotal / tax reconciliation benchmark: the nested-loop pair search that
+parse_receipt used to run vs. the solver in ocr/reconcile.py.
+
+    python -m benchmarks.bench_reconcile [--sizes 10 100 1000] [--trials 20]
+
+Every trial plants one solution among `size` noise numbers (OCR'd item
+prices, quantities, phone and bill numbers) and asks both for the split of
+the total. Cases: a single tax line, CGST + SGST, service charge + tax,
+and an unprinted subtotal that only the item prices add up to. "none" has
+nothing planted, the worst case for the nested loop. Reports the slowest
+trial and how often the planted subtotal and tax came out on top; for the
+solver, as parse_receipt uses it (reconcile.accept). In the "none" rows a
+hit is finding nothing: the rest are made-up splits (false positives).
+"""
+import argparse
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks._common import print_table, timed
+from ocr.reconcile import accept, reconcile
+
+_CASES = ("pair", "cgst+sgst", "service+tax", "items", "none")
+
+
+def _nested_loop(numbers: List[float], total: float) -> Optional[Tuple[float, float]]:
+    """The search parse_receipt ran before ocr/reconcile.py."""
+    unique_nums = sorted(set(numbers), reverse=True)
+    for a in unique_nums:
+        if a >= total:
+            continue
+        for b in unique_nums:
+            if abs((a + b) - total) < 0.1:
+                return a, b
+    return None
+
+
+def _trial(rng: random.Random, case: str, size: int) -> Tuple[List[float], List[float], float, Tuple[float, float]]:
+    """(numbers, item prices, total, planted (subtotal, tax))."""
+    prices = [round(rng.uniform(5, 600), 2) for _ in range(rng.randint(3, 12))]
+    subtotal = round(sum(prices), 2)
+    if case == "cgst+sgst":
+        half = round(subtotal * 0.09, 2)
+        taxes = [half, half]
+    elif case == "service+tax":
+        service = round(subtotal * 0.10, 2)
+        taxes = [service, round((subtotal + service) * 0.05, 2)]
+    else:
+        taxes = [round(subtotal * 0.18, 2)]
+    total = round(subtotal + sum(taxes), 2)
+    planted = [] if case == "none" else prices + taxes + ([] if case == "items" else [subtotal])
+
+    # Noise: everything else a long, badly OCR'd receipt prints
+    noise: List[float] = []
+    while len(noise) < size - len(planted):
+        n = rng.choice([round(rng.uniform(0.5, total * 1.2), 2), float(rng.randint(1, 12)),
+                        float(rng.randint(1000, 99999))])
+        if case == "none" or not any(abs(n - p) < 0.1 for p in planted + [total - n]):
+            noise.append(n)
+    numbers = noise + planted + [total]
+    rng.shuffle(numbers)
+    return numbers, prices, total, (subtotal, round(sum(taxes), 2))
+
+
+def _hit(found: Optional[Tuple[float, float]], planted: Tuple[float, float], case: str) -> bool:
+    if case == "none":
+        return found is None
+    return found is not None and abs(found[0] - planted[0]) < 0.1 and abs(found[1] - planted[1]) < 0.1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reconciliation search: nested loop vs. solver.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        for case in _CASES:
+            rng = random.Random(args.seed)
+            worst = {"nested": 0.0, "solver": 0.0}
+            hits = {"nested": 0, "solver": 0}
+            for _ in range(args.trials):
+                numbers, prices, total, planted = _trial(rng, case, size)
+                ms, pair = timed(_nested_loop, numbers, total, repeat=1)
+                worst["nested"] = max(worst["nested"], ms)
+                hits["nested"] += _hit(pair, planted, case)
+                ms, solutions = timed(reconcile, numbers, total, prices, repeat=1)
+                worst["solver"] = max(worst["solver"], ms)
+                best = accept(solutions)
+                best = (best.subtotal, best.tax) if best else None
+                hits["solver"] += _hit(best, planted, case)
+            rows.append({
+                "numbers": size, "case": case,
+                "nested_ms": f"{worst['nested']:.1f}", "solver_ms": f"{worst['solver']:.1f}",
+                "nested_hits": f"{hits['nested']}/{args.trials}", "solver_hits": f"{hits['solver']}/{args.trials}",
+            })
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
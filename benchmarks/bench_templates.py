@@ -0,0 +1,129 @@
+"""
+Vendor detection benchmark: one regex per template tried in turn (the
+previous get_matching_template) vs. the registry's combined alias matcher
+(ocr/templates.py).
+
+    python -m benchmarks.bench_templates [--sizes 10 100 5000] [--texts 500]
+
+Each size gets a registry file of generated vendors (the real templates
+first, then made-up chains with one to three aliases each, including OCR
+misreads) and the parser benchmark's noisy receipt corpus; half of the
+receipts that name no vendor get a registry vendor on their first line.
+Reports registry load (parse + compile) time, µs per receipt for both
+matchers, how often they agree (a receipt naming two vendors may differ:
+the old loop took the first template listed, the registry takes the first
+name printed), and how long a hot reload takes to become visible.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks._common import print_table
+from benchmarks.bench_text_parser import build_corpus
+from config.config import RECEIPT_TEMPLATES
+from ocr.templates import TemplateRegistry
+
+_SYLLABLES = ["ka", "ri", "mo", "sun", "del", "fresh", "mart", "ba", "zar", "lo", "vi", "ta", "ne", "gro",
+              "ven", "pla", "zo", "cor", "ni", "qu", "ex", "star", "shi", "ra"]
+_SUFFIXES = ["", " stores", " supermarket", " mart", " bazaar", " cafe", " pharmacy", " traders"]
+
+
+def _vendor(rng: random.Random) -> str:
+    word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return word + rng.choice(_SUFFIXES)
+
+
+def _misread(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + name[i + 1:]
+
+
+def _registry_entries(size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    with open(RECEIPT_TEMPLATES, encoding="utf-8") as f:
+        entries = json.load(f)["templates"][:size]
+    names = {a for e in entries for a in e["aliases"]}
+    while len(entries) < size:
+        name = _vendor(rng)
+        if name in names:
+            continue
+        aliases = [name] + [_misread(name, rng) for _ in range(rng.randint(0, 2))]
+        aliases = [a for a in dict.fromkeys(aliases) if a not in names]
+        names.update(aliases)
+        entries.append({"name": name.title(), "aliases": aliases,
+                        "total_pattern": r"(?i)\btotal\s*[:\-]?\s*(\d+[.,]\d{2})"})
+    return entries
+
+
+def _linear_matcher(entries: List[Dict[str, Any]]):
+    """The previous lookup: each template's vendor regex, in registry order."""
+    patterns = [(e["name"], re.compile("(?i)" + "|".join(re.escape(a) for a in e["aliases"]))) for e in entries]
+
+    def match(text: str) -> Optional[str]:
+        for name, pattern in patterns:
+            if pattern.search(text):
+                return name
+        return None
+
+    return match
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vendor detection cost by template count.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 5000])
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        entries = _registry_entries(size, rng)
+        linear = _linear_matcher(entries)
+        texts = build_corpus(args.texts, args.seed)
+        texts = [f"{rng.choice(rng.choice(entries)['aliases']).upper()}\n{t}" if i % 2 and not linear(t) else t
+                 for i, t in enumerate(texts)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "templates.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"templates": entries}, f)
+
+            start = time.perf_counter()
+            registry = TemplateRegistry(path, check_seconds=0.0)
+            load_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            old = [linear(t) for t in texts]
+            linear_us = (time.perf_counter() - start) * 1e6 / len(texts)
+            start = time.perf_counter()
+            new = [(m.name if m else None) for m in map(registry.match, texts)]
+            combined_us = (time.perf_counter() - start) * 1e6 / len(texts)
+
+            # Hot reload: add a vendor and time until it is matched
+            entries.append({"name": "Hot Reload Mart", "aliases": ["hot reload mart"]})
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"templates": entries}, f)
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+            start = time.perf_counter()
+            reloaded = registry.match("HOT RELOAD MART\nTotal 10.00")
+            reload_ms = (time.perf_counter() - start) * 1000
+
+        rows.append({
+            "templates": size,
+            "load_ms": f"{load_ms:.1f}",
+            "linear_us": f"{linear_us:.0f}",
+            "combined_us": f"{combined_us:.0f}",
+            "speed-up": f"{linear_us / combined_us:.1f}x",
+            "agree": f"{sum(a == b for a, b in zip(old, new))}/{len(texts)}",
+            "reload_ms": f"{reload_ms:.1f}" if reloaded else "not picked up",
+        })
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+parse_receipt throughput and equivalence benchmark.
+
+    python -m benchmarks.bench_text_parser [--count 5000] [--seed 1] [--update-snapshot]
+
+Builds a text corpus from the synthetic receipt layouts, run through an
+OCR-noise fuzzer: character confusions (O/0, S/5, l/1, I/|), dropped,
+duplicated and merged lines, stray labels and '#' fragments, and long
+grocery receipts with hundreds of item lines. Every text is parsed by the
+compiled rule engine (ocr/text_parser.py) and by the frozen line-by-line
+parser it replaced (benchmarks/_reference_parser.py); receipts/s is
+reported for both.
+
+The engine's outputs must match benchmarks/golden/text_parser_outputs.json,
+a digest per receipt of the last accepted outputs; the run exits 1 on any
+difference. A change that alters outputs on purpose re-records it with
+--update-snapshot in the same commit. The diff against the reference parser
+is informational only: the reference is frozen, so fields the parser now
+gets right on purpose (e.g. split-tax reconciliation, ocr/reconcile.py)
+show up there.
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from benchmarks import _reference_parser
+from benchmarks._common import print_table
+from benchmarks.synthetic_receipts import _ITEMS, LAYOUTS, generate_lines
+from ocr.categories import get_category_cache
+from ocr.text_parser import parse_receipt
+from ocr.vendors import get_vendor_canonicalizer
+
+SNAPSHOT = Path(__file__).parent / "golden" / "text_parser_outputs.json"
+
+_CONFUSIONS = {"o": "0", "O": "0", "0": "O", "s": "5", "S": "5", "5": "S", "l": "1", "1": "l",
+               "I": "|", "i": "1", ".": ",", ",": "."}
+_STRAY_LINES = ["TOTAL", "Tax", "GST 18%", "# 4471", "Inv No:", "Sub Total", "Amount Due",
+                "CGST 9% SGST 9%", "Order #A-99812", "Cash 500.00", "Change 23.50", "12 x 3"]
+
+
+def _noisy(text: str, rng: random.Random, rate: float) -> str:
+    """Applies OCR-like character and line damage to `text`."""
+    lines = text.splitlines()
+    out: List[str] = []
+    for line in lines:
+        r = rng.random()
+        if r < rate / 2:
+            continue                                   # dropped line
+        if r < rate:
+            out.append(line)                           # duplicated line
+        if out and rng.random() < rate / 3:
+            out[-1] = f"{out[-1]} {line}"              # merged with the previous line
+            continue
+        out.append("".join(_CONFUSIONS.get(c, c) if rng.random() < rate / 4 else c for c in line))
+        if rng.random() < rate / 3:
+            out.append(rng.choice(_STRAY_LINES))
+    return "\n".join(out)
+
+
+def _long_receipt(rng: random.Random, items: int) -> str:
+    lines = ["FRESH MART SUPERSTORE", "TAX INVOICE", f"Bill No: {rng.randint(1000, 9999)}-{rng.randint(10, 99)}",
+             f"Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"]
+    total = 0.0
+    for _ in range(items):
+        price = round(rng.uniform(1, 60), 2)
+        total += price
+        lines.append(f"{rng.randint(1, 4)} {rng.choice(_ITEMS)} {price:.2f}" if rng.random() < 0.5
+                     else f"{rng.choice(_ITEMS)} {price:.2f}")
+    tax = round(total * 0.05, 2)
+    lines += [f"Sub Total {total:.2f}", "CGST 2.5%", f"{tax / 2:.2f}", "SGST 2.5%", f"{tax / 2:.2f}",
+              f"Grand Total {total + tax:.2f}"]
+    return "\n".join(lines)
+
+
+def build_corpus(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    names = list(LAYOUTS)
+    texts = []
+    for i in range(count):
+        if i % 10 == 9:
+            text = _long_receipt(rng, rng.choice([50, 150, 400]))
+        else:
+            text = generate_lines(rng, names[i % len(names)])[1].text
+        texts.append(_noisy(text, rng, rng.choice([0.0, 0.05, 0.15, 0.3])))
+    return texts
+
+
+def _run(parse: Callable, texts: List[str]) -> Tuple[float, list]:
+    outputs = []
+    start = time.perf_counter()
+    for i, text in enumerate(texts):
+        random.seed(i)  # the reference parser's fallback bill IDs are random
+        outputs.append(parse(text))
+    return time.perf_counter() - start, outputs
+
+
+def _digests(texts: List[str]) -> List[str]:
+    """A digest of the engine's output per text; a date that fell back to today is masked."""
+    digests = []
+    for text in texts:
+        provenance = {}
+        data, items = parse_receipt(text, provenance=provenance)
+        if provenance["date"].source == "fallback":
+            data = {**data, "date": None}
+        blob = json.dumps([data, items], sort_keys=True, default=repr)
+        digests.append(hashlib.blake2b(blob.encode(), digest_size=8).hexdigest())
+    return digests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="parse_receipt throughput and equivalence.")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--snapshot", type=Path, default=SNAPSHOT)
+    parser.add_argument("--update-snapshot", action="store_true",
+                        help="record the current outputs as the accepted ones")
+    args = parser.parse_args()
+
+    # Categories and vendor names learned from the local database would differ from the reference
+    get_category_cache().persist = False
+    get_vendor_canonicalizer().persist = False
+    texts = build_corpus(args.count, args.seed)
+    lines = sum(t.count("\n") + 1 for t in texts)
+    print(f"corpus: {len(texts)} receipts, {lines} lines")
+
+    ref_s, ref_out = _run(_reference_parser.parse_receipt, texts)
+    new_s, new_out = _run(parse_receipt, texts)
+    long_idx = [i for i, t in enumerate(texts) if t.count("\n") > 100]
+    long_ref_s, _ = _run(_reference_parser.parse_receipt, [texts[i] for i in long_idx])
+    long_new_s, _ = _run(parse_receipt, [texts[i] for i in long_idx])
+
+    print_table([
+        {"parser": "line-by-line (reference)", "receipts_per_s": f"{len(texts) / ref_s:.0f}",
+         "long_receipts_per_s": f"{len(long_idx) / long_ref_s:.0f}" if long_idx else "-"},
+        {"parser": "compiled rule engine", "receipts_per_s": f"{len(texts) / new_s:.0f}",
+         "long_receipts_per_s": f"{len(long_idx) / long_new_s:.0f}" if long_idx else "-"},
+    ])
+    print(f"speed-up: {ref_s / new_s:.2f}x overall")
+
+    mismatches = [i for i, (a, b) in enumerate(zip(ref_out, new_out)) if a != b]
+    print(f"vs. reference parser (informational): {len(texts) - len(mismatches)}/{len(texts)} identical")
+    fields: Counter = Counter()
+    for i in mismatches:
+        (ref_data, ref_items), (new_data, new_items) = ref_out[i], new_out[i]
+        fields.update(k for k in new_data if ref_data.get(k) != new_data.get(k))
+        if ref_items != new_items:
+            fields["items"] += 1
+    if fields:
+        print("differing fields: " + ", ".join(f"{k} {n}" for k, n in fields.most_common()))
+    for i in mismatches[:5]:
+        print(f"\n--- receipt {i} ---\n{texts[i]}\nreference: {ref_out[i]}\nengine:    {new_out[i]}")
+
+    digests = _digests(texts)
+    if args.update_snapshot:
+        snapshot = {"count": args.count, "seed": args.seed, "digests": digests}
+        args.snapshot.write_text(json.dumps(snapshot, indent=0) + "\n")
+        print(f"\nwrote {args.snapshot}")
+        return
+    snapshot = json.loads(args.snapshot.read_text()) if args.snapshot.exists() else None
+    if not snapshot or (snapshot["count"], snapshot["seed"]) != (args.count, args.seed):
+        print(f"\nno snapshot for --count {args.count} --seed {args.seed}: not comparing "
+              "(run with --update-snapshot)")
+        return
+    changed = [i for i, (a, b) in enumerate(zip(snapshot["digests"], digests)) if a != b]
+    print(f"\nvs. snapshot: {len(texts) - len(changed)}/{len(texts)} identical")
+    for i in changed[:5]:
+        print(f"\n--- receipt {i} changed ---\n{texts[i]}\nengine: {new_out[i]}")
+    if changed:
+        print(f"\n{len(changed)} outputs changed; if intended, re-record with --update-snapshot")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Tiled OCR benchmark: whole-page vs. banded reads of long grocery receipts.
+
+    python -m benchmarks.bench_tiling [--items 60 120 240]
+
+For every installed engine (Tesseract, the configured PP-OCR backend)
+reports wall time and text rows read for the page as one image and as
+overlapping bands. Tiled Tesseract latency should fall with core count.
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks._common import print_table
+from benchmarks.synthetic_receipts import _ITEMS, render_receipt
+from ocr.layout import build_rows
+from ocr.paddle_service import backend_available
+from ocr.tiling import split_bands
+
+try:
+    import pytesseract
+    pytesseract.get_tesseract_version()
+    from ocr.tesseract_engine import _run_tesseract, extract_result_tesseract
+except Exception:
+    extract_result_tesseract = None
+
+
+def _long_receipt(items: int):
+    rng = random.Random(items)
+    lines = ["FRESH MART SUPERSTORE", "TAX INVOICE", ""]
+    lines += [(f"{rng.choice(_ITEMS)} x{i + 1}", f"{rng.uniform(1, 60):.2f}") for i in range(items)]
+    lines += ["", ("Grand Total", "999.99")]
+    return render_receipt(lines).convert("RGB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Whole-page vs. tiled OCR on long receipts.")
+    parser.add_argument("--items", type=int, nargs="+", default=[60, 120, 240])
+    args = parser.parse_args()
+
+    engines = []
+    if extract_result_tesseract:
+        engines.append(("tesseract", lambda img: _run_tesseract(img, 6), lambda img: extract_result_tesseract(img, 6)))
+    if backend_available():
+        from ocr.paddle_engine import extract_result_paddle
+        from ocr.paddle_service import get_paddle_service
+        get_paddle_service().warm_up()
+        engines.append(("paddle", get_paddle_service().recognize, extract_result_paddle))
+    if not engines:
+        print("No OCR engine installed; nothing to benchmark")
+        return
+
+    rows = []
+    for items in args.items:
+        img = _long_receipt(items)
+        for name, whole_fn, tiled_fn in engines:
+            t = time.perf_counter()
+            whole = whole_fn(img)
+            whole_s = time.perf_counter() - t
+            t = time.perf_counter()
+            tiled = tiled_fn(img)
+            tiled_s = time.perf_counter() - t
+            rows.append({
+                "engine": name,
+                "size": f"{img.width}x{img.height}",
+                "bands": len(split_bands(img)),
+                "whole_s": f"{whole_s:.2f}",
+                "tiled_s": f"{tiled_s:.2f}",
+                "whole_rows": len(build_rows(whole.tokens)),
+                "tiled_rows": len(build_rows(tiled.tokens)),
+                "expected_rows": items + 3,
+            })
+    print(f"cores: {os.cpu_count()}")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
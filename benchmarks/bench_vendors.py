@@ -0,0 +1,237 @@
+"""
+Vendor canonicalization benchmark: the trigram index of ocr/vendors.py vs.
+scoring every known name in turn, plus the bulk merge job.
+
+    python -m benchmarks.bench_vendors [--sizes 100 1000 10000 100000] [--queries 2000]
+
+Each size gets real chain names padded with generated ones. Queries are
+variants of known names (upper case, spaces or hyphens dropped or added,
+branch / legal suffixes, one OCR look-alike character) and unknown names.
+Reports µs per lookup for both (they score identically; the index only
+skips names sharing no trigram), how many variants found their chain,
+wrong-chain matches, unknown names matched to a chain, and the merge job
+(services/merge_vendors.py) on a scratch database of receipts.
+
+Separate vendors whose name starts with a shorter known one ("Starbucks"
+after "Star") must never merge, through a lookup or the merge job, and
+the spellings in _MUST_MATCH ("D-Mart Ready" after "DMart") always must;
+exits 1 if any pair goes the wrong way.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks._common import print_table
+from ocr.vendors import _MIN_FUZZY_KEY, MATCH_THRESHOLD, VendorIndex, _score, match_heads, match_key, trigrams
+
+_CHAINS = [
+    "DMart", "Reliance Fresh", "Reliance Digital", "Big Bazaar", "More Supermarket", "Spencers", "Star Bazaar",
+    "Nature's Basket", "Apollo Pharmacy", "MedPlus", "Netmeds", "Wellness Forever", "Cafe Coffee Day", "Starbucks",
+    "Chaayos", "Haldiram's", "Barbeque Nation", "Domino's Pizza", "Pizza Hut", "McDonald's", "Burger King",
+    "Subway", "Zudio", "Westside", "Pantaloons", "Lifestyle", "Max Fashion", "Shoppers Stop", "Croma",
+    "Vijay Sales", "Indian Oil", "Bharat Petroleum", "Shell Fuel", "Rapido Bike", "PVR Cinemas", "INOX Movies",
+    "Decathlon", "Lenskart", "Tanishq", "Bata Shoes", "Metro Cash and Carry", "Hotel Saravana Bhavan",
+    "Anand Sweets", "Apollo Hospital", "Tata Power", "BESCOM", "Jio Mart", "Nilgiris", "Ratnadeep",
+    "Vishal Mega Mart", "Walmart", "Costco", "Wirral School Shops",
+]
+_SUFFIXES = [" Ready", " Avenue", " Ltd", " Pvt Ltd", " Store", " Supermarts", " Express", " #1204",
+             " - Koramangala", " India Pvt Ltd", " Outlet"]
+_LOOKALIKE_TYPOS = {"o": "0", "l": "1", "s": "5", "i": "1", "t": "7", "S": "5", "O": "0", "I": "1"}
+# (known vendor, a different vendor whose name starts with it)
+_MUST_NOT_MERGE = [
+    ("Star", "Starbucks"), ("Cafe", "Cafe Nero"), ("Cafe", "Cafe Mocha"), ("Amazon", "Amazon Fresh"),
+    ("Target", "Target Optical"), ("Shell", "Shell Select"), ("Walmart", "Walmart Pharmacy"),
+    ("Reliance", "Reliance Digital"), ("Apollo", "Apollo Pharmacy"),
+]
+# (known vendor, a spelling of it that must match)
+_MUST_MATCH = [
+    ("DMart", "DMART"), ("DMart", "D-Mart Ready"), ("DMart", "DMart Avenue"), ("DMart", "D Mart Avenue Supermarts Ltd"),
+    ("Reliance Fresh", "Reliance Fresh Ltd"), ("Reliance Fresh", "RELIANCE FRESH #1204"),
+    ("Reliance Fresh", "Re1iance Fresh Pvt Ltd"), ("Walmart", "Walmart Store 4021"),
+]
+
+
+def _made_up_name(rng: random.Random) -> str:
+    def word():
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 8))).capitalize()
+    return " ".join(word() for _ in range(rng.randint(1, 3)))
+
+
+def _variant(rng: random.Random, name: str) -> str:
+    kind = rng.randrange(5)
+    if kind == 0:
+        return name.upper()
+    if kind == 1:
+        return name.replace(" ", "") if " " in name else f"{name[:1]}-{name[1:]}"
+    if kind == 2:
+        return name + rng.choice(_SUFFIXES)
+    chars = list(name)
+    typos = [i for i, c in enumerate(chars) if c in _LOOKALIKE_TYPOS]
+    if typos:
+        i = rng.choice(typos)
+        chars[i] = _LOOKALIKE_TYPOS[chars[i]]
+    return "".join(chars) + (rng.choice(_SUFFIXES) if kind == 4 else "")
+
+
+class _LinearScan:
+    """Every known name scored in turn, as ocr/vendors.py scores them."""
+
+    def __init__(self, names: List[str]):
+        self._entries = [(name, trigrams(match_key(name)), match_key(name)) for name in names]
+        self._exact = {key: name for name, _, key in self._entries}
+
+    def match(self, name: str, threshold: float = MATCH_THRESHOLD) -> Optional[Tuple[str, float]]:
+        heads = match_heads(name)
+        if heads and heads[0] in self._exact:
+            return self._exact[heads[0]], 1.0
+        best = None
+        for i, head in enumerate(heads):
+            if i and head in self._exact:
+                hits = [(self._exact[head], 1.0, trigrams(match_key(self._exact[head])))]
+            elif len(head) >= _MIN_FUZZY_KEY:
+                grams = trigrams(head)
+                hits = [(candidate, _score(len(grams & cgrams), len(grams), len(cgrams)), cgrams)
+                        for candidate, cgrams, ckey in self._entries
+                        if len(ckey) >= _MIN_FUZZY_KEY and grams & cgrams]
+            else:
+                continue
+            for candidate, score, cgrams in hits:
+                if best is None or (score, -len(cgrams)) > (best[1], -len(best[2])):
+                    best = (candidate, score, cgrams)
+        return (best[0], best[1]) if best and best[1] >= threshold else None
+
+
+def _lookup_us(matcher, queries: List[str]) -> Tuple[float, List[Optional[Tuple[str, float]]]]:
+    start = time.perf_counter()
+    results = [matcher.match(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries) * 1e6, results
+
+
+def _run_size(size: int, n_queries: int, seed: int, brute_limit: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    names = list(_CHAINS)
+    seen = {match_key(n) for n in names}
+    while len(names) < size:
+        name = _made_up_name(rng)
+        if match_key(name) not in seen:
+            seen.add(match_key(name))
+            names.append(name)
+
+    start = time.perf_counter()
+    index = VendorIndex()
+    for name in names:
+        index.add(name)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    chains = [rng.choice(_CHAINS) for _ in range(n_queries // 2)]
+    variants = [_variant(rng, c) for c in chains]
+    unknown = [_made_up_name(rng) for _ in range(n_queries - len(variants))]
+    queries = variants + unknown
+
+    index_us, results = _lookup_us(index, queries)
+    row = {"names": size, "build_ms": f"{build_ms:.0f}", "index_us": f"{index_us:.1f}"}
+    if size <= brute_limit:
+        scan_us, scanned = _lookup_us(_LinearScan(names), queries)
+        same = sum((a[0] if a else None) == (b[0] if b else None) for a, b in zip(results, scanned))
+        row.update({"scan_us": f"{scan_us:.1f}", "speed-up": f"{scan_us / index_us:.0f}x",
+                    "agree": f"{same}/{len(queries)}"})
+    else:
+        row.update({"scan_us": "-", "speed-up": "-", "agree": "-"})
+    found = sum(bool(r) and r[0] == c for r, c in zip(results, chains))
+    wrong = sum(bool(r) and r[0] != c for r, c in zip(results, chains))
+    false = sum(bool(r) for r in results[len(variants):])
+    row.update({"variants_found": f"{found}/{len(variants)}", "wrong_chain": wrong,
+                "unknown_matched": f"{false}/{len(unknown)}"})
+    return row
+
+
+@contextmanager
+def _scratch_db() -> Iterator[None]:
+    """An initialized database in a temporary working directory (database.db opens receipts.db there)."""
+    from database.db import init_db
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            init_db()
+            yield
+        finally:
+            os.chdir(cwd)
+
+
+def _pairs() -> List[Dict[str, Any]]:
+    """
+    Each _MUST_NOT_MERGE and _MUST_MATCH pair through a lookup (known name
+    indexed first) and through the merge plan.
+    """
+    from services.merge_vendors import plan_merges
+
+    pairs = [(known, other, False) for known, other in _MUST_NOT_MERGE]
+    pairs += [(known, other, True) for known, other in _MUST_MATCH]
+    rows = []
+    for known, other, same in pairs:
+        index = VendorIndex()
+        index.add(known)
+        hit = index.match(other)
+        with _scratch_db():
+            merged = plan_merges([(known, 2), (other, 1)]).get(other)
+        found = hit[0] if hit else None
+        ok = found == merged == (known if same else None)
+        rows.append({"known": known, "vendor": other, "expect": "match" if same else "separate",
+                     "lookup": found or "-", "merged_into": merged or "-", "ok": "yes" if ok else "NO"})
+    return rows
+
+
+def _merge_job(receipts: int, seed: int) -> Dict[str, Any]:
+    """The merge job on a scratch database of receipts under chain variants and one-off vendors."""
+    from database.db import get_db
+    from services.merge_vendors import merge_vendors
+
+    rng = random.Random(seed)
+    with _scratch_db():
+        db = get_db()
+        rows = []
+        for i in range(receipts):
+            chain = rng.choice(_CHAINS)
+            vendor = chain if rng.random() < 0.6 else _variant(rng, chain) if rng.random() < 0.8 else _made_up_name(rng)
+            rows.append((f"B{i}", vendor, "2024-01-01", 10.0, 0.0))
+        with db:
+            db.executemany("INSERT INTO receipts (bill_id, vendor, date, amount, tax) VALUES (?, ?, ?, ?, ?)", rows)
+        before = db.execute("SELECT COUNT(DISTINCT vendor) FROM receipts").fetchone()[0]
+        start = time.perf_counter()
+        scanned, merges, rewritten = merge_vendors(chunk_size=2000)
+        elapsed = time.perf_counter() - start
+        after = db.execute("SELECT COUNT(DISTINCT vendor) FROM receipts").fetchone()[0]
+    return {"receipts": scanned, "vendors_before": before, "vendors_after": after, "merged": len(merges),
+            "rewritten": sum(rewritten.values()), "seconds": f"{elapsed:.2f}",
+            "receipts_per_s": f"{scanned / elapsed:.0f}"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vendor canonicalization: trigram index vs. linear scan.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--brute-limit", type=int, default=10000, help="largest size the linear scan runs on")
+    parser.add_argument("--receipts", type=int, default=50000, help="receipts for the merge job (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print_table([_run_size(size, args.queries, args.seed, args.brute_limit) for size in args.sizes])
+    print()
+    pairs = _pairs()
+    print_table(pairs)
+    if args.receipts:
+        print()
+        print_table([_merge_job(args.receipts, args.seed)])
+    sys.exit(1 if any(p["ok"] != "yes" for p in pairs) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Synthetic receipt generator for OCR benchmarking.
+
+Renders receipts in the vendor layouts of ocr/templates.json (plus a generic
+Indian GST layout) with PIL, degrades them like phone photos (rotation,
+perspective, blur, noise) and writes ground truth next to each image.
+
+    python -m benchmarks.synthetic_receipts corpus/ --count 200 --seed 1
+
+Writes corpus/0000.png + corpus/0000.json, ...
+"""
+import argparse
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+_ITEMS = [
+    "MILK 1L", "BREAD BROWN", "EGGS 12PK", "BASMATI RICE 5KG", "SUNFLOWER OIL", "BANANAS",
+    "TOMATOES", "COFFEE BEANS", "GREEN TEA", "PAPER TOWELS", "SHAMPOO", "TOOTHPASTE",
+    "CHICKEN BREAST", "CHEDDAR CHEESE", "ORANGE JUICE", "PASTA", "BUTTER 500G", "YOGURT",
+]
+_MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December"]
+
+
+@dataclass
+class GroundTruth:
+    """Expected parser output for one synthetic receipt."""
+    layout: str
+    vendor: str
+    bill_id: str
+    date: str
+    amount: float
+    tax: float
+    subtotal: float
+    items: List[Dict] = field(default_factory=list)
+    # What a perfect OCR read would return, for parser-only accuracy
+    text: str = ""
+    degradation: Dict = field(default_factory=dict)
+
+
+# ================= LAYOUTS =================
+# Each layout returns (lines, truth) for a random basket. Right-aligned
+# amounts are expressed as (label, amount) tuples.
+Line = Union[str, Tuple[str, str]]
+
+
+def _basket(rng: random.Random, n_min: int = 3, n_max: int = 9) -> List[Tuple[str, float]]:
+    names = rng.sample(_ITEMS, rng.randint(n_min, n_max))
+    return [(n, round(rng.uniform(0.5, 60.0), 2)) for n in names]
+
+
+def _money(v: float) -> str:
+    return f"{v:.2f}"
+
+
+def _walmart(rng, d):
+    items = _basket(rng)
+    sub = round(sum(p for _, p in items), 2)
+    tax = round(sub * 0.07, 2)
+    tc = str(rng.randint(10**11, 10**12 - 1))
+    lines = ["Walmart", "Save money. Live better.", f"ST# {rng.randint(1000, 9999)} OP# {rng.randint(10, 99)}", ""]
+    lines += [(n, _money(p)) for n, p in items]
+    lines += ["", ("SUBTOTAL", _money(sub)), ("TAX 1", _money(tax)), ("TOTAL DUE", _money(sub + tax)),
+              "", f"{d:%m/%d/%y} {rng.randint(8, 21):02d}:{rng.randint(0, 59):02d}", f"TC# {tc}"]
+    return lines, GroundTruth("Walmart", "Walmart", tc, d.isoformat(), round(sub + tax, 2), tax, sub,
+                              [{"Item": n, "Price": p} for n, p in items])
+
+
+def _target(rng, d):
+    items = _basket(rng)
+    sub = round(sum(p for _, p in items), 2)
+    tax = round(sub * 0.0825, 2)
+    rid = f"{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}-{rng.randint(10, 99)}"
+    lines = ["TARGET", "Expect More. Pay Less.", f"{d:%m/%d/%Y}", ""]
+    lines += [(n, _money(p)) for n, p in items]
+    lines += ["", ("SUBTOTAL", _money(sub)), ("TAX", _money(tax)), ("TOTAL", "$" + _money(sub + tax)),
+              "", f"RECEIPT# {rid}"]
+    return lines, GroundTruth("Target", "Target", rid, d.isoformat(), round(sub + tax, 2), tax, sub,
+                              [{"Item": n, "Price": p} for n, p in items])
+
+
+def _costco(rng, d):
+    items = _basket(rng, 2, 6)
+    sub = round(sum(p for _, p in items), 2)
+    tax = round(sub * 0.06, 2)
+    bill = str(rng.randint(10**6, 10**7 - 1))
+    lines = ["COSTCO WHOLESALE", f"Warehouse #{rng.randint(100, 999)}", f"Invoice {bill}", ""]
+    lines += [(n, _money(p)) for n, p in items]
+    lines += ["", ("SUBTOTAL", _money(sub)), ("TAX", _money(tax)), ("TOTAL OWNED", "$" + _money(sub + tax)),
+              "", f"{d:%m/%d/%Y}"]
+    return lines, GroundTruth("Costco", "Costco", bill, d.isoformat(), round(sub + tax, 2), tax, sub,
+                              [{"Item": n, "Price": p} for n, p in items])
+
+
+def _amazon(rng, d):
+    items = _basket(rng, 1, 4)
+    sub = round(sum(p for _, p in items), 2)
+    tax = round(sub * 0.05, 2)
+    order = f"{rng.randint(100, 999)}-{rng.randint(10**6, 10**7 - 1)}-{rng.randint(10**6, 10**7 - 1)}"
+    lines = ["amazon.com", f"Order # {order}", f"Shipped on {_MONTHS[d.month - 1]} {d.day}, {d.year}", ""]
+    lines += [(n, "$" + _money(p)) for n, p in items]
+    lines += ["", ("Item(s) Subtotal:", "$" + _money(sub)), ("Estimated tax:", "$" + _money(tax)),
+              ("Grand Total:", "$" + _money(sub + tax))]
+    return lines, GroundTruth("Amazon", "Amazon", order, d.isoformat(), round(sub + tax, 2), tax, sub,
+                              [{"Item": n, "Price": p} for n, p in items])
+
+
+def _wirral(rng, d):
+    items = _basket(rng, 2, 5)
+    sub = round(sum(p for _, p in items), 2)
+    tax = round(sub * 0.2, 2)
+    bill = f"WSS{rng.randint(10000, 99999)}"
+    lines = ["Wirral School Shops", "Uniform & Supplies", f"{d:%Y-%m-%d}", f"Receipt No: {bill}", ""]
+    lines += [(n, _money(p)) for n, p in items]
+    lines += ["", ("Subtotal", _money(sub)), ("Tax", _money(tax)), ("Total Amount", _money(sub + tax))]
+    return lines, GroundTruth("Wirral School Shops", "Wirral School Shops", bill, d.isoformat(),
+                              round(sub + tax, 2), tax, sub, [{"Item": n, "Price": p} for n, p in items])
+
+
+def _melaka(rng, d):
+    items = _basket(rng, 2, 6)
+    sub = round(sum(p for _, p in items), 2)
+    tax = round(sub * 0.06, 2)
+    bill = f"M{rng.randint(100000, 999999)}"
+    lines = ["MELAKA RESTAURANT", "Jalan Hang Jebat, Melaka", f"Bill No: {bill}", f"Date: {d:%d/%m/%Y}", ""]
+    lines += [(n, _money(p)) for n, p in items]
+    lines += ["", ("Subtotal:", _money(sub)), ("SST 6%", _money(tax)), ("Grand Total:", _money(sub + tax))]
+    return lines, GroundTruth("Melaka Layout", "Melaka Layout", bill, d.isoformat(), round(sub + tax, 2), tax,
+                              sub, [{"Item": n, "Price": p} for n, p in items])
+
+
+def _generic_gst(rng, d):
+    vendor = rng.choice(["DMART AVENUE SUPERMARTS", "RELIANCE FRESH", "APOLLO PHARMACY", "CAFE COFFEE DAY"])
+    items = [(n, round(p * 10, 2)) for n, p in _basket(rng)]
+    sub = round(sum(p for _, p in items), 2)
+    half = round(sub * 0.025, 2)
+    bill = f"{rng.randint(1000, 9999)}-{rng.randint(100, 999)}"
+    lines = [vendor, "TAX INVOICE", f"Bill No: {bill}", f"Date: {d:%d/%m/%Y}", ""]
+    lines += [(n, _money(p)) for n, p in items]
+    lines += ["", ("Sub Total", _money(sub)), ("CGST 2.5%", _money(half)), ("SGST 2.5%", _money(half)),
+              ("Grand Total", _money(sub + 2 * half))]
+    return lines, GroundTruth("Generic GST", vendor, bill, d.isoformat(), round(sub + 2 * half, 2),
+                              round(2 * half, 2), sub, [{"Item": n, "Price": p} for n, p in items])
+
+
+LAYOUTS: Dict[str, Callable] = {
+    "Walmart": _walmart,
+    "Target": _target,
+    "Costco": _costco,
+    "Amazon": _amazon,
+    "Wirral School Shops": _wirral,
+    "Melaka Layout": _melaka,
+    "Generic GST": _generic_gst,
+}
+
+
+# ================= RENDERING =================
+def _font(size: int):
+    for name in ("DejaVuSansMono.ttf", "LiberationMono-Regular.ttf", "Courier New.ttf", "cour.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def render_receipt(lines: List[Line], width: int = 576, font_size: int = 22) -> Image.Image:
+    """Renders receipt lines on thermal-paper width; tuples are (label, right-aligned amount)."""
+    font = _font(font_size)
+    line_h = int(font_size * 1.45)
+    margin = font_size
+    img = Image.new("L", (width, margin * 2 + line_h * len(lines)), 250)
+    draw = ImageDraw.Draw(img)
+    y = margin
+    for line in lines:
+        if isinstance(line, tuple):
+            label, amount = line
+            draw.text((margin, y), label, fill=15, font=font)
+            draw.text((width - margin - draw.textlength(amount, font=font), y), amount, fill=15, font=font)
+        elif line:
+            # Header / footer lines are centred, like on real receipts
+            draw.text(((width - draw.textlength(line, font=font)) / 2, y), line, fill=15, font=font)
+        y += line_h
+    return img
+
+
+def degrade(img: Image.Image, rng: random.Random, strength: float = 1.0) -> Tuple[Image.Image, Dict]:
+    """
+    Photographs the receipt: places it on a darker background with a random
+    rotation and perspective, then adds blur and sensor noise. strength 0
+    returns a clean scan.
+    """
+    info = {"rotation": 0.0, "perspective": 0.0, "blur": 0.0, "noise": 0.0}
+    if strength <= 0:
+        return img, info
+
+    info["rotation"] = round(rng.uniform(-6, 6) * strength, 2)
+    info["perspective"] = round(rng.uniform(0, 0.06) * strength, 3)
+    info["blur"] = round(rng.uniform(0, 1.2) * strength, 2)
+    info["noise"] = round(rng.uniform(2, 10) * strength, 1)
+
+    w, h = img.size
+    pad = int(max(w, h) * 0.15)
+    background = rng.randint(60, 120)
+    canvas = Image.new("L", (w + 2 * pad, h + 2 * pad), background)
+    canvas.paste(img, (pad, pad))
+
+    # Perspective: pull the four corners of the paper inwards by random amounts
+    cw, ch = canvas.size
+    p = info["perspective"]
+    jitter = lambda: rng.uniform(0, p) * max(w, h)
+    src = [(pad - jitter(), pad - jitter()), (pad + w + jitter(), pad - jitter()),
+           (pad + w + jitter(), pad + h + jitter()), (pad - jitter(), pad + h + jitter())]
+    dst = [(pad, pad), (pad + w, pad), (pad + w, pad + h), (pad, pad + h)]
+    coeffs = _perspective_coeffs(dst, src)
+    canvas = canvas.transform((cw, ch), Image.PERSPECTIVE, coeffs, Image.BICUBIC, fillcolor=background)
+
+    canvas = canvas.rotate(info["rotation"], resample=Image.BICUBIC, expand=True, fillcolor=background)
+    if info["blur"]:
+        canvas = canvas.filter(ImageFilter.GaussianBlur(info["blur"]))
+
+    arr = np.asarray(canvas, dtype=np.float32)
+    noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, info["noise"], arr.shape)
+    return Image.fromarray(np.clip(arr + noise, 0, 255).astype(np.uint8)), info
+
+
+def _perspective_coeffs(dst, src):
+    # Solves the 8 PIL perspective coefficients mapping dst points onto src points
+    a = []
+    b = []
+    for (x, y), (u, v) in zip(dst, src):
+        a.append([x, y, 1, 0, 0, 0, -u * x, -u * y])
+        a.append([0, 0, 0, x, y, 1, -v * x, -v * y])
+        b += [u, v]
+    return np.linalg.solve(np.array(a, dtype=np.float64), np.array(b, dtype=np.float64)).tolist()
+
+
+def generate_lines(rng: random.Random, layout: str) -> Tuple[List[Line], GroundTruth]:
+    """One receipt of `layout` as printed lines, with its ground truth (no image)."""
+    d = date(2023, 1, 1) + timedelta(days=rng.randint(0, 730))
+    lines, truth = LAYOUTS[layout](rng, d)
+    truth.text = "\n".join(" ".join(line) if isinstance(line, tuple) else line for line in lines)
+    return lines, truth
+
+
+def generate(rng: random.Random, layout: str, strength: float = 1.0) -> Tuple[Image.Image, GroundTruth]:
+    """Renders one receipt of `layout` and returns (image, ground truth)."""
+    lines, truth = generate_lines(rng, layout)
+    img, truth.degradation = degrade(render_receipt(lines), rng, strength)
+    return img, truth
+
+
+def write_corpus(out_dir: str, count: int, seed: int = 1, strength: float = 1.0) -> List[Path]:
+    """Writes `count` receipts cycling through every layout; returns the image paths."""
+    rng = random.Random(seed)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    names = list(LAYOUTS)
+    paths = []
+    for i in range(count):
+        img, truth = generate(rng, names[i % len(names)], strength)
+        path = out / f"{i:04d}.png"
+        img.save(path)
+        path.with_suffix(".json").write_text(json.dumps(asdict(truth), indent=2))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic receipt corpus with ground truth.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=70)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--strength", type=float, default=1.0, help="degradation strength (0 = clean scans)")
+    args = parser.parse_args()
+    paths = write_corpus(args.out_dir, args.count, args.seed, args.strength)
+    print(f"Wrote {len(paths)} receipts to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
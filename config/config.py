@@ -24,6 +24,21 @@ os.makedirs(DATA_DIR, exist_ok=True)
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 POPPLER_PATH = r"C:\Users\p.pranitha\Downloads\Release-25.12.0-0\poppler-25.12.0\Library\bin"
 
+# Vendor template registry (JSON, or YAML with PyYAML installed); edits apply without a restart
+RECEIPT_TEMPLATES = os.getenv("RECEIPT_TEMPLATES", os.path.join(BASE_DIR, "ocr", "templates.json"))
+
+# Reorder the OCR cascade by learned per-template / per-quality success rates (ocr/engine_registry.py)
+OCR_ADAPTIVE_CASCADE = True
+
+# PP-OCR backend behind extract_text_paddle: "paddle" (PaddlePaddle) or "onnx" (onnxruntime)
+PADDLE_BACKEND = os.getenv("PADDLE_BACKEND", "paddle")
+# det.onnx / cls.onnx / rec.onnx + en_dict.txt exported from PP-OCR (see ocr/onnx_engine.py)
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(BASE_DIR, "models", "ppocr_onnx"))
+# Use the *_int8.onnx models written by `python -m ocr.onnx_engine quantize`
+ONNX_INT8 = os.getenv("ONNX_INT8", "0") == "1"
+# onnxruntime intra-op threads per session (0 = one per core)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
 # =========================================================
 # FILE UPLOAD CONFIGURATION
 # =========================================================
@@ -36,6 +51,12 @@ MAX_FILE_SIZE_MB = 10
 IMAGE_DPI = 300
 GRAYSCALE = True
 
+# =========================================================
+# BACKGROUND OCR WORKERS
+# =========================================================
+# Worker processes started for queued batch uploads (each keeps a warm OCR engine)
+OCR_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
 # =========================================================
 # ANALYTICS CONFIGURATION
 # =========================================================
@@ -75,6 +75,18 @@ def init_db():
     except sqlite3.OperationalError:
         pass
 
+    # Migration: Add ocr_source column (the OCR read a receipt was parsed from) if it doesn't exist
+    try:
+        db.execute("ALTER TABLE receipts ADD COLUMN ocr_source TEXT")
+    except sqlite3.OperationalError:
+        pass
+
+    # Migration: Add edited_fields column (fields the user corrected, kept by re-parses) if it doesn't exist
+    try:
+        db.execute("ALTER TABLE receipts ADD COLUMN edited_fields TEXT")
+    except sqlite3.OperationalError:
+        pass
+
     # Migration: Add budget column to users if it doesn't exist
     try:
         db.execute("ALTER TABLE users ADD COLUMN budget REAL DEFAULT 50000.0")
@@ -93,4 +105,87 @@ def init_db():
         """
     )
 
+    # ================= OCR JOB QUEUE =================
+    # Background extraction jobs, claimed with leases by worker processes
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ocr_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT NOT NULL,
+            user_email TEXT,
+            filename TEXT NOT NULL,
+            payload_path TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker_id TEXT,
+            lease_expires REAL,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON ocr_jobs(status, lease_expires)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON ocr_jobs(batch_id)")
+
+    # ================= OCR ENGINE STATS =================
+    # Outcome counters per cascade step, learned by ocr/engine_registry.py
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ocr_engine_stats (
+            template TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            step TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            successes INTEGER NOT NULL DEFAULT 0,
+            total_ms REAL NOT NULL DEFAULT 0.0,
+            PRIMARY KEY (template, bucket, step)
+        )
+        """
+    )
+
+    # ================= VENDOR CATEGORIES =================
+    # Categories learned from saved receipts (shared by all users) and from
+    # each user's edits, read by ocr/categories.py
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vendor_categories (
+            vendor_key TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            source TEXT NOT NULL DEFAULT 'saved',
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vendor_category_edits (
+            user_email TEXT NOT NULL,
+            vendor_key TEXT NOT NULL,
+            category TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (user_email, vendor_key)
+        )
+        """
+    )
+    # Migration: edits were once stored for every user; they count as saves now
+    db.execute("UPDATE vendor_categories SET source = 'saved' WHERE source = 'edited'")
+
+    # ================= VENDOR ALIASES =================
+    # Canonical vendor names and their variants, read by ocr/vendors.py
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vendor_aliases (
+            alias_key TEXT PRIMARY KEY,
+            canonical TEXT NOT NULL,
+            source TEXT NOT NULL DEFAULT 'saved',
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+
+    # WAL lets the UI read progress while workers write results
+    db.execute("PRAGMA journal_mode=WAL")
+
     db.commit()
\ No newline at end of file
@@ -0,0 +1,195 @@
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from database.db import get_db
+
+# ================= QUEUE SETTINGS =================
+# Uploaded files wait here until a worker picks them up
+SPOOL_DIR = Path("job_spool")
+# A claimed job is reclaimable once its lease lapses (worker crashed or hung)
+LEASE_SECONDS = 120
+# After this many claims a job is given up on
+MAX_ATTEMPTS = 3
+
+# queued → running → done | duplicate | conflict | failed   (running → queued on retry)
+# (conflict: another user's receipt holds the bill ID, so it was not stored)
+FINISHED_STATUSES = ("done", "duplicate", "conflict", "failed")
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+# ================= ENQUEUE =================
+def enqueue_job(batch_id: str, filename: str, content: bytes, user_email: Optional[str] = None) -> int:
+    """
+    Spools the file to disk and queues it for a background worker.
+    Returns the job id.
+    """
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    payload_path = SPOOL_DIR / f"{uuid.uuid4().hex}_{Path(filename).name}"
+    payload_path.write_bytes(content)
+
+    now = time.time()
+    db = get_db()
+    cur = db.execute(
+        """
+        INSERT INTO ocr_jobs (batch_id, user_email, filename, payload_path, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, 'queued', ?, ?)
+        """,
+        (batch_id, user_email, filename, str(payload_path), now, now),
+    )
+    db.commit()
+    return int(cur.lastrowid or 0)
+
+
+# ================= CLAIM / LEASE =================
+def claim_job(worker_id: str, lease_seconds: int = LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claims the oldest queued job, or a running job whose lease
+    expired, for `worker_id`. Jobs that already used MAX_ATTEMPTS claims are
+    marked failed instead. Returns the job row as a dict or None.
+    """
+    db = get_db()
+    while True:
+        now = time.time()
+        # IMMEDIATE takes the write lock up front so two workers never claim the same row
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                """
+                SELECT * FROM ocr_jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+                ORDER BY id LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+
+            if row is None:
+                db.commit()
+                return None
+
+            if row["attempts"] >= MAX_ATTEMPTS:
+                db.execute(
+                    "UPDATE ocr_jobs SET status = 'failed', error = ?, worker_id = NULL, updated_at = ? WHERE id = ?",
+                    (row["error"] or f"Gave up after {row['attempts']} attempts (worker lost)", now, row["id"]),
+                )
+                db.commit()
+                continue
+
+            db.execute(
+                """
+                UPDATE ocr_jobs
+                SET status = 'running', worker_id = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                """,
+                (worker_id, now + lease_seconds, now, row["id"]),
+            )
+            db.commit()
+
+            job = dict(row)
+            job.update(status="running", worker_id=worker_id, attempts=row["attempts"] + 1)
+            return job
+        except BaseException:
+            # Never leave the write lock held: every other worker would stall on it
+            db.rollback()
+            raise
+
+
+def renew_lease(job_id: int, worker_id: str, lease_seconds: int = LEASE_SECONDS) -> bool:
+    """Extends the lease of a job this worker still owns."""
+    now = time.time()
+    db = get_db()
+    cur = db.execute(
+        "UPDATE ocr_jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+        (now + lease_seconds, now, job_id, worker_id),
+    )
+    db.commit()
+    return cur.rowcount > 0
+
+
+# ================= FINISH =================
+def complete_job(job_id: int, worker_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None) -> bool:
+    """
+    Records a finished job. Ignored (returns False) when the lease was lost
+    and another worker now owns the job.
+    """
+    db = get_db()
+    cur = db.execute(
+        """
+        UPDATE ocr_jobs SET status = ?, result = ?, error = ?, lease_expires = NULL, updated_at = ?
+        WHERE id = ? AND worker_id = ? AND status = 'running'
+        """,
+        (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, worker_id),
+    )
+    db.commit()
+
+    if cur.rowcount:
+        row = db.execute("SELECT payload_path FROM ocr_jobs WHERE id = ?", (job_id,)).fetchone()
+        Path(row["payload_path"]).unlink(missing_ok=True)
+    return cur.rowcount > 0
+
+
+def fail_job(job_id: int, worker_id: str, error: str) -> None:
+    """Requeues a job after an unexpected error, or fails it for good after MAX_ATTEMPTS."""
+    db = get_db()
+    row = db.execute("SELECT attempts FROM ocr_jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return
+    if row["attempts"] >= MAX_ATTEMPTS:
+        complete_job(job_id, worker_id, "failed", error=error)
+        return
+    db.execute(
+        """
+        UPDATE ocr_jobs SET status = 'queued', error = ?, worker_id = NULL, lease_expires = NULL, updated_at = ?
+        WHERE id = ? AND worker_id = ? AND status = 'running'
+        """,
+        (error, time.time(), job_id, worker_id),
+    )
+    db.commit()
+
+
+# ================= PROGRESS =================
+def get_batch_progress(batch_id: str) -> Dict[str, Any]:
+    """Counts per status plus overall completion for one batch."""
+    db = get_db()
+    cur = db.execute("SELECT status, COUNT(*) AS n FROM ocr_jobs WHERE batch_id = ? GROUP BY status", (batch_id,))
+    counts = {r["status"]: r["n"] for r in cur.fetchall()}
+    total = sum(counts.values())
+    finished = sum(counts.get(s, 0) for s in FINISHED_STATUSES)
+    return {
+        "batch_id": batch_id,
+        "total": total,
+        "finished": finished,
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "duplicate": counts.get("duplicate", 0),
+        "conflict": counts.get("conflict", 0),
+        "failed": counts.get("failed", 0),
+        "complete": total > 0 and finished == total,
+    }
+
+
+def list_batch_jobs(batch_id: str) -> List[Dict[str, Any]]:
+    """All jobs of a batch with their decoded results, in upload order."""
+    db = get_db()
+    cur = db.execute(
+        "SELECT id, filename, status, attempts, result, error FROM ocr_jobs WHERE batch_id = ? ORDER BY id",
+        (batch_id,),
+    )
+    return [
+        {
+            "id": r["id"],
+            "filename": r["filename"],
+            "status": r["status"],
+            "attempts": r["attempts"],
+            "result": json.loads(r["result"]) if r["result"] else None,
+            "error": r["error"],
+        }
+        for r in cur.fetchall()
+    ]
@@ -0,0 +1,38 @@
+from typing import Dict, Iterable, Tuple
+
+from database.db import get_db
+
+# (template, bucket, step) -> (attempts, successes, total_ms)
+StatsKey = Tuple[str, str, str]
+Stats = Tuple[int, int, float]
+
+
+def load_engine_stats() -> Dict[StatsKey, Stats]:
+    """All cascade-step counters, keyed by (template, bucket, step)."""
+    rows = get_db().execute(
+        "SELECT template, bucket, step, attempts, successes, total_ms FROM ocr_engine_stats"
+    ).fetchall()
+    return {(r["template"], r["bucket"], r["step"]): (r["attempts"], r["successes"], r["total_ms"]) for r in rows}
+
+
+def record_engine_runs(runs: Iterable[Tuple[StatsKey, bool, float]]) -> None:
+    """Adds (key, success, ms) outcomes to the counters in one transaction."""
+    db = get_db()
+    db.executemany(
+        """
+        INSERT INTO ocr_engine_stats (template, bucket, step, attempts, successes, total_ms)
+        VALUES (?, ?, ?, 1, ?, ?)
+        ON CONFLICT (template, bucket, step) DO UPDATE SET
+            attempts = attempts + 1,
+            successes = successes + excluded.successes,
+            total_ms = total_ms + excluded.total_ms
+        """,
+        [(t, b, s, int(ok), ms) for (t, b, s), ok, ms in runs],
+    )
+    db.commit()
+
+
+def reset_engine_stats() -> None:
+    db = get_db()
+    db.execute("DELETE FROM ocr_engine_stats")
+    db.commit()
@@ -3,25 +3,32 @@ import streamlit as st
 from datetime import datetime
 from utils.notifications import send_email_alert, send_sms_alert
 from typing import List, Dict, Any, Optional
+from ocr.categories import get_category_cache
+from ocr.vendors import get_vendor_canonicalizer
 
 # ================= SAVE RECEIPT =================
 def save_receipt(data, user_email=None):
     """
     Save receipt to database.
     Assumes data = {
-        bill_id, vendor, date, amount, tax, subtotal
+        bill_id, vendor, date, amount, tax, subtotal, category[, ocr_source]
     }
     """
     # If user_email not provided, try to get from session state
     if not user_email:
         user_email = st.session_state.get("user_email")
 
+    # The user's own category edit for the vendor wins over the parsed one
+    edited = get_category_cache().edited(data["vendor"], user_email)
+    if edited:
+        data["category"] = edited
+
     db = get_db()
 
     db.execute(
         """
-        INSERT INTO receipts (bill_id, user_email, vendor, date, amount, tax, subtotal, category)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO receipts (bill_id, user_email, vendor, date, amount, tax, subtotal, category, ocr_source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             data["bill_id"],
@@ -32,15 +39,72 @@ def save_receipt(data, user_email=None):
             float(data["tax"]),
             float(data["subtotal"]),
             data["category"],
+            data.get("ocr_source"),
         ),
     )
     db.commit()
+    if not edited:
+        get_category_cache().learn([(data["vendor"], data["category"])])
+    get_vendor_canonicalizer().learn([data["vendor"]])
     
     # Check for budget alerts after saving if we have a user_email
     if user_email:
         check_budget_alerts(user_email)
 
 
+# ================= BULK SAVE =================
+def save_receipts_bulk(rows: List[Dict[str, Any]], user_email: Optional[str] = None) -> List[str]:
+    """
+    Saves many receipts in a single transaction (for headless ingestion).
+    Returns, per row, "saved", "duplicate" (the user already has a receipt
+    with this bill_id) or "conflict" (another user's receipt holds the
+    bill_id, so it could not be stored). Budget alerts are evaluated once,
+    after the commit.
+    """
+    cache = get_category_cache()
+    db = get_db()
+    statuses, edited = [], []
+    with db:
+        for data in rows:
+            # The user's own category edit for the vendor wins over the parsed one
+            category = cache.edited(data["vendor"], user_email)
+            if category:
+                data["category"] = category
+            edited.append(bool(category))
+            cur = db.execute(
+                """
+                INSERT OR IGNORE INTO receipts (bill_id, user_email, vendor, date, amount, tax, subtotal, category, ocr_source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    data["bill_id"],
+                    user_email,
+                    data["vendor"],
+                    data["date"],
+                    float(data["amount"]),
+                    float(data["tax"]),
+                    float(data["subtotal"]),
+                    data["category"],
+                    data.get("ocr_source"),
+                ),
+            )
+            if cur.rowcount == 1:
+                statuses.append("saved")
+            else:
+                owner = db.execute("SELECT 1 FROM receipts WHERE bill_id = ? AND user_email IS ?",
+                                   (data["bill_id"], user_email)).fetchone()
+                statuses.append("duplicate" if owner else "conflict")
+    saved = [data for data, status in zip(rows, statuses) if status == "saved"]
+    # Only categories the user did not set themselves are shared with other users
+    cache.learn((data["vendor"], data["category"])
+                for data, status, by_edit in zip(rows, statuses, edited) if status == "saved" and not by_edit)
+    get_vendor_canonicalizer().learn(data["vendor"] for data in saved)
+
+    if user_email and saved:
+        check_budget_alerts(user_email)
+    return statuses
+
+
 # ================= DUPLICATE CHECK (ROBUST) =================
 def check_receipt_duplicate(bill_id, vendor, date, amount):
     """
@@ -157,6 +221,14 @@ def update_receipt(bill_id: str, update_data: Dict[str, Any], user_email: str =
     
     if not fields:
         return False
+
+    old = db.execute("SELECT vendor, edited_fields FROM receipts WHERE bill_id = ? AND user_email = ?", (bill_id, user_email)).fetchone()
+
+    # Remembered so a re-parse (services/reparse.py) never undoes the edit
+    edited = set((old["edited_fields"] or "").split(",")) - {""} if old else set()
+    edited.update(key for key, value in update_data.items() if value is not None)
+    fields.append("edited_fields = ?")
+    values.append(",".join(sorted(edited)))
     
     values.append(bill_id)
     values.append(user_email)
@@ -164,6 +236,16 @@ def update_receipt(bill_id: str, update_data: Dict[str, Any], user_email: str =
     
     db.execute(query, values)
     db.commit()
+
+    # A corrected category teaches the vendor's category for the user's future receipts
+    if update_data.get("category"):
+        row = db.execute("SELECT vendor FROM receipts WHERE bill_id = ? AND user_email = ?", (bill_id, user_email)).fetchone()
+        if row:
+            get_category_cache().learn_edit(user_email, row["vendor"], update_data["category"])
+    # A corrected vendor is a known name like a saved one; it never becomes an
+    # alias, which would rename other users' receipts (that is the merge job's)
+    if update_data.get("vendor"):
+        get_vendor_canonicalizer().learn([update_data["vendor"]])
     return True
 
 
@@ -0,0 +1,41 @@
+import time
+from typing import Iterable, List, Tuple
+
+from database.db import get_db
+
+# Where an alias came from; a merge always overrides what a save registered
+SAVED = "saved"
+MERGED = "merged"
+
+
+def load_vendor_aliases() -> List[Tuple[str, str, str]]:
+    """(alias_key, canonical, source) for every alias, saved ones first, then merges in order."""
+    rows = get_db().execute(
+        "SELECT alias_key, canonical, source FROM vendor_aliases ORDER BY source = 'merged', updated_at"
+    ).fetchall()
+    return [(r["alias_key"], r["canonical"], r["source"]) for r in rows]
+
+
+def learn_vendor_aliases(pairs: Iterable[Tuple[str, str]], source: str = SAVED) -> None:
+    """Upserts (alias_key, canonical) pairs in one transaction."""
+    db = get_db()
+    now = time.time()
+    db.executemany(
+        """
+        INSERT INTO vendor_aliases (alias_key, canonical, source, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (alias_key) DO UPDATE SET
+            canonical = excluded.canonical,
+            source = excluded.source,
+            updated_at = excluded.updated_at
+        WHERE excluded.source = 'merged'
+        """,
+        [(key, canonical, source, now) for key, canonical in pairs],
+    )
+    db.commit()
+
+
+def reset_vendor_aliases() -> None:
+    db = get_db()
+    db.execute("DELETE FROM vendor_aliases")
+    db.commit()
@@ -0,0 +1,63 @@
+import time
+from typing import Dict, Iterable, Tuple
+
+from database.db import get_db
+
+# Where a learned category came from: saves are shared by all users, an
+# edit only applies to its user's receipts and wins over saves there
+SAVED = "saved"
+EDITED = "edited"
+
+
+def load_vendor_categories() -> Dict[str, Tuple[str, str]]:
+    """vendor_key -> (category, source) for every vendor learned from saves."""
+    rows = get_db().execute("SELECT vendor_key, category, source FROM vendor_categories").fetchall()
+    return {r["vendor_key"]: (r["category"], r["source"]) for r in rows}
+
+
+def learn_vendor_categories(pairs: Iterable[Tuple[str, str]], source: str = SAVED) -> None:
+    """Upserts (vendor_key, category) pairs in one transaction."""
+    db = get_db()
+    now = time.time()
+    db.executemany(
+        """
+        INSERT INTO vendor_categories (vendor_key, category, source, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (vendor_key) DO UPDATE SET
+            category = excluded.category,
+            source = excluded.source,
+            updated_at = excluded.updated_at
+        """,
+        [(key, category, source, now) for key, category in pairs],
+    )
+    db.commit()
+
+
+def load_category_edits() -> Dict[Tuple[str, str], str]:
+    """(user_email, vendor_key) -> category for every edited vendor."""
+    rows = get_db().execute("SELECT user_email, vendor_key, category FROM vendor_category_edits").fetchall()
+    return {(r["user_email"], r["vendor_key"]): r["category"] for r in rows}
+
+
+def learn_category_edits(user_email: str, pairs: Iterable[Tuple[str, str]]) -> None:
+    """Upserts the user's (vendor_key, category) edits in one transaction."""
+    db = get_db()
+    now = time.time()
+    db.executemany(
+        """
+        INSERT INTO vendor_category_edits (user_email, vendor_key, category, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_email, vendor_key) DO UPDATE SET
+            category = excluded.category,
+            updated_at = excluded.updated_at
+        """,
+        [(user_email, key, category, now) for key, category in pairs],
+    )
+    db.commit()
+
+
+def reset_vendor_categories() -> None:
+    db = get_db()
+    db.execute("DELETE FROM vendor_categories")
+    db.execute("DELETE FROM vendor_category_edits")
+    db.commit()
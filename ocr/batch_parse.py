@@ -0,0 +1,111 @@
+"""
+Parsing many OCR reads at once, across a process pool.
+
+parse_receipt is pure CPU, so re-parsing a corpus scales with cores. Reads
+are dispatched in chunks (one pickle round-trip per chunk, not per receipt)
+and results come back in input order. A read is either plain text or an
+OcrResult, whose token boxes enable layout-aware parsing; stored reads
+(receipts.ocr_source) can be passed as their JSON and are decoded in the
+worker.
+
+    outcomes = parse_receipts_batch(texts, workers=8)
+
+Each outcome is (data | None, items, error | None); a receipt that fails to
+parse never stops the batch.
+"""
+import multiprocessing as mp
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ocr.ocr_result import OcrResult
+from ocr.text_parser import parse_receipt
+
+# Plain text, an OcrResult, or {"ocr_source": <OcrResult JSON>}
+ParseInput = Union[str, OcrResult, Dict[str, str]]
+ParseOutcome = Tuple[Optional[Dict[str, Any]], List[dict], Optional[str]]
+
+# Reads per dispatched chunk; large enough to amortise IPC, small enough to balance load
+DEFAULT_CHUNK = 64
+# Below this many reads a pool costs more than it saves
+_INLINE_BELOW = 200
+
+
+def parse_one(source: ParseInput) -> ParseOutcome:
+    """Parses one read; never raises."""
+    try:
+        if isinstance(source, dict):
+            source = OcrResult.from_json(source["ocr_source"])
+        if isinstance(source, OcrResult):
+            data, items = parse_receipt(source.text, layout=source)
+        else:
+            data, items = parse_receipt(source)
+        return data, items, None
+    except Exception as e:
+        return None, [], f"Receipt parsing error: {e}"
+
+
+def _parse_chunk(chunk: List[ParseInput]) -> List[ParseOutcome]:
+    return [parse_one(s) for s in chunk]
+
+
+def _chunks(sources: Iterable[ParseInput], size: int) -> Iterator[List[ParseInput]]:
+    chunk: List[ParseInput] = []
+    for s in sources:
+        chunk.append(s)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ParsePool:
+    """
+    A pool of parser processes kept warm across calls (a backfill parses
+    chunk after chunk). Use as a context manager.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk: int = DEFAULT_CHUNK):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk = chunk
+        self._pool = None
+        if self.workers > 1:
+            self._pool = mp.get_context("spawn").Pool(self.workers)
+
+    def iter_parse(self, sources: Iterable[ParseInput]) -> Iterator[ParseOutcome]:
+        """Outcomes in input order, streamed as chunks complete."""
+        if self._pool is None:
+            yield from map(parse_one, sources)
+            return
+        for outcomes in self._pool.imap(_parse_chunk, _chunks(sources, self.chunk)):
+            yield from outcomes
+
+    def parse(self, sources: Iterable[ParseInput]) -> List[ParseOutcome]:
+        return list(self.iter_parse(sources))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._pool is not None and exc[0] is not None:
+            self._pool.terminate()
+        self.close()
+
+
+def parse_receipts_batch(sources: Iterable[ParseInput], workers: Optional[int] = None,
+                         chunk: int = DEFAULT_CHUNK) -> List[ParseOutcome]:
+    """
+    Parses every read with `workers` processes (default: one per core) and
+    returns the outcomes in input order. Small batches are parsed inline.
+    """
+    sources = list(sources)
+    if len(sources) < _INLINE_BELOW:
+        workers = 1
+    with ParsePool(workers, chunk) as pool:
+        return pool.parse(sources)
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+from PIL import Image
+from typing import Dict, Optional
+
+from utils.helpers import lap
+
+# Longest side of the copy used to look for the receipt outline
+_DETECT_SIDE = 500
+# A candidate outline must cover this fraction of the photo (too small: a
+# label or logo; too large: the image already is a flat scan)
+_MIN_AREA_RATIO = 0.10
+_MAX_AREA_RATIO = 0.95
+
+
+def order_points(pts: np.ndarray) -> np.ndarray:
+    """Orders four points as top-left, top-right, bottom-right, bottom-left."""
+    pts = pts.reshape(4, 2).astype(np.float32)
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+
+def _quad_from_mask(mask: np.ndarray) -> Optional[np.ndarray]:
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    image_area = mask.shape[0] * mask.shape[1]
+    contour = max(contours, key=cv2.contourArea)
+    area_ratio = cv2.contourArea(contour) / image_area
+    if not (_MIN_AREA_RATIO <= area_ratio <= _MAX_AREA_RATIO):
+        return None
+
+    # Prefer a true 4-corner outline; fall back to the tightest rotated box
+    approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+    if len(approx) == 4 and cv2.isContourConvex(approx):
+        return approx.reshape(4, 2).astype(np.float32)
+    return cv2.boxPoints(cv2.minAreaRect(contour)).astype(np.float32)
+
+
+def find_receipt_quad(gray: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Finds the receipt outline in a photo and returns its four corners
+    (top-left, top-right, bottom-right, bottom-left) in `gray` coordinates,
+    or None when no paper-like region stands out from the background.
+    """
+    (h, w) = gray.shape[:2]
+    f = min(1.0, _DETECT_SIDE / max(h, w))
+    small = cv2.resize(gray, None, fx=f, fy=f, interpolation=cv2.INTER_AREA) if f < 1.0 else gray
+    small = cv2.GaussianBlur(small, (5, 5), 0)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9))
+
+    # 1. Paper is usually the brightest large region: Otsu, then close over the print
+    _, bright = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    quad = _quad_from_mask(cv2.morphologyEx(bright, cv2.MORPH_CLOSE, kernel))
+
+    # 2. Low-contrast backgrounds: fall back to the strongest closed edge
+    if quad is None:
+        edges = cv2.Canny(small, 50, 150)
+        quad = _quad_from_mask(cv2.dilate(edges, kernel))
+
+    if quad is None:
+        return None
+    return order_points(quad / f)
+
+
+def four_point_warp(img: np.ndarray, quad: np.ndarray) -> np.ndarray:
+    """Perspective-warps the region inside `quad` to an upright rectangle."""
+    (tl, tr, br, bl) = quad
+    width = int(max(np.linalg.norm(br - bl), np.linalg.norm(tr - tl)))
+    height = int(max(np.linalg.norm(tr - br), np.linalg.norm(tl - bl)))
+    dst = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(quad, dst)
+    return cv2.warpPerspective(img, M, (width, height), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+def crop_receipt(pil_image: Image.Image, timings: Optional[Dict[str, float]] = None) -> Image.Image:
+    """
+    Crops a photo down to the receipt itself (perspective-corrected).
+    Returns the image unchanged when no outline is found.
+    """
+    t = lap(timings, None)
+    img = np.array(pil_image.convert("RGB"))
+    quad = find_receipt_quad(cv2.cvtColor(img, cv2.COLOR_RGB2GRAY))
+    t = lap(timings, "detect_ms", t)
+    if quad is None:
+        return pil_image
+
+    cropped = Image.fromarray(four_point_warp(img, quad))
+    lap(timings, "warp_ms", t)
+    return cropped
@@ -0,0 +1,183 @@
+"""
+Receipt categorization.
+
+A vendor the user has saved or corrected before gets its learned category
+(one dict lookup). Everything else goes through the keyword rules: all
+keywords of all categories are compiled into one trie-shaped regex,
+re-searched from one character past each hit so overlapping keywords are
+all seen, and the first category in CATEGORY_KEYWORDS order with a keyword
+in the vendor name (else in the text) wins.
+
+Learned categories live in the vendor_categories table, shared by the app
+and the worker processes. A receipt's own save teaches its vendor for every
+user. An edit of its category is kept per user (vendor_category_edits): it
+wins over saves for that user's receipts and never touches anyone else's.
+
+    python -m services.recategorize --dry-run   # re-apply the rules to stored receipts
+"""
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from utils.helpers import trie_pattern
+
+UNCATEGORIZED = "Uncategorized"
+# Learned categories written by other processes are picked up this often
+_REFRESH_SECONDS = 60
+
+# Earlier categories win when keywords of several are present
+CATEGORY_KEYWORDS = {
+    "Utility": ["power", "electricity", "water", "gas", "bescom", "tata power", "bill", "supply", "electric", "broadband", "mobile", "recharge"],
+    "Food": ["restaurant", "cafe", "kitchen", "hotel", "dining", "burger", "pizza", "swiggy", "zomato", "coffee", "tea", "bistro", "foods", "bakery", "canteen"],
+    "Grocery": ["mart", "super market", "fresh", "store", "vegetable", "fruit", "market", "grocer", "kirana", "basket", "reliance", "dmart", "bigbasket"],
+    "Medical": ["pharmacy", "hospital", "clinic", "doctor", "dr.", "medplus", "apollo", "pharma", "health", "medical", "diagnostic", "lab"],
+    "Travel": ["fuel", "petrol", "diesel", "station", "pump", "uber", "ola", "rapido", "ride", "trip", "travel", "fastag", "toll"],
+    "Shopping": ["retail", "fashion", "clothing", "trends", "zudio", "apparel", "garment", "mall", "shoe", "footwear", "lifestyle", "westside", "hm", "zara", "school shop"],
+    "Entertainment": ["movie", "cinema", "theatre", "show", "entertainment", "game", "fun", "club", "resort"]
+}
+
+_CATEGORIES = list(CATEGORY_KEYWORDS)
+# keyword -> rank of its best category. The automaton reports the longest
+# keyword starting at each position, so a keyword also carries the rank of
+# any shorter keyword it starts with ("pharmacy" -> "pharma").
+_KEYWORD_RANK: Dict[str, int] = {}
+for _rank, _keywords in enumerate(CATEGORY_KEYWORDS.values()):
+    for _kw in _keywords:
+        _KEYWORD_RANK.setdefault(_kw, _rank)
+_KEYWORD_RANK = {kw: min(r for p, r in _KEYWORD_RANK.items() if kw.startswith(p)) for kw in _KEYWORD_RANK}
+_KEYWORDS = re.compile(trie_pattern(_KEYWORD_RANK))
+
+
+def keyword_category(text: str) -> Optional[str]:
+    """The first category with a keyword anywhere in `text`, or None."""
+    text = text.lower()
+    best = None
+    m = _KEYWORDS.search(text)
+    while m:
+        rank = _KEYWORD_RANK[m.group(0)]
+        if best is None or rank < best:
+            best = rank
+            if best == 0:
+                break
+        m = _KEYWORDS.search(text, m.start() + 1)
+    return None if best is None else _CATEGORIES[best]
+
+
+def vendor_key(vendor: Optional[str]) -> str:
+    """Normalised vendor name the learned categories are keyed by ('' if unusable)."""
+    key = " ".join(re.sub(r"[^0-9a-z]+", " ", (vendor or "").lower()).split())
+    return "" if key == "unknown vendor" else key
+
+
+# ================= LEARNED VENDOR CATEGORIES =================
+class VendorCategoryCache:
+    """Learned vendor -> category maps (saves, and each user's edits) with a write-through SQLite store."""
+
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        # vendor_key -> (category, source), learned from every user's saves
+        self._learned: Dict[str, Tuple[str, str]] = {}
+        # (user_email, vendor_key) -> category the user set by editing a receipt
+        self._edits: Dict[Tuple[str, str], str] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self, force: bool = False) -> None:
+        if not self.persist or (not force and time.time() - self._loaded_at < _REFRESH_SECONDS):
+            return
+        from database.vendor_categories import load_category_edits, load_vendor_categories
+        try:
+            self._learned = load_vendor_categories()
+            self._edits = load_category_edits()
+        except sqlite3.OperationalError as e:
+            # No vendor_categories tables (init_db not run): learn in memory only
+            print(f"Vendor categories unavailable ({e}); not persisting")
+            self.persist = False
+        self._loaded_at = time.time()
+
+    def entry(self, vendor: Optional[str], user_email: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(category, source) learned for `vendor`, `user_email`'s own edit first; or None."""
+        from database.vendor_categories import EDITED
+
+        edit = self.edited(vendor, user_email)
+        if edit:
+            return edit, EDITED
+        key = vendor_key(vendor)
+        if not key:
+            return None
+        with self._lock:
+            self._refresh()
+            return self._learned.get(key)
+
+    def lookup(self, vendor: Optional[str], user_email: Optional[str] = None) -> Optional[str]:
+        entry = self.entry(vendor, user_email)
+        return entry[0] if entry else None
+
+    def edited(self, vendor: Optional[str], user_email: Optional[str]) -> Optional[str]:
+        """The category `user_email` set for `vendor` by editing a receipt, or None."""
+        key = vendor_key(vendor)
+        if not key or not user_email:
+            return None
+        with self._lock:
+            self._refresh()
+            return self._edits.get((user_email, key))
+
+    def learn(self, pairs: Iterable[Tuple[Optional[str], Optional[str]]]) -> None:
+        """Remembers (vendor, category) pairs of saved receipts, for every user."""
+        from database.vendor_categories import SAVED
+
+        learned = []
+        with self._lock:
+            for vendor, category in pairs:
+                key = vendor_key(vendor)
+                if not key or not category or category == UNCATEGORIZED:
+                    continue
+                self._learned[key] = (category, SAVED)
+                learned.append((key, category))
+        if learned and self.persist:
+            from database.vendor_categories import learn_vendor_categories
+            try:
+                learn_vendor_categories(learned, SAVED)
+            except sqlite3.Error as e:
+                print(f"Could not persist vendor categories: {e}")
+
+    def learn_edit(self, user_email: Optional[str], vendor: Optional[str], category: Optional[str]) -> None:
+        """Remembers a category `user_email` set by editing a receipt; it only applies to their receipts."""
+        key = vendor_key(vendor)
+        if not user_email or not key or not category or category == UNCATEGORIZED:
+            return
+        with self._lock:
+            self._edits[(user_email, key)] = category
+        if self.persist:
+            from database.vendor_categories import learn_category_edits
+            try:
+                learn_category_edits(user_email, [(key, category)])
+            except sqlite3.Error as e:
+                print(f"Could not persist vendor categories: {e}")
+
+    def reload(self) -> None:
+        with self._lock:
+            self._refresh(force=True)
+
+
+_cache: Optional[VendorCategoryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_category_cache() -> VendorCategoryCache:
+    """The process-wide cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VendorCategoryCache()
+        return _cache
+
+
+def categorize(text: str, vendor: Optional[str]) -> str:
+    """Learned category of the vendor, else the keyword rules on the vendor name, then the text."""
+    return (get_category_cache().lookup(vendor)
+            or keyword_category(vendor or "")
+            or keyword_category(text)
+            or UNCATEGORIZED)
@@ -0,0 +1,146 @@
+"""
+Date extraction: one engine for every date the parser reads.
+
+All supported layouts are alternatives of a single compiled pattern, so a
+text is scanned once whatever its format:
+
+    2024-03-14  2024/3/14             year first (always Y-M-D)
+    14/03/2024  14-03-24  14.03.2024  numeric, day or month first
+    14 Mar 2024  14-Mar-24  14th March, 2024  14 Mac 2024 (Malay)
+    March 14, 2024  Mar 14 2024  mars 14 2024
+
+A match is validated arithmetically (month 1-12, the month's day count,
+leap years) instead of by calling strptime and catching ValueError, and an
+invalid candidate ("31/02/2024", an order number) just moves the scan to
+the next one. Numeric dates are read day first (Indian and European
+receipts) unless `day_first` is False (US templates); a part above 12
+settles the order either way. Two-digit years are 20xx up to next year and
+19xx beyond, and nothing before 1970 is a receipt date. Tokens repeat
+across receipts (a store prints the same date on every receipt of a day),
+so normalized tokens are memoized.
+"""
+import re
+from datetime import date as _date
+from typing import Dict, Optional, Tuple
+
+from utils.helpers import trie_pattern
+
+# Month names and abbreviations: English, Malay, French, German, Spanish
+# (lower-case, accents included; an entry listed twice maps to one month)
+_MONTHS: Dict[str, int] = {}
+for _month, _names in enumerate([
+    ("january", "jan", "januari", "janvier", "janv", "januar", "jän", "enero", "ene"),
+    ("february", "feb", "febr", "februari", "février", "fevrier", "févr", "fevr", "februar", "febrero"),
+    ("march", "mar", "mac", "mars", "märz", "marz", "mär", "marzo"),
+    ("april", "apr", "avril", "avr", "abril", "abr"),
+    ("may", "mei", "mai", "mayo"),
+    ("june", "jun", "juin", "juni", "junio"),
+    ("july", "jul", "julai", "juillet", "juil", "juli", "julio"),
+    ("august", "aug", "ogos", "ogo", "août", "aout", "agosto", "ago"),
+    ("september", "sep", "sept", "septembre", "septiembre", "setiembre"),
+    ("october", "oct", "oktober", "okt", "octobre", "octubre"),
+    ("november", "nov", "novembre", "noviembre"),
+    ("december", "dec", "disember", "dis", "décembre", "decembre", "déc", "dezember", "dez", "diciembre", "dic"),
+], start=1):
+    for _name in _names:
+        _MONTHS[_name] = _month
+
+_MONTH = trie_pattern(_MONTHS)
+_DAY_SUFFIX = r"(?:st|nd|rd|th|er|\.)?"
+
+# Texts are lower-cased before the scan. A digit, or the letter o that OCR
+# reads for a zero ("O3/19/23").
+_D = r"[\do]"
+_ZEROS = str.maketrans("o", "0")
+# Only positions holding a digit or a month's first letter can start a date
+_STARTS = "".join(sorted({name[0] for name in _MONTHS}))
+
+# A two-digit year never follows a bare day and a dot: "Dec 20.00" is a
+# month word and a price
+_YEAR = rf"{_D}{{4}}|(?<!{_D}\.){_D}{{2}}"
+
+# Never starts inside a number ("417-77235..." is an order number) and never
+# ends inside one, nor on the start of a price ("Mayo 1 20.00" is no
+# date); each layout is a named alternative.
+_DATE = re.compile(
+    rf"(?=[\d{_STARTS}o])(?:"
+    rf"(?<!{_D})(?<!\d[./-])(?:"
+    rf"(?P<iso_y>{_D}{{4}})(?P<iso_sep>[-/.])(?P<iso_m>{_D}{{1,2}})(?P=iso_sep)(?P<iso_d>{_D}{{1,2}})(?!\d)"
+    rf"|(?P<num_a>{_D}{{1,2}})(?P<num_sep>[-/.])(?P<num_b>{_D}{{1,2}})(?P=num_sep)(?P<num_y>{_D}{{4}}|{_D}{{2}})"
+    rf"(?!\d|[./-]\d)"
+    rf"|(?P<dm_d>{_D}{{1,2}}){_DAY_SUFFIX}[\s./-]{{0,2}}(?P<dm_m>{_MONTH})\.?(?![a-z])[\s,./-]{{0,3}}'?"
+    rf"(?P<dm_y>{_YEAR})(?!\d|[.,]\d))"
+    rf"|\b(?P<md_m>{_MONTH})\.?(?![a-z])[\s./-]{{1,2}}(?P<md_d>{_D}{{1,2}}){_DAY_SUFFIX},?[\s./-]{{1,3}}'?"
+    rf"(?P<md_y>{_YEAR})(?!\d|[.,]\d)"
+    r")"
+)
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Earlier "dates" are times or codes ("12.30.45" is no 1945 receipt)
+_MIN_YEAR = 1970
+# Two-digit years up to this one are 20xx (next year's, at import)
+_PIVOT = (_date.today().year + 1) % 100
+_MEMO_SIZE = 10_000
+_memo: Dict[Tuple[str, bool], Optional[str]] = {}
+
+
+def _int(raw: str) -> int:
+    return int(raw.translate(_ZEROS))
+
+
+def _year(raw: str) -> int:
+    year = _int(raw)
+    if len(raw) == 2:
+        year += 2000 if year <= _PIVOT else 1900
+    return year
+
+
+def _iso(year: int, month: int, day: int) -> Optional[str]:
+    """'YYYY-MM-DD', or None if there is no such day."""
+    if not 1 <= month <= 12 or day < 1 or not _MIN_YEAR <= year <= 2999:
+        return None
+    leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day > _DAYS_IN_MONTH[month] + leap:
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _normalize(m: "re.Match[str]", day_first: bool) -> Optional[str]:
+    # Each alternative closes on a different group
+    layout = m.lastgroup
+    if layout == "iso_d":
+        year, month, day = m.group("iso_y", "iso_m", "iso_d")
+        return _iso(_int(year), _int(month), _int(day))
+    if layout == "num_y":
+        a, b = _int(m.group("num_a")), _int(m.group("num_b"))
+        # A part above 12 can only be the day
+        if a > 12 or (day_first and b <= 12):
+            a, b = b, a
+        return _iso(_year(m.group("num_y")), a, b)
+    if layout == "dm_y":
+        day, month, year = m.group("dm_d", "dm_m", "dm_y")
+    else:
+        month, day, year = m.group("md_m", "md_d", "md_y")
+    return _iso(_year(year), _MONTHS[month], _int(day))
+
+
+def _cached(m: "re.Match[str]", day_first: bool) -> Optional[str]:
+    key = (m.group(0), day_first)
+    if key in _memo:
+        return _memo[key]
+    iso = _normalize(m, day_first)
+    if len(_memo) >= _MEMO_SIZE:
+        _memo.clear()
+    _memo[key] = iso
+    return iso
+
+
+def find_date(text: Optional[str], day_first: bool = True) -> Optional[str]:
+    """The first valid date in `text` as 'YYYY-MM-DD', or None."""
+    if not text:
+        return None
+    for m in _DATE.finditer(text.lower()):
+        iso = _cached(m, day_first)
+        if iso:
+            return iso
+    return None
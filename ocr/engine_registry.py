@@ -0,0 +1,182 @@
+"""
+Adaptive ordering of the OCR cascade.
+
+Every cascade step (engine + preprocessing mode) has a success rate and a
+mean cost per vendor template and image-quality bucket (ocr/quality.py).
+Trying steps in ascending cost / success-rate order minimises the expected
+time to an accepted read, so layouts that always end up needing "advanced" or
+PaddleOCR stop paying for the passes that fail on them first.
+
+Estimates are smoothed hierarchically (built-in prior → all traffic → the
+quality bucket → template within the bucket), so a new template starts from
+what its bucket does and moves away as evidence accumulates. Counters live
+in the ocr_engine_stats table, shared by the app and the worker processes.
+
+    python -m ocr.engine_registry          # print the learned statistics
+"""
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import OCR_ADAPTIVE_CASCADE
+
+# Wildcard template / bucket: statistics over all of them
+ANY = "*"
+# Weight of the parent estimate, in pseudo-observations
+_PRIOR_WEIGHT = 5
+# Counters written by other processes are picked up this often
+_REFRESH_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class CascadeStep:
+    """One engine + preprocessing mode the cascade can try."""
+    engine: str
+    mode: str
+    # Used until real traffic has been observed; chosen so the untrained
+    # order is the historical simple → advanced → original → PaddleOCR
+    prior_success: float
+    prior_ms: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.engine}:{self.mode}"
+
+
+STEPS: List[CascadeStep] = [
+    CascadeStep("tesseract", "simple", 0.60, 800.0),
+    CascadeStep("tesseract", "advanced", 0.55, 1500.0),
+    CascadeStep("tesseract", "original", 0.30, 900.0),
+    CascadeStep("paddle", "original", 0.70, 4000.0),
+]
+
+
+@dataclass
+class StepEstimate:
+    step: CascadeStep
+    success: float
+    ms: float
+    attempts: int
+
+    @property
+    def ms_per_success(self) -> float:
+        return self.ms / max(self.success, 0.01)
+
+
+class EngineRegistry:
+    """Learned cascade statistics with a write-through SQLite store."""
+
+    def __init__(self, persist: bool = True, adaptive: bool = OCR_ADAPTIVE_CASCADE):
+        self.persist = persist
+        self.adaptive = adaptive
+        self._stats: Dict[Tuple[str, str, str], Tuple[int, int, float]] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- storage ----------
+    def _refresh(self) -> None:
+        if not self.persist or time.time() - self._loaded_at < _REFRESH_SECONDS:
+            return
+        from database.ocr_stats import load_engine_stats
+        try:
+            self._stats = load_engine_stats()
+        except sqlite3.OperationalError as e:
+            # No ocr_engine_stats table (init_db not run): learn in memory only
+            print(f"OCR engine stats unavailable ({e}); not persisting")
+            self.persist = False
+        self._loaded_at = time.time()
+
+    # ---------- estimates ----------
+    def _keys(self, template: str, bucket: str) -> List[Tuple[str, str]]:
+        keys = [(ANY, ANY), (ANY, bucket)]
+        if template != ANY:
+            keys.append((template, bucket))
+        return keys
+
+    def estimate(self, step: CascadeStep, template: str = ANY, bucket: str = ANY) -> StepEstimate:
+        p, ms, n = step.prior_success, step.prior_ms, 0
+        with self._lock:
+            for key in self._keys(template, bucket):
+                n, s, total = self._stats.get((*key, step.name), (0, 0, 0.0))
+                p = (s + _PRIOR_WEIGHT * p) / (n + _PRIOR_WEIGHT)
+                ms = (total + _PRIOR_WEIGHT * ms) / (n + _PRIOR_WEIGHT)
+        return StepEstimate(step=step, success=p, ms=ms, attempts=n)
+
+    def plan(self, template: str = ANY, bucket: str = ANY,
+             steps: Optional[List[CascadeStep]] = None) -> List[CascadeStep]:
+        """Steps in the order that minimises the expected time to an accepted read."""
+        steps = list(STEPS if steps is None else steps)
+        if not self.adaptive:
+            return steps
+        with self._lock:
+            self._refresh()
+        return sorted(steps, key=lambda s: self.estimate(s, template, bucket).ms_per_success)
+
+    def record(self, template: str, bucket: str, outcomes: List[Tuple[str, bool, float]]) -> None:
+        """Adds one cascade's (step name, accepted, ms) outcomes."""
+        if not self.adaptive or not outcomes:
+            return
+        runs = [((t, b, name), ok, ms) for t, b in self._keys(template, bucket) for name, ok, ms in outcomes]
+        with self._lock:
+            for key, ok, ms in runs:
+                n, s, total = self._stats.get(key, (0, 0, 0.0))
+                self._stats[key] = (n + 1, s + int(ok), total + ms)
+        if self.persist:
+            from database.ocr_stats import record_engine_runs
+            try:
+                record_engine_runs(runs)
+            except sqlite3.Error as e:
+                print(f"Could not persist OCR engine stats: {e}")
+
+    # ---------- inspection ----------
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Observed counters with the smoothed estimates and each key's current order."""
+        with self._lock:
+            self._loaded_at = 0.0
+            self._refresh()
+            keys = sorted({(t, b) for t, b, _ in self._stats})
+        rows = []
+        for template, bucket in keys:
+            for rank, step in enumerate(self.plan(template, bucket), start=1):
+                est = self.estimate(step, template, bucket)
+                n, s, total = self._stats.get((template, bucket, step.name), (0, 0, 0.0))
+                rows.append({
+                    "template": template,
+                    "bucket": bucket,
+                    "rank": rank,
+                    "step": step.name,
+                    "attempts": n,
+                    "success_rate": round(s / n, 3) if n else None,
+                    "mean_ms": round(total / n, 1) if n else None,
+                    "est_success": round(est.success, 3),
+                    "est_ms_per_success": round(est.ms_per_success, 1),
+                })
+        return rows
+
+
+_registry: Optional[EngineRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> EngineRegistry:
+    """The process-wide registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = EngineRegistry()
+        return _registry
+
+
+if __name__ == "__main__":
+    from database.db import init_db
+
+    init_db()
+    rows = get_registry().snapshot()
+    if not rows:
+        print("No OCR engine statistics recorded yet")
+    for r in rows:
+        observed = f"{r['success_rate']:.0%} of {r['attempts']}, {r['mean_ms']} ms" if r["attempts"] else "no data"
+        print(f"{r['template']:<24} {r['bucket']:<7} #{r['rank']} {r['step']:<20} "
+              f"{observed:<28} → {r['est_ms_per_success']} ms per accepted read")
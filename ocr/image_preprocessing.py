@@ -1,47 +1,129 @@
 import cv2
 import numpy as np
 from PIL import Image
-from typing import cast
+from typing import Dict, Optional, cast
 
-def preprocess_image(pil_image: Image.Image, mode: str = "simple") -> Image.Image:
+from ocr.boundary import find_receipt_quad, four_point_warp
+from ocr.intake import text_height_scale
+from utils.helpers import lap
+
+# Skew search range (degrees) and the working size of the angle-estimation copy
+_MAX_SKEW = 15.0
+_SKEW_ANALYSIS_SIDE = 800
+# Skews smaller than this are not worth a full-image warp
+_MIN_SKEW = 0.2
+
+
+def _profile_sharpness(ys: np.ndarray, xs: np.ndarray, angle: float, height: int) -> float:
+    """Variance of the row histogram of foreground points rotated by `angle`."""
+    theta = np.deg2rad(angle)
+    rows = (ys * np.cos(theta) - xs * np.sin(theta)).astype(np.int32)
+    hist = np.bincount(rows - rows.min(), minlength=height)
+    return float(np.var(hist))
+
+
+def estimate_skew_angle(gray: np.ndarray, refine: bool = True) -> float:
+    """
+    Estimates the correction angle (degrees, as passed to
+    cv2.getRotationMatrix2D) with a projection profile on a downsampled,
+    Otsu-binarized copy: text rows give the sharpest row histogram when the
+    angle is right. Returns 0.0 when no angle beats leaving the image alone.
+    Without `refine` the angle is only resolved to the nearest degree.
+    """
+    (h, w) = gray.shape[:2]
+    f = min(1.0, _SKEW_ANALYSIS_SIDE / max(h, w))
+    small = cv2.resize(gray, None, fx=f, fy=f, interpolation=cv2.INTER_AREA) if f < 1.0 else gray
+
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return 0.0
+
+    # Only glyph-sized blobs vote; dark backgrounds, table edges and rules are dropped
+    (sh, sw) = small.shape[:2]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    widths = stats[:, cv2.CC_STAT_WIDTH]
+    glyphs = (heights >= 2) & (heights < sh * 0.05) & (widths < sw * 0.1)
+    glyphs[0] = False
+    ys, xs = np.nonzero(glyphs[labels])
+    if ys.size < 50:
+        return 0.0
+    ys = ys.astype(np.float32)
+    xs = xs.astype(np.float32)
+    height = int(np.hypot(sh, sw)) + 2
+
+    # Coarse 1 degree sweep, then refine to 0.1 degree around the best angle
+    coarse = np.arange(-_MAX_SKEW, _MAX_SKEW + 0.5, 1.0)
+    scores = [_profile_sharpness(ys, xs, a, height) for a in coarse]
+    best = float(coarse[int(np.argmax(scores))])
+    if refine:
+        fine = np.arange(best - 1.0, best + 1.05, 0.1)
+        fine_scores = [_profile_sharpness(ys, xs, a, height) for a in fine]
+        best = float(fine[int(np.argmax(fine_scores))])
+        scores = fine_scores
+
+    baseline = _profile_sharpness(ys, xs, 0.0, height)
+    if max(scores) <= baseline * 1.02:
+        return 0.0
+    return best
+
+
+def deskew(gray: np.ndarray) -> np.ndarray:
+    """Rotates the full-resolution image once by the estimated skew angle."""
+    angle = estimate_skew_angle(gray)
+    if abs(angle) < _MIN_SKEW:
+        return gray
+
+    (h, w) = gray.shape[:2]
+    M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+def preprocess_image(pil_image: Image.Image, mode: str = "simple",
+                     timings: Optional[Dict[str, float]] = None) -> Image.Image:
     """
     Multi-stage preprocessing for receipts.
     Modes:
       - 'simple': Basic grayscale, contrast normalization, and sharpening.
-      - 'advanced': Deskewing, Resizing, and Adaptive Thresholding.
+      - 'advanced': Deskewing, text-height Resizing, and Adaptive Thresholding.
+      - 'document': Receipt boundary detection and perspective crop, then 'simple'.
+    If `timings` is given, per-stage durations (ms) are added to it.
     """
+    t = lap(timings, None)
     img = np.array(pil_image.convert("L"))
+    t = lap(timings, "grayscale_ms", t)
+
+    if mode == "document":
+        # Drop table / hand / background pixels before anything else runs
+        quad = find_receipt_quad(img)
+        t = lap(timings, "detect_ms", t)
+        if quad is not None:
+            img = four_point_warp(img, quad)
+            t = lap(timings, "warp_ms", t)
 
     if mode == "advanced":
-        # Deskewing
-        coords = np.column_stack(np.where(img > 0))
-        if coords.size > 0:
-            angle = cv2.minAreaRect(coords)[-1]
-            if angle < -45:
-                angle = -(90 + angle)
-            else:
-                angle = -angle
-            
-            (h, w) = img.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            img = cv2.warpAffine(img, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-
-        # Resizing (upscale for better OCR if too small)
-        (h, w) = img.shape[:2]
-        if w < 1000:
-            scale = 1000 / w
-            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        # Deskewing (angle from a small binarized copy, one warp at full size)
+        img = deskew(img)
+        t = lap(timings, "deskew_ms", t)
+
+        # Resizing (bring text to the OCR sweet spot, up or down)
+        scale = text_height_scale(img)
+        if scale != 1.0:
+            interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=interp)
+        t = lap(timings, "resize_ms", t)
 
         # Adaptive Thresholding
         img = cv2.adaptiveThreshold(
             img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
         )
         img = cv2.medianBlur(img, 3)
+        lap(timings, "threshold_ms", t)
     else:
         # Simple mode: Contrast and Sharpen
         img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
         kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
         img = cv2.filter2D(img, -1, kernel)
+        lap(timings, "enhance_ms", t)
 
-    return Image.fromarray(img)
\ No newline at end of file
+    return Image.fromarray(img)
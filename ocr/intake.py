@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+from typing import Optional
+
+# Median glyph height (px) at which Tesseract / PaddleOCR read receipts best
+TARGET_TEXT_HEIGHT = 24
+# JPEGs larger than this are decoded at a reduced DCT scale (1/2, 1/4, 1/8)
+MAX_DECODE_SIDE = 2000
+# Longest side of the throwaway copy used for text-height estimation
+_ANALYSIS_SIDE = 1000
+# Never shrink or enlarge more aggressively than this in one step
+_MIN_SCALE = 0.25
+_MAX_SCALE = 3.0
+# Skip resampling when the image is already this close to the target
+_SCALE_TOLERANCE = 0.25
+
+
+def open_receipt_image(fp, max_side: int = MAX_DECODE_SIDE) -> Image.Image:
+    """
+    Opens an uploaded receipt without decoding more pixels than OCR needs.
+    JPEGs are decoded at a reduced DCT scale via `draft()`, so a 12 MP phone
+    photo never materialises at full resolution. EXIF rotation is applied.
+    """
+    img = Image.open(fp)
+
+    if img.format == "JPEG" and max(img.size) > max_side:
+        # draft() picks the smallest 1/2, 1/4 or 1/8 scale that is still >= the requested size
+        scale = max_side / max(img.size)
+        img.draft("RGB", (int(img.width * scale), int(img.height * scale)))
+
+    return ImageOps.exif_transpose(img)
+
+
+def estimate_text_height(gray: np.ndarray) -> Optional[float]:
+    """
+    Estimates the median glyph height (in pixels of `gray`) from connected
+    components of a downsampled, Otsu-binarized copy. Returns None when no
+    text-like components are found.
+    """
+    (h, w) = gray.shape[:2]
+    f = min(1.0, _ANALYSIS_SIDE / max(h, w))
+    small = cv2.resize(gray, None, fx=f, fy=f, interpolation=cv2.INTER_AREA) if f < 1.0 else gray
+
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return None
+
+    (sh, sw) = small.shape[:2]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+
+    # Keep glyph-sized blobs: drop specks, rules, borders and photo background
+    glyphs = (heights >= 3) & (heights < sh * 0.1) & (widths < sw * 0.2) & (areas >= 4)
+    if np.count_nonzero(glyphs) < 10:
+        return None
+
+    return float(np.median(heights[glyphs])) / f
+
+
+def text_height_scale(gray: np.ndarray, target: int = TARGET_TEXT_HEIGHT) -> float:
+    """
+    Returns the resize factor that brings the estimated text height to `target`.
+    Falls back to 1.0 when the text height cannot be estimated.
+    """
+    text_height = estimate_text_height(gray)
+    return _scale_for_text_height(text_height, target) if text_height else 1.0
+
+
+def _scale_for_text_height(text_height: float, target: int) -> float:
+    scale = min(max(target / text_height, _MIN_SCALE), _MAX_SCALE)
+    if abs(scale - 1.0) < _SCALE_TOLERANCE:
+        return 1.0
+    return scale
+
+
+def normalize_resolution(pil_image: Image.Image, target: int = TARGET_TEXT_HEIGHT) -> Image.Image:
+    """
+    Resamples a receipt so its text sits at the OCR engines' preferred height,
+    shrinking oversized photos and enlarging tiny scans alike. Images whose
+    text height cannot be measured are only capped at MAX_DECODE_SIDE.
+    """
+    text_height = estimate_text_height(np.array(pil_image.convert("L")))
+    if text_height:
+        scale = _scale_for_text_height(text_height, target)
+    else:
+        longest = max(pil_image.size)
+        scale = MAX_DECODE_SIDE / longest if longest > MAX_DECODE_SIDE else 1.0
+    if scale == 1.0:
+        return pil_image
+
+    size = (max(1, round(pil_image.width * scale)), max(1, round(pil_image.height * scale)))
+    resample = Image.LANCZOS if scale < 1.0 else Image.BICUBIC
+    return pil_image.resize(size, resample, reducing_gap=3.0 if scale < 1.0 else None)
@@ -0,0 +1,96 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from ocr.ocr_result import OcrResult, OcrToken
+
+# SUBTOTAL keywords, shared with the text path (ocr/text_parser.py) so both
+# label the same rows
+SUBTOTAL_WORDS = r"sub\s*t[o0]t[a4]l|sub\s*ttl|sub\s*tot|stot|net\s*amount|net\s*amt|taxable|sub"
+# Row labels, checked in this order so "Sub Total" is not read as "Total"
+_ROW_LABELS = [
+    ("subtotal", re.compile(rf"(?i)\b({SUBTOTAL_WORDS})\b")),
+    ("tax", re.compile(r"(?i)\b(tax|g\s*s\s*t|v\s*a\s*t|cgst|sgst|igst|utgst|sales\s*tax|service\s*charge|service\s*tax|luxury\s*tax|cess|tva|iva|mwst|consumption\s*tax|tax\s*amount)\b")),
+    ("total", re.compile(r"(?i)\b(grand\s*total|t[o0]t[a4]l|due|payable|amount|net\s*total)\b")),
+]
+# An amount at the end of a token ("976.50", "₹1,204.00", or "Total 976.50" from PaddleOCR)
+_TRAILING_AMOUNT = re.compile(r"[₹$]?\s*(\d{1,3}(?:,\d{3})+\.\d{2}|\d+[.,]\d{2,3})\s*$")
+
+
+@dataclass
+class LayoutRow:
+    """Tokens that share a visual row on the receipt, left to right."""
+    tokens: List[OcrToken]
+
+    @property
+    def text(self) -> str:
+        return " ".join(t.text for t in self.tokens)
+
+    def rightmost_amount(self) -> Optional[str]:
+        """The right-aligned amount on this row, if any."""
+        for t in reversed(self.tokens):
+            m = _TRAILING_AMOUNT.search(t.text)
+            if m:
+                return m.group(1)
+        return None
+
+
+def build_rows(tokens: List[OcrToken]) -> List[LayoutRow]:
+    """
+    Groups boxed tokens into visual rows by vertical centre, so a label and
+    its right-aligned amount land on one row even when the engine put them
+    in different blocks or lines.
+    """
+    boxed = sorted((t for t in tokens if t.box), key=lambda t: t.center_y)
+    rows: List[LayoutRow] = []
+    row_center = row_height = 0.0
+
+    for t in boxed:
+        height = t.box[3] if t.box else 0
+        if rows and abs(t.center_y - row_center) <= max(row_height, height) * 0.5:
+            rows[-1].tokens.append(t)
+            n = len(rows[-1].tokens)
+            row_center += (t.center_y - row_center) / n
+            row_height = max(row_height, height)
+        else:
+            rows.append(LayoutRow(tokens=[t]))
+            row_center, row_height = t.center_y, float(height)
+
+    for row in rows:
+        row.tokens.sort(key=lambda t: t.box[0] if t.box else 0)
+    return rows
+
+
+def find_labeled_amounts(result: OcrResult) -> Dict[str, List[str]]:
+    """
+    Pairs financial labels with amounts geometrically: every row is
+    classified once, and a labelled row takes its own right-aligned amount,
+    or the next row's when the amount wrapped below an unlabelled label.
+    Returns raw amount strings per field ("subtotal", "tax", "total"), top
+    to bottom.
+    """
+    found: Dict[str, List[str]] = {name: [] for name, _ in _ROW_LABELS}
+    rows = build_rows(result.tokens)
+    labels = [_row_label(r) for r in rows]
+
+    for i, row in enumerate(rows):
+        if labels[i] is None:
+            continue
+        amount = row.rightmost_amount()
+        if amount is None and i + 1 < len(rows) and labels[i + 1] is None:
+            amount = rows[i + 1].rightmost_amount()
+        if amount is not None:
+            found[labels[i]].append(amount)
+
+    return found
+
+
+def _row_label(row: LayoutRow) -> Optional[str]:
+    text = row.text
+    for name, pattern in _ROW_LABELS:
+        # "Tax Invoice" is a document header, not a tax line
+        if name == "tax" and "invoice" in text.lower():
+            continue
+        if pattern.search(text):
+            return name
+    return None
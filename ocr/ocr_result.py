@@ -0,0 +1,97 @@
+import json
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+# (left, top, width, height) in pixels of the image the engine saw
+Box = Tuple[int, int, int, int]
+
+
+@dataclass
+class OcrToken:
+    """
+    A single recognised word (Tesseract) or text run (PaddleOCR).
+    confidence is normalised to 0.0 - 1.0 for every engine; `line` is the
+    engine's own line number, used to rebuild the text.
+    """
+    text: str
+    confidence: float
+    box: Optional[Box] = None
+    line: int = 0
+
+    @property
+    def right(self) -> int:
+        return self.box[0] + self.box[2] if self.box else 0
+
+    @property
+    def center_y(self) -> float:
+        return self.box[1] + self.box[3] / 2 if self.box else 0.0
+
+
+@dataclass
+class OcrLine:
+    """Tokens the engine itself grouped into one line, left to right."""
+    tokens: List[OcrToken]
+
+    @property
+    def text(self) -> str:
+        return " ".join(t.text for t in self.tokens)
+
+    @property
+    def confidence(self) -> float:
+        return min((t.confidence for t in self.tokens), default=0.0)
+
+
+@dataclass
+class OcrResult:
+    """
+    Engine-independent OCR output: the plain text used by the parser, the
+    word-level confidences used to route the cascade and the token boxes
+    used for layout-aware parsing (see ocr/layout.py).
+    """
+    engine: str
+    text: str = ""
+    tokens: List[OcrToken] = field(default_factory=list)
+
+    @property
+    def mean_confidence(self) -> float:
+        """Character-weighted mean token confidence (0.0 when nothing was read)."""
+        chars = sum(len(t.text) for t in self.tokens)
+        if not chars:
+            return 0.0
+        return sum(t.confidence * len(t.text) for t in self.tokens) / chars
+
+    @property
+    def lines(self) -> List[OcrLine]:
+        """Tokens grouped by the engine's line numbers, in reading order."""
+        lines: List[OcrLine] = []
+        for t in self.tokens:
+            if not lines or lines[-1].tokens[0].line != t.line:
+                lines.append(OcrLine(tokens=[]))
+            lines[-1].tokens.append(t)
+        return lines
+
+    @property
+    def has_layout(self) -> bool:
+        return bool(self.tokens) and all(t.box for t in self.tokens)
+
+    @classmethod
+    def from_tokens(cls, engine: str, tokens: List[OcrToken]) -> "OcrResult":
+        """Builds a result whose text is the tokens joined line by line."""
+        result = cls(engine=engine, tokens=tokens)
+        result.text = "\n".join(l.text for l in result.lines)
+        return result
+
+    def to_json(self) -> str:
+        """Compact JSON of the text and tokens, stored with saved receipts for re-parsing."""
+        return json.dumps({
+            "engine": self.engine,
+            "text": self.text,
+            "tokens": [[t.text, round(float(t.confidence), 3), [int(v) for v in t.box] if t.box else None, int(t.line)]
+                       for t in self.tokens],
+        }, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: str) -> "OcrResult":
+        d = json.loads(raw)
+        tokens = [OcrToken(text, conf, tuple(box) if box else None, line) for text, conf, box, line in d["tokens"]]
+        return cls(engine=d["engine"], text=d["text"], tokens=tokens)
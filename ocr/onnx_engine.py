@@ -0,0 +1,239 @@
+"""
+PP-OCR on onnxruntime: an alternative PaddleOCR backend without PaddlePaddle.
+
+Runs the PP-OCR detection (DB), angle classification and recognition (CTC)
+models exported to ONNX. The class mimics the part of PaddleOCR.ocr() that
+PaddleOcrService uses, so the service batches it the same way.
+
+Export once with paddle2onnx (from the PaddleOCR inference models):
+
+    paddle2onnx --model_dir en_PP-OCRv4_det_infer --model_filename inference.pdmodel \\
+        --params_filename inference.pdiparams --save_file models/ppocr_onnx/det.onnx
+    (same for cls.onnx and rec.onnx; copy ppocr/utils/en_dict.txt alongside)
+
+then optionally quantize the weights to int8 (needs the onnx package):
+
+    python -m ocr.onnx_engine quantize [model_dir]
+
+and select it with PADDLE_BACKEND=onnx (ONNX_INT8=1, ONNX_THREADS=n). The
+backend is optional: pip install -r requirements-onnx.txt.
+"""
+import math
+import os
+import sys
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ocr.boundary import order_points
+from ocr.paddle_service import crop_text_box
+
+_MODELS = ("det", "cls", "rec")
+
+# DB post-processing, as in PaddleOCR's defaults
+_DET_LIMIT_SIDE = 960
+_DET_THRESH = 0.3
+_DET_BOX_THRESH = 0.6
+_DET_UNCLIP_RATIO = 1.5
+_DET_MIN_SIZE = 3
+_DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+_CLS_SHAPE = (48, 192)
+_CLS_THRESH = 0.9
+_REC_SHAPE = (48, 320)
+# Widest/narrowest crop allowed in one recognizer batch
+_REC_PAD_SLACK = 1.3
+
+
+def model_paths(model_dir: str, int8: bool = False) -> List[str]:
+    suffix = "_int8.onnx" if int8 else ".onnx"
+    return [os.path.join(model_dir, name + suffix) for name in _MODELS]
+
+
+class OnnxPaddleOcr:
+    """PP-OCR det → cls → rec on onnxruntime sessions."""
+
+    def __init__(self, model_dir: str, int8: bool = False, threads: int = 0,
+                 rec_batch_num: int = 32, drop_score: float = 0.5):
+        import onnxruntime as ort  # type: ignore
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        det, cls, rec = model_paths(model_dir, int8)
+        providers = ["CPUExecutionProvider"]
+        self._det = ort.InferenceSession(det, opts, providers=providers)
+        self._cls = ort.InferenceSession(cls, opts, providers=providers) if os.path.exists(cls) else None
+        self._rec = ort.InferenceSession(rec, opts, providers=providers)
+
+        with open(os.path.join(model_dir, "en_dict.txt"), encoding="utf-8") as f:
+            # CTC blank first, space last (PaddleOCR's use_space_char)
+            self._chars = ["blank"] + [line.rstrip("\r\n") for line in f] + [" "]
+        self.rec_batch_num = rec_batch_num
+        self.drop_score = drop_score
+
+    # ---------- PaddleOCR.ocr() subset ----------
+    def ocr(self, img, det: bool = True, rec: bool = True, cls: bool = True):
+        if not det:
+            crops = img if isinstance(img, list) else [img]
+            if cls:
+                crops = self.classify(crops)
+            return [self.recognize(crops)]
+
+        boxes = self.detect(img)
+        if not rec:
+            return [[b.tolist() for b in boxes]]
+        crops = [crop_text_box(img, b) for b in boxes]
+        if cls:
+            crops = self.classify(crops)
+        lines = [[b.tolist(), r] for b, r in zip(boxes, self.recognize(crops)) if r[1] >= self.drop_score]
+        return [lines]
+
+    # ---------- detection ----------
+    def detect(self, img: np.ndarray) -> List[np.ndarray]:
+        """Text-line quads (tl, tr, br, bl) in `img` coordinates, top to bottom."""
+        h, w = img.shape[:2]
+        ratio = min(1.0, _DET_LIMIT_SIDE / max(h, w))
+        rh = max(32, int(round(h * ratio / 32)) * 32)
+        rw = max(32, int(round(w * ratio / 32)) * 32)
+        x = cv2.resize(img, (rw, rh)).astype(np.float32) / 255.0
+        x = ((x - _DET_MEAN) / _DET_STD).transpose(2, 0, 1)[None]
+
+        pred = self._det.run(None, {self._det.get_inputs()[0].name: x})[0][0, 0]
+        contours, _ = cv2.findContours((pred > _DET_THRESH).astype(np.uint8) * 255,
+                                       cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = []
+        for contour in contours[:1000]:
+            rect = cv2.minAreaRect(contour)
+            if min(rect[1]) < _DET_MIN_SIZE:
+                continue
+            if _box_score(pred, cv2.boxPoints(rect)) < _DET_BOX_THRESH:
+                continue
+            rect = _unclip(rect)
+            if min(rect[1]) < _DET_MIN_SIZE + 2:
+                continue
+            box = order_points(cv2.boxPoints(rect))
+            box[:, 0] = np.clip(box[:, 0] * w / rw, 0, w - 1)
+            box[:, 1] = np.clip(box[:, 1] * h / rh, 0, h - 1)
+            boxes.append(box)
+        boxes.sort(key=lambda b: (round(float(b[:, 1].min()) / 10), float(b[:, 0].min())))
+        return boxes
+
+    # ---------- classification ----------
+    def classify(self, crops: List[np.ndarray]) -> List[np.ndarray]:
+        """Turns upside-down text crops the right way up."""
+        if self._cls is None or not crops:
+            return crops
+        crops = list(crops)
+        name = self._cls.get_inputs()[0].name
+        for start in range(0, len(crops), self.rec_batch_num):
+            chunk = crops[start:start + self.rec_batch_num]
+            x = np.stack([_normalize(c, _CLS_SHAPE[0], _CLS_SHAPE[1]) for c in chunk])
+            probs = self._cls.run(None, {name: x})[0]
+            for i, p in enumerate(probs):
+                if int(np.argmax(p)) == 1 and p[1] > _CLS_THRESH:
+                    crops[start + i] = cv2.rotate(crops[start + i], cv2.ROTATE_180)
+        return crops
+
+    # ---------- recognition ----------
+    def recognize(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """(text, score) per crop, batched by similar aspect ratio."""
+        results: List[Optional[Tuple[str, float]]] = [None] * len(crops)
+        name = self._rec.get_inputs()[0].name
+        h = _REC_SHAPE[0]
+        min_ratio = _REC_SHAPE[1] / h
+        ratios = [max(min_ratio, c.shape[1] / max(c.shape[0], 1)) for c in crops]
+
+        for idx in _ratio_batches(ratios, self.rec_batch_num):
+            width = int(h * max(ratios[i] for i in idx))
+            x = np.stack([_normalize(crops[i], h, width) for i in idx])
+            probs = self._rec.run(None, {name: x})[0]
+            for i, p in zip(idx, probs):
+                results[i] = self._ctc_decode(p)
+        return results  # type: ignore[return-value]
+
+    def _ctc_decode(self, probs: np.ndarray) -> Tuple[str, float]:
+        best = probs.argmax(axis=1)
+        keep = np.ones(len(best), dtype=bool)
+        keep[1:] = best[1:] != best[:-1]
+        keep &= best != 0
+        if not keep.any():
+            return "", 0.0
+        text = "".join(self._chars[i] for i in best[keep] if i < len(self._chars))
+        return text, float(probs.max(axis=1)[keep].mean())
+
+
+def _ratio_batches(ratios: List[float], size: int) -> List[List[int]]:
+    """
+    Groups crop indices by aspect ratio. Every crop in a batch is padded to
+    the widest one, so a batch also closes once widths differ by more than
+    _REC_PAD_SLACK; on few cores padding costs more than batching saves.
+    """
+    batches: List[List[int]] = []
+    for i in sorted(range(len(ratios)), key=ratios.__getitem__):
+        if batches and len(batches[-1]) < size and ratios[i] <= ratios[batches[-1][0]] * _REC_PAD_SLACK:
+            batches[-1].append(i)
+        else:
+            batches.append([i])
+    return batches
+
+
+def _normalize(crop: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Resizes to `height` keeping the aspect ratio, scales to [-1, 1], right-pads to `width`."""
+    h, w = crop.shape[:2]
+    new_w = min(width, max(1, int(math.ceil(height * w / max(h, 1)))))
+    x = cv2.resize(crop, (new_w, height)).astype(np.float32)
+    x = (x / 255.0 - 0.5) / 0.5
+    out = np.zeros((3, height, width), dtype=np.float32)
+    out[:, :, :new_w] = x.transpose(2, 0, 1)
+    return out
+
+
+def _box_score(pred: np.ndarray, pts: np.ndarray) -> float:
+    """Mean text probability inside the box."""
+    h, w = pred.shape
+    xmin, xmax = int(np.clip(np.floor(pts[:, 0].min()), 0, w - 1)), int(np.clip(np.ceil(pts[:, 0].max()), 0, w - 1))
+    ymin, ymax = int(np.clip(np.floor(pts[:, 1].min()), 0, h - 1)), int(np.clip(np.ceil(pts[:, 1].max()), 0, h - 1))
+    mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
+    cv2.fillPoly(mask, [(pts - [xmin, ymin]).astype(np.int32)], 1)
+    return cv2.mean(pred[ymin:ymax + 1, xmin:xmax + 1], mask)[0]
+
+
+def _unclip(rect):
+    # DB shrinks text regions during training; grow them back by
+    # area * ratio / perimeter (pyclipper's offset, for a rectangle)
+    (cx, cy), (w, h), angle = rect
+    d = w * h * _DET_UNCLIP_RATIO / (2 * (w + h))
+    return (cx, cy), (w + 2 * d, h + 2 * d), angle
+
+
+# ================= QUANTIZATION =================
+def quantize(model_dir: str) -> None:
+    """Writes *_int8.onnx next to each model (dynamic int8 weight quantization)."""
+    import tempfile
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+    from onnxruntime.quantization.shape_inference import quant_pre_process  # type: ignore
+
+    for src, dst in zip(model_paths(model_dir), model_paths(model_dir, int8=True)):
+        if not os.path.exists(src):
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            # paddle2onnx feeds conv weights through Constant nodes; fold them
+            # into initializers first or the quantizer cannot see them
+            folded = os.path.join(tmp, "folded.onnx")
+            quant_pre_process(src, folded, skip_symbolic_shape=True)
+            quantize_dynamic(folded, dst, weight_type=QuantType.QUInt8)
+        print(f"{os.path.basename(src)} → {os.path.basename(dst)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "quantize":
+        from config.config import ONNX_MODEL_DIR
+        quantize(sys.argv[2] if len(sys.argv) > 2 else ONNX_MODEL_DIR)
+    else:
+        print("usage: python -m ocr.onnx_engine quantize [model_dir]")
@@ -1,40 +1,56 @@
-import numpy as np
+from typing import List
+
 from PIL import Image
-try:
-    from paddleocr import PaddleOCR
-    # Initialize PaddleOCR (using CPU by default for portability)
-    # This will download models on first run
-    _paddle_engine = None
-except ImportError:
-    _paddle_engine = None
+
+from ocr.ocr_result import OcrResult
+from ocr.paddle_service import backend_available, get_paddle_service
+from ocr.tiling import is_tall, ocr_tiled
+
+
+def extract_result_paddle(pil_image: Image.Image) -> OcrResult:
+    """
+    Extracts text, boxes and per-line recognition scores from an image using PaddleOCR.
+    Calls from concurrent threads are batched by the shared PaddleOcrService.
+    Very tall receipts are sent as overlapping bands, so the detector does not
+    shrink them to an unreadable strip.
+    """
+    try:
+        service = get_paddle_service()
+        if is_tall(pil_image):
+            return ocr_tiled(pil_image, service.recognize_many, "paddle")
+        return service.recognize(pil_image)
+    except Exception as e:
+        print(f"PaddleOCR Error: {e}")
+        return OcrResult(engine="paddle")
+
+
+def extract_results_paddle(images: List[Image.Image]) -> List[OcrResult]:
+    """
+    Extracts several images in shared detector/recognizer batches.
+    """
+    try:
+        return get_paddle_service().recognize_many(images)
+    except Exception as e:
+        print(f"PaddleOCR Error: {e}")
+        return [OcrResult(engine="paddle") for _ in images]
+
 
 def extract_text_paddle(pil_image: Image.Image) -> str:
     """
     Extracts text from an image using PaddleOCR.
     """
-    global _paddle_engine
-    
+    return extract_result_paddle(pil_image).text
+
+
+def warm_up_paddle(wait: bool = True) -> None:
+    """
+    Loads the PaddleOCR models ahead of the first real request (no-op when
+    the configured backend is not installed). With wait=False the models
+    load in the background.
+    """
+    if not backend_available():
+        return
     try:
-        if _paddle_engine is None:
-            # lang='en' for English, use_angle_cls=True for rotation correction
-            _paddle_engine = PaddleOCR(use_angle_cls=True, lang='en', show_log=False)
-        
-        # Convert PIL to numpy array
-        img_array = np.array(pil_image.convert("RGB"))
-        
-        # PaddleOCR returns a list of results
-        result = _paddle_engine.ocr(img_array, cls=True)
-        
-        if not result or not result[0]:
-            return ""
-            
-        full_text = []
-        for line in result[0]:
-            # Each line is [[coords], (text, confidence)]
-            text = line[1][0]
-            full_text.append(text)
-            
-        return "\n".join(full_text)
+        get_paddle_service().warm_up(wait)
     except Exception as e:
         print(f"PaddleOCR Error: {e}")
-        return ""
@@ -0,0 +1,215 @@
+"""
+Batched, thread-safe PaddleOCR service.
+
+One daemon thread owns the PaddleOCR model; callers (Streamlit sessions,
+upload threads) submit images to its queue and wait on a Future. Requests
+that arrive within `max_wait_ms` of each other are served together: the
+detector runs per image, then the text crops of the whole batch go through
+the angle classifier and recognizer in large batches, which is where
+sequential per-image calls lose most of their time.
+"""
+import importlib.util
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config.config import ONNX_INT8, ONNX_MODEL_DIR, ONNX_THREADS, PADDLE_BACKEND
+from ocr.boundary import four_point_warp
+from ocr.ocr_result import OcrResult, OcrToken
+
+# Images served by one detector/recognizer round
+MAX_BATCH = 8
+# How long the service waits for more requests before running a partial batch
+MAX_WAIT_MS = 25
+# Text crops per recognizer / angle-classifier forward pass (PaddleOCR default: 6)
+REC_BATCH = 32
+
+_Request = Tuple[np.ndarray, Future]
+
+
+def backend_available(backend: str = PADDLE_BACKEND) -> bool:
+    """Whether the PP-OCR backend can run here (checked without importing it)."""
+    if backend == "onnx":
+        from ocr.onnx_engine import model_paths
+        return (importlib.util.find_spec("onnxruntime") is not None
+                and os.path.exists(model_paths(ONNX_MODEL_DIR, ONNX_INT8)[0]))
+    return importlib.util.find_spec("paddleocr") is not None
+
+
+class PaddleOcrService:
+    """Serializes all access to one PaddleOCR model behind a request queue."""
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS,
+                 rec_batch: int = REC_BATCH, backend: str = PADDLE_BACKEND):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.rec_batch = rec_batch
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._engine = None
+        self._thread = threading.Thread(target=self._serve, name="paddle-ocr", daemon=True)
+        self._thread.start()
+
+    # ---------- client side ----------
+    def submit(self, pil_image: Image.Image) -> "Future[OcrResult]":
+        future: "Future[OcrResult]" = Future()
+        self._queue.put((np.array(pil_image.convert("RGB")), future))
+        return future
+
+    def recognize(self, pil_image: Image.Image) -> OcrResult:
+        return self.submit(pil_image).result()
+
+    def recognize_many(self, images: List[Image.Image]) -> List[OcrResult]:
+        """Submits all images at once so they share batches."""
+        futures = [self.submit(img) for img in images]
+        return [f.result() for f in futures]
+
+    def warm_up(self, wait: bool = True) -> None:
+        """Loads the models (in the service thread) ahead of the first real request."""
+        future = self.submit(Image.new("RGB", (64, 32), "white"))
+        if wait:
+            future.result()
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---------- service thread ----------
+    def _serve(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    req = self._queue.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                if req is None:
+                    stopping = True
+                    break
+                batch.append(req)
+
+            try:
+                results = self._run_batch([img for img, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if stopping:
+                return
+
+    def _load(self):
+        if self._engine is None:
+            if not backend_available(self.backend):
+                raise RuntimeError(f"PP-OCR backend '{self.backend}' is not installed")
+            if self.backend == "onnx":
+                from ocr.onnx_engine import OnnxPaddleOcr
+                self._engine = OnnxPaddleOcr(ONNX_MODEL_DIR, int8=ONNX_INT8, threads=ONNX_THREADS,
+                                             rec_batch_num=self.rec_batch)
+            else:
+                # Imported here: PaddlePaddle costs seconds and hundreds of MB
+                from paddleocr import PaddleOCR
+                # lang='en' for English, use_angle_cls=True for rotation correction
+                self._engine = PaddleOCR(use_angle_cls=True, lang='en', show_log=False,
+                                         rec_batch_num=self.rec_batch, cls_batch_num=self.rec_batch)
+        return self._engine
+
+    def _run_batch(self, images: List[np.ndarray]) -> List[OcrResult]:
+        engine = self._load()
+        try:
+            return self._run_batched(engine, images)
+        except Exception as e:
+            # Older/newer PaddleOCR APIs without det/rec switches: one image at a time
+            print(f"PaddleOCR batched inference unavailable ({e}); running per image")
+            return [_to_result(engine.ocr(img, cls=True)) for img in images]
+
+    def _run_batched(self, engine, images: List[np.ndarray]) -> List[OcrResult]:
+        # 1. Detection, per image
+        boxes_per_image = []
+        crops: List[np.ndarray] = []
+        for img in images:
+            det = engine.ocr(img, det=True, rec=False, cls=False)
+            boxes = sorted((np.array(b, dtype=np.float32) for b in (det[0] or [])),
+                           key=lambda b: (round(float(b[:, 1].min()) / 10), float(b[:, 0].min())))
+            boxes_per_image.append(boxes)
+            crops.extend(crop_text_box(img, b) for b in boxes)
+
+        if not crops:
+            return [OcrResult(engine="paddle") for _ in images]
+
+        # 2. Angle classification + recognition over every crop of the batch at once
+        recs = _recognize_crops(engine, crops)
+        drop_score = getattr(engine, "drop_score", 0.5)
+
+        results, k = [], 0
+        for boxes in boxes_per_image:
+            lines = []
+            for box, (text, score) in zip(boxes, recs[k:k + len(boxes)]):
+                if score >= drop_score:
+                    lines.append([box.tolist(), (text, score)])
+            k += len(boxes)
+            results.append(_to_result([lines]))
+        return results
+
+
+def _recognize_crops(engine, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+    """(text, score) per crop, in order; raises rather than return fewer."""
+    if hasattr(engine, "text_recognizer"):
+        # PaddleOCR's own stages: how ocr() splits a list input into images
+        # differs between releases (2.6-2.9 read each crop as its own image)
+        if getattr(engine, "use_angle_cls", False):
+            crops, _, _ = engine.text_classifier(crops)
+        recs, _ = engine.text_recognizer(crops)
+    else:
+        # The onnx engine reads a list as one batch of crops
+        recs = engine.ocr(crops, det=False, rec=True, cls=True)[0]
+    if len(recs) != len(crops):
+        raise RuntimeError(f"recognizer returned {len(recs)} results for {len(crops)} crops")
+    return recs
+
+
+def crop_text_box(img: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """Upright crop of one detected text line."""
+    crop = four_point_warp(img, box)
+    # Vertical text lines are read rotated, as PaddleOCR's own pipeline does
+    if crop.shape[0] >= crop.shape[1] * 1.5:
+        crop = np.rot90(crop).copy()
+    return crop
+
+
+def _to_result(result) -> OcrResult:
+    """Converts PaddleOCR's [[box, (text, score)], ...] output to an OcrResult."""
+    if not result or not result[0]:
+        return OcrResult(engine="paddle")
+
+    tokens = []
+    for i, line in enumerate(result[0]):
+        # Each line is [[coords], (text, confidence)]
+        xs = [p[0] for p in line[0]]
+        ys = [p[1] for p in line[0]]
+        box = (int(min(xs)), int(min(ys)), int(max(xs) - min(xs)), int(max(ys) - min(ys)))
+        tokens.append(OcrToken(text=line[1][0], confidence=float(line[1][1]), box=box, line=i))
+    return OcrResult.from_tokens("paddle", tokens)
+
+
+_service: Optional[PaddleOcrService] = None
+_service_lock = threading.Lock()
+
+
+def get_paddle_service() -> PaddleOcrService:
+    """The process-wide service, started on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PaddleOcrService()
+        return _service
@@ -0,0 +1,99 @@
+import io
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from ocr.boundary import crop_receipt
+from ocr.intake import normalize_resolution, open_receipt_image
+from ocr.quality import QualityReport, assess_quality
+from ocr.router import CascadeReport, run_ocr_cascade
+from ocr.text_parser import KEY_FIELDS, parse_receipt
+from utils.helpers import lap
+
+NO_TEXT_ERROR = "No readable text detected"
+# Receipts whose least trusted key field (ocr/text_parser.KEY_FIELDS) is
+# below this are worth a costlier engine (Gemini); the rest are not
+ESCALATE_BELOW = 0.5
+
+
+def load_receipt_image(source: Union[bytes, Any], filename: str) -> Image.Image:
+    """
+    Opens a receipt file (image, or the first page of a PDF) from bytes or a
+    file-like object and brings it to OCR resolution.
+    """
+    if filename.lower().endswith(".pdf"):
+        from ocr.pdf_processor import pdf_to_images  # type: ignore
+        pages = pdf_to_images(source if isinstance(source, bytes) else source.read())
+        if not pages:
+            raise ValueError("PDF contains no pages")
+        return pages[0]
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return normalize_resolution(open_receipt_image(source))
+
+
+def prepare_receipt_image(img: Image.Image, timings: Optional[Dict[str, float]] = None
+                          ) -> Tuple[Image.Image, QualityReport]:
+    """Crops to the receipt and scores the crop (see ocr/quality.py)."""
+    # Crop to the receipt once, so no pass below pays for table/hand pixels
+    t = lap(timings, None)
+    img = crop_receipt(img)
+    t = lap(timings, "crop_ms", t)
+    quality = assess_quality(img)
+    lap(timings, "quality_ms", t)
+    return img, quality
+
+
+def extract_receipt_ocr(img: Image.Image, timings: Optional[Dict[str, float]] = None,
+                        quality: Optional[QualityReport] = None
+                        ) -> Tuple[Optional[Dict[str, Any]], List[dict], Optional[str], CascadeReport]:
+    """
+    Non-AI extraction shared by the Streamlit UI and headless workers:
+    boundary crop → quality gate → confidence-routed OCR cascade →
+    layout-aware parsing.
+    Returns (data | None, items, error | None, cascade report); the report
+    holds the source of every parsed field (see needs_escalation). If
+    `timings` is given, per-stage durations (ms) are added to it. Passing
+    the `quality` report of an image already returned by
+    prepare_receipt_image skips the crop.
+    """
+    if quality is None:
+        img, quality = prepare_receipt_image(img, timings)
+
+    # Hopeless photos are rejected here; the rest pick their engines and modes
+    if not quality.usable:
+        return None, [], quality.message, CascadeReport(bucket=quality.bucket, quality=quality)
+
+    # Tesseract modes → PaddleOCR, routed by word confidence and key fields
+    t = lap(timings, None)
+    result, report = run_ocr_cascade(img, quality=quality)
+    t = lap(timings, "ocr_ms", t)
+    if not result.text.strip():
+        return None, [], NO_TEXT_ERROR, report
+
+    try:
+        data, items = parse_receipt(result.text, layout=result, provenance=report.provenance)
+    except Exception as e:
+        return None, [], f"Receipt parsing error: {e}", report
+    finally:
+        lap(timings, "parse_ms", t)
+
+    # Saved with the receipt, so parser improvements can be re-applied later (services/reparse.py)
+    data["ocr_source"] = result.to_json()
+    return data, items, None, report
+
+
+def needs_escalation(data: Optional[Dict[str, Any]], report: CascadeReport) -> bool:
+    """
+    Whether an OCR extraction is worth repeating with a costlier engine:
+    nothing was read, or a key field is a guess or a fallback (a random
+    bill ID, today's date, the largest number as the total).
+    """
+    return data is None or report.parse_confidence < ESCALATE_BELOW
+
+
+def low_confidence_fields(report: CascadeReport) -> List[str]:
+    """'date (fallback)'-style labels of the key fields below ESCALATE_BELOW."""
+    return [f"{f} ({report.provenance[f].source})" for f in KEY_FIELDS
+            if f in report.provenance and report.provenance[f].confidence < ESCALATE_BELOW]
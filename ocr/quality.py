@@ -0,0 +1,131 @@
+"""
+Image quality gate run before any OCR or Gemini call.
+
+A few cheap measurements on a small grayscale copy (a few ms per photo)
+decide how a receipt is read: which preprocessing modes and engines are
+worth trying, which quality bucket the engine registry learns under, and
+whether the image is hopeless and should be rejected outright instead of
+burning a full cascade or an AI call on it.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ocr.image_preprocessing import estimate_skew_angle
+
+# Longest side of the analysis copy
+_ANALYSIS_SIDE = 500
+# Laplacian variance (on the analysis copy) separating sharp / soft / blurry
+SHARP_VARIANCE = 400.0
+SOFT_VARIANCE = 100.0
+# Skews above this (degrees) need the deskewing 'advanced' mode
+_SKEW_DEGREES = 1.5
+# 1st-99th percentile spread below which the page is washed out / dark
+_LOW_CONTRAST = 80.0
+
+# Rejection thresholds: below these no engine has ever produced a usable read
+_REJECT_VARIANCE = 12.0
+_REJECT_CONTRAST = 20.0
+# Fraction of the page covered by glyph-sized ink blobs
+_REJECT_TEXT_DENSITY = 0.002
+
+LOW_QUALITY_ERROR = "Image quality too low for OCR"
+
+
+@dataclass
+class QualityReport:
+    """Measurements of one image and the reading strategy they imply."""
+    # Laplacian variance after contrast stretching: edge energy, low for
+    # defocused / motion-blurred photos however dark they are
+    sharpness: float
+    # 1st-99th percentile grey level spread
+    contrast: float
+    # Median grey level
+    brightness: float
+    # Estimated skew to the nearest degree (as returned by estimate_skew_angle)
+    skew: float
+    # Fraction of pixels belonging to glyph-sized dark components
+    text_density: float
+    ms: float = 0.0
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def usable(self) -> bool:
+        return not self.reasons
+
+    @property
+    def bucket(self) -> str:
+        """Sharpness class the engine registry keeps statistics under."""
+        if self.sharpness >= SHARP_VARIANCE:
+            return "sharp"
+        return "soft" if self.sharpness >= SOFT_VARIANCE else "blurry"
+
+    @property
+    def modes(self) -> List[str]:
+        """Tesseract preprocessing modes worth running, best first."""
+        if self.bucket == "blurry" or abs(self.skew) >= _SKEW_DEGREES:
+            # Only 'advanced' deskews and binarizes; sharpening amplifies blur noise
+            return ["advanced"]
+        if self.contrast < _LOW_CONTRAST:
+            return ["simple", "advanced"]
+        return ["simple", "advanced", "original"]
+
+    @property
+    def engines(self) -> List[str]:
+        """OCR engines worth running; blurry photos go straight to PaddleOCR."""
+        return ["paddle"] if self.bucket == "blurry" else ["tesseract", "paddle"]
+
+    def allows(self, engine: str, mode: str) -> bool:
+        """Whether a cascade step (see ocr/engine_registry.py) is worth running."""
+        return engine in self.engines and (engine != "tesseract" or mode in self.modes)
+
+    @property
+    def message(self) -> str:
+        return f"{LOW_QUALITY_ERROR}: {', '.join(self.reasons)}"
+
+
+def _text_density(small: np.ndarray) -> float:
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return 0.0
+    (sh, sw) = small.shape[:2]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    glyphs = (heights >= 2) & (heights < sh * 0.05) & (widths < sw * 0.1)
+    return float(areas[glyphs].sum()) / small.size
+
+
+def assess_quality(img: Image.Image) -> QualityReport:
+    """Scores blur, contrast, skew and text density on a downsampled copy."""
+    start = time.perf_counter()
+    gray = np.asarray(img.convert("L"))
+    f = min(1.0, _ANALYSIS_SIDE / max(gray.shape))
+    small = cv2.resize(gray, None, fx=f, fy=f, interpolation=cv2.INTER_AREA) if f < 1.0 else gray
+
+    # Percentiles from the grey histogram (much cheaper than sorting pixels)
+    cdf = np.cumsum(np.bincount(small.ravel(), minlength=256)) / small.size
+    lo, mid, hi = (int(np.searchsorted(cdf, q)) for q in (0.01, 0.5, 0.99))
+    # Stretch lo..hi to 0..255 so dim photos are not mistaken for blurry ones
+    lut = np.clip((np.arange(256) - lo) * 255.0 / max(hi - lo, 1), 0, 255).astype(np.uint8)
+    report = QualityReport(
+        sharpness=float(cv2.Laplacian(cv2.LUT(small, lut), cv2.CV_64F).var()),
+        contrast=float(hi - lo),
+        brightness=float(mid),
+        skew=estimate_skew_angle(small, refine=False),
+        text_density=_text_density(small),
+    )
+
+    if report.contrast < _REJECT_CONTRAST:
+        report.reasons.append("blank or uniformly dark page")
+    elif report.text_density < _REJECT_TEXT_DENSITY:
+        report.reasons.append("no text found")
+    if report.sharpness < _REJECT_VARIANCE:
+        report.reasons.append("too blurry")
+    report.ms = (time.perf_counter() - start) * 1000
+    return report
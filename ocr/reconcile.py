@@ -0,0 +1,236 @@
+"""
+Subtotal / tax reconciliation: which printed numbers make
+subtotal + taxes = total.
+
+Amounts are compared in minor units (paise / cents), so sums are exact
+integers and complements can be looked up in a hash table instead of
+trying every pair. Three kinds of solutions are searched:
+
+  - pair:       subtotal + one tax line (hashed complement, O(n))
+  - split-tax:  subtotal + two or three tax / charge lines, e.g. CGST +
+                SGST or service charge + VAT (largest subtotals only)
+  - items:      no subtotal printed, but a subset of the item prices adds
+                up to total - tax (bitset dynamic programming, bounded)
+
+Candidates are scored on how exactly they add up, whether the tax is a
+common rate of the subtotal, how much of the total the subtotal covers
+and whether the item prices support the subtotal (1.0 at best). Among
+enough numbers something always adds up, so accept() only trusts a top
+solution that scores MIN_SCORE and beats the best different split by
+MIN_MARGIN.
+"""
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Sums within this many minor units of the total count as a match (< 0.10)
+TOLERANCE = 9
+# All tax / charge lines together never exceed this share of the total
+_MAX_TAX_SHARE = 0.35
+# Subtotal candidates scanned for unequal / three-line tax splits
+_SPLIT_TAX_SUBTOTALS = 12
+# Item subset sums are only solved up to this many minor units / items; with
+# more items than that nearly every amount is some subset, so only the sum
+# of all of them is checked
+_MAX_DP_UNITS = 2_000_000
+_MAX_DP_ITEMS = 60
+# GST / VAT / sales tax rates a tax line is checked against
+_COMMON_RATES = (0.025, 0.05, 0.06, 0.07, 0.0725, 0.08, 0.09, 0.10, 0.12, 0.14, 0.15, 0.18, 0.20, 0.28)
+# Simpler explanations win ties
+_KIND_PENALTY = {"pair": 0.0, "split-tax": 0.05, "items": 0.1}
+# A solution is trusted from this score, and this far ahead of the best
+# solution with another subtotal / tax (benchmarks/bench_reconcile.py: no
+# made-up split among 1,000 unrelated numbers, every planted one kept)
+MIN_SCORE = 0.75
+MIN_MARGIN = 0.05
+
+
+@dataclass(frozen=True)
+class Reconciliation:
+    """One way the printed numbers add up to the total."""
+    subtotal: float
+    taxes: Tuple[float, ...]
+    total: float
+    score: float
+    # "pair", "split-tax" or "items"
+    kind: str
+
+    @property
+    def tax(self) -> float:
+        return sum(self.taxes)
+
+
+def to_minor(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def _common_rate(tax: int, base: int, slack: int) -> bool:
+    return any(abs(tax - base * r) <= slack for r in _COMMON_RATES)
+
+
+def _plausible_rate(subtotal: int, taxes: Sequence[int]) -> float:
+    """
+    1.0 when the tax is a common rate of the subtotal (or every line is one,
+    of the subtotal or of the subtotal plus the other lines: a service
+    charge and VAT on both), 0.5 when merely possible.
+    """
+    tax = sum(taxes)
+    if not taxes or subtotal <= 0:
+        return 0.5
+    # Each tax line is rounded on its own, so allow one minor unit per line
+    if _common_rate(tax, subtotal, len(taxes)):
+        return 1.0
+    if len(taxes) > 1 and all(_common_rate(t, subtotal, 1) or _common_rate(t, subtotal + tax - t, 1) for t in taxes):
+        return 1.0
+    return 0.5 if tax <= subtotal * _MAX_TAX_SHARE else 0.0
+
+
+class _ItemSums:
+    """Which sums a subset of the item prices can reach (bitset DP, built on first use)."""
+
+    def __init__(self, prices: Sequence[float], limit: int):
+        self._units = [u for u in (to_minor(p) for p in prices) if 0 < u <= limit]
+        self._total = sum(self._units)
+        self._limit = limit
+        self._bits: Optional[bytes] = None
+
+    def _solve(self) -> bytes:
+        reach = 1
+        mask = (1 << (self._limit + 1)) - 1
+        for units in self._units:
+            reach |= (reach << units) & mask
+        return reach.to_bytes((self._limit + 8) // 8, "little")
+
+    def reaches(self, target: int) -> bool:
+        # Most receipts: every item line adds up to the subtotal
+        if abs(self._total - target) <= TOLERANCE:
+            return True
+        if len(self._units) > _MAX_DP_ITEMS:
+            return False
+        if self._bits is None:
+            self._bits = self._solve()
+        lo, hi = max(1, target - TOLERANCE), min(self._limit, target + TOLERANCE)
+        return any(self._bits[k >> 3] >> (k & 7) & 1 for k in range(lo, hi + 1))
+
+
+def reconcile(numbers: Iterable[float], total: float, item_prices: Iterable[float] = (),
+              limit: int = 5) -> List[Reconciliation]:
+    """
+    Ranked (best first) ways to explain `total` as a printed subtotal plus
+    printed tax lines, or as item prices plus a tax line. At most `limit`
+    solutions are returned; none when nothing adds up.
+    """
+    if not 0 < total * 100 < math.inf:
+        return []
+    target = to_minor(total)
+    if target <= 0:
+        return []
+
+    # Minor units -> the printed value (first seen) and how often it was printed
+    values: Dict[int, float] = {}
+    counts: Counter = Counter()
+    for n in numbers:
+        units = to_minor(n) if n < total else target
+        if 0 < units < target:
+            values.setdefault(units, n)
+            counts[units] += 1
+    max_tax = int(target * _MAX_TAX_SHARE)
+
+    items: Optional[_ItemSums] = None
+    prices = [p for p in item_prices if p > 0]
+    if prices and target + TOLERANCE <= _MAX_DP_UNITS:
+        items = _ItemSums(prices, target + TOLERANCE)
+
+    # (subtotal, taxes) in minor units -> kind; scored once the search is done
+    found: Dict[Tuple[int, Tuple[int, ...]], str] = {}
+
+    def _add(subtotal: int, taxes: Tuple[int, ...], kind: str) -> None:
+        found.setdefault((subtotal, tuple(sorted(taxes))), kind)
+
+    def _available(*parts: int) -> bool:
+        return all(counts[u] >= k for u, k in Counter(parts).items())
+
+    # Pair: subtotal + one tax line, by hashed complement
+    for sub in values:
+        need = target - sub
+        if need > sub + TOLERANCE:
+            continue  # the tax would exceed the subtotal
+        for tax in range(need - TOLERANCE, need + TOLERANCE + 1):
+            if 0 < tax <= sub and tax in counts and _available(sub, tax):
+                _add(sub, (tax,), "pair")
+
+    # Split tax: a subtotal + two or three tax / charge lines
+    small = sorted(u for u in values if u <= max_tax)
+    subtotals = sorted((u for u in values if 0 < target - u <= max_tax), reverse=True)
+    for sub in subtotals:
+        # Two equal lines (CGST = SGST) are a hash lookup, so every subtotal is tried
+        rest = target - sub
+        for half in range(-(-(rest - TOLERANCE) // 2), (rest + TOLERANCE) // 2 + 1):
+            if counts[half] >= 2 and _available(sub, half, half):
+                _add(sub, (half, half), "split-tax")
+    # Other splits need a scan per subtotal: the ones the item prices add up to first, then the largest
+    if items is not None and len(subtotals) > _SPLIT_TAX_SUBTOTALS:
+        subtotals.sort(key=lambda u: not items.reaches(u))
+    for sub in subtotals[:_SPLIT_TAX_SUBTOTALS]:
+        rest = target - sub
+        # Two lines: two pointers over the sorted small amounts
+        i, j = 0, len(small) - 1
+        while i <= j:
+            s = small[i] + small[j]
+            if abs(s - rest) <= TOLERANCE and _available(sub, small[i], small[j]):
+                _add(sub, (small[i], small[j]), "split-tax")
+            if s < rest:
+                i += 1
+            else:
+                j -= 1
+        # Three lines: an equal pair (CGST = SGST) plus one more charge
+        for half in small:
+            if counts[half] < 2 or 2 * half >= rest:
+                continue
+            need = rest - 2 * half
+            for extra in range(need - TOLERANCE, need + TOLERANCE + 1):
+                if extra in counts and _available(sub, half, half, extra):
+                    _add(sub, (half, half, extra), "split-tax")
+
+    # Items: no printed subtotal (or none at a common tax rate), the item prices add up to total - tax
+    rates = {key: _plausible_rate(*key) for key in found}
+    if items is not None and 1.0 not in rates.values():
+        for tax in [0] + small:
+            if items.reaches(target - tax):
+                key = (target - tax, (tax,) if tax else ())
+                _add(*key, "items")
+                rates[key] = _plausible_rate(*key)
+
+    # Item support only decides between several candidates, so skip the DP otherwise
+    check_items = items is not None and len(found) > 1
+    solutions = []
+    for (subtotal, taxes), kind in found.items():
+        diff = subtotal + sum(taxes) - target
+        score = (0.3 * (1.0 - abs(diff) / (TOLERANCE + 1))
+                 + 0.3 * rates[(subtotal, taxes)]
+                 + 0.25 * subtotal / target
+                 + (0.15 if kind == "items" or (check_items and items.reaches(subtotal)) else 0.0)
+                 - _KIND_PENALTY[kind])
+        solutions.append(Reconciliation(
+            subtotal=values[subtotal] if kind != "items" else subtotal / 100,
+            taxes=tuple(values[t] for t in taxes),
+            total=total,
+            score=round(score, 4),
+            kind=kind,
+        ))
+    return sorted(solutions, key=lambda r: r.score, reverse=True)[:limit]
+
+
+def accept(solutions: Sequence[Reconciliation], min_score: float = MIN_SCORE,
+           min_margin: float = MIN_MARGIN) -> Optional[Reconciliation]:
+    """The top solution of reconcile() if it is good and clearly the best, else None."""
+    if not solutions or solutions[0].score < min_score:
+        return None
+    best = solutions[0]
+    # Solutions differing only in how the same tax is split are no rivals
+    rival = next((r for r in solutions[1:]
+                  if abs(r.subtotal - best.subtotal) >= 0.01 or abs(r.tax - best.tax) >= 0.01), None)
+    if rival is not None and best.score - rival.score < min_margin:
+        return None
+    return best
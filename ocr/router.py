@@ -0,0 +1,193 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from ocr.engine_registry import ANY, STEPS, EngineRegistry, get_registry
+from ocr.ocr_result import OcrResult
+from ocr.quality import QualityReport, assess_quality
+from ocr.templates import get_matching_template
+from ocr.text_parser import FieldSource, parse_confidence, parse_receipt
+
+# A pass is accepted once its mean word confidence reaches this AND all key fields were read
+ACCEPT_CONFIDENCE = 0.80
+# Below this, re-reading the same image with another page segmentation mode rarely helps
+_RETRY_PSM_CONFIDENCE = 0.55
+# PaddleOCR only runs when no Tesseract pass got this far (or key fields are still missing)
+PADDLE_CONFIDENCE = 0.70
+
+# Key fields whose presence tells a usable receipt read from readable noise
+_KEY_FIELDS = ("amount", "date")
+# A key field counts as read when the parser trusts it this much (a
+# labeled or template total, a valid date; not the largest number or today)
+KEY_FIELD_CONFIDENCE = 0.5
+
+
+def key_fields_found(text: str, layout: Optional[OcrResult] = None) -> int:
+    """Number of key fields (total, date) the parser reads from the OCR text with confidence."""
+    provenance: Dict[str, FieldSource] = {}
+    parse_receipt(text, layout=layout, provenance=provenance)
+    return sum(1 for f in _KEY_FIELDS if parse_confidence(provenance, (f,)) >= KEY_FIELD_CONFIDENCE)
+
+
+@dataclass
+class OcrPass:
+    """One engine run inside the cascade."""
+    engine: str
+    mode: str
+    confidence: float
+    fields: int
+    chars: int
+    ms: float
+
+
+@dataclass
+class CascadeReport:
+    """How many passes a receipt needed and what they cost."""
+    passes: List[OcrPass] = field(default_factory=list)
+    accepted: bool = False
+    # Mean word confidence of the read that was kept
+    confidence: float = 0.0
+    # Registry keys the step order was planned with (see ocr/engine_registry.py)
+    template: str = ANY
+    bucket: str = ANY
+    # Image measurements that chose the steps (see ocr/quality.py)
+    quality: Optional[QualityReport] = None
+    # Source of every field parsed from the kept read (set by ocr/pipeline.py)
+    provenance: Dict[str, FieldSource] = field(default_factory=dict)
+
+    @property
+    def pass_count(self) -> int:
+        return len(self.passes)
+
+    @property
+    def paddle_used(self) -> bool:
+        return any(p.engine == "paddle" for p in self.passes)
+
+    @property
+    def parse_confidence(self) -> float:
+        return parse_confidence(self.provenance)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(p.ms for p in self.passes)
+
+
+def _score(result: OcrResult, fields: int) -> float:
+    # Confidence decides between reads; each key field found is worth a lot
+    return result.mean_confidence + 0.25 * fields
+
+
+def _accepted(result: OcrResult, fields: int) -> bool:
+    return result.mean_confidence >= ACCEPT_CONFIDENCE and fields == len(_KEY_FIELDS)
+
+
+def run_ocr_cascade(img: Image.Image, registry: Optional[EngineRegistry] = None,
+                    quality: Optional[QualityReport] = None) -> Tuple[OcrResult, CascadeReport]:
+    """
+    Runs the non-AI OCR engines until one read is good enough.
+
+    Routing is driven by word confidence and key-field presence rather than
+    text length: a confident read with total and date stops the cascade, a
+    confident read with missing fields retries with PSM 6, an unconfident
+    read skips straight to the next step, and PaddleOCR is skipped once
+    Tesseract produced a confident, complete read. The image quality
+    report decides which steps are worth running at all; their order comes
+    from the engine registry, which learns it per template and quality
+    bucket, and is re-planned as soon as a read names the vendor.
+    """
+    from ocr.image_preprocessing import preprocess_image
+    from ocr.paddle_engine import extract_result_paddle
+    from ocr.paddle_service import backend_available
+    from ocr.tesseract_engine import extract_result_tesseract
+
+    registry = registry or get_registry()
+    quality = quality or assess_quality(img)
+    report = CascadeReport(bucket=quality.bucket, quality=quality)
+    best: Optional[OcrResult] = None
+    best_score = -1.0
+    best_fields = 0
+    # Index in `outcomes` of the step that produced `best`
+    best_step = -1
+    outcomes: List[Tuple[str, bool, float]] = []
+
+    def _record(result: OcrResult, mode: str, start: float) -> bool:
+        nonlocal best, best_score, best_fields, best_step
+        fields = key_fields_found(result.text, layout=result)
+        report.passes.append(OcrPass(
+            engine=result.engine,
+            mode=mode,
+            confidence=result.mean_confidence,
+            fields=fields,
+            chars=len(result.text.strip()),
+            ms=(time.perf_counter() - start) * 1000,
+        ))
+        score = _score(result, fields)
+        if score > best_score:
+            best, best_score, best_fields, best_step = result, score, fields, len(outcomes)
+        report.accepted = _accepted(result, fields)
+        return report.accepted
+
+    def _tesseract(mode: str) -> bool:
+        start = time.perf_counter()
+        try:
+            prepared = img.convert("L") if mode == "original" else preprocess_image(img, mode=mode)
+            result = extract_result_tesseract(prepared, psm=3)
+        except Exception:
+            return False
+        if _record(result, mode, start):
+            return True
+
+        # Confident but incomplete: the layout, not the pixels, is the problem
+        if result.mean_confidence >= _RETRY_PSM_CONFIDENCE:
+            start = time.perf_counter()
+            try:
+                result = extract_result_tesseract(prepared, psm=6)
+            except Exception:
+                return False
+            return _record(result, mode, start)
+        return False
+
+    def _paddle() -> Optional[bool]:
+        # The "Heavy Hitter": only worth it while no read is confident and complete
+        if best is not None and best.mean_confidence >= PADDLE_CONFIDENCE and best_fields == len(_KEY_FIELDS):
+            return None
+        start = time.perf_counter()
+        try:
+            return _record(extract_result_paddle(img), "original", start)
+        except Exception as e:
+            print(f"PaddleOCR fallback failed: {e}")
+            return False
+
+    steps = [s for s in STEPS if quality.allows(s.engine, s.mode)]
+    if not backend_available():
+        # No PaddleOCR here: Tesseract in the modes the image still allows
+        steps = [s for s in STEPS if s.engine == "tesseract" and s.mode in quality.modes]
+    remaining = registry.plan(report.template, report.bucket, steps)
+    while remaining:
+        step = remaining.pop(0)
+        start = time.perf_counter()
+        accepted = _tesseract(step.mode) if step.engine == "tesseract" else _paddle()
+        if accepted is None:
+            continue  # skipped, nothing to learn
+        outcomes.append((step.name, accepted, (time.perf_counter() - start) * 1000))
+        if accepted:
+            break
+
+        # The first read usually names the vendor: re-plan the rest for its template
+        if report.template == ANY and best is not None:
+            template = get_matching_template(best.text)
+            if template:
+                report.template = template.name
+                remaining = registry.plan(report.template, report.bucket, remaining)
+
+    # A confident read that was kept counts as a success for its step even
+    # when a key field is genuinely missing from the receipt
+    if best is not None and best.mean_confidence >= ACCEPT_CONFIDENCE and 0 <= best_step < len(outcomes):
+        name, _, ms = outcomes[best_step]
+        outcomes[best_step] = (name, True, ms)
+    registry.record(report.template, report.bucket, outcomes)
+    report.accepted = best is not None and _accepted(best, best_fields)
+    report.confidence = best.mean_confidence if best else 0.0
+    return best or OcrResult(engine="none"), report
@@ -1,6 +1,35 @@
+"""
+Vendor templates: regexes for the fields of known receipt layouts.
+
+Templates live in a registry file (ocr/templates.json by default, or YAML
+with PyYAML installed; see RECEIPT_TEMPLATES in config/config.py):
+
+    {"templates": [{"name": "Walmart", "aliases": ["walmart"],
+                    "total_pattern": "(?i)total\\s+due\\s+(\\d+\\.\\d{2})", ...}]}
+
+`aliases` are the (lower-case) strings that identify the vendor in OCR
+text, including its usual misreads. Numeric dates a template captures are
+read month first unless it sets "day_first": true. All aliases of all
+templates are compiled into a single trie-shaped regex, so vendor
+detection is one scan of the text however many templates there are. The earliest alias in the
+text wins (vendor names head the receipt); at the same position the longer
+one does. The file is re-read when it changes, without a restart.
+"""
+import json
+import os
 import re
-from dataclasses import dataclass
-from typing import List, Optional, Pattern
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Pattern
+
+from config.config import RECEIPT_TEMPLATES
+from utils.helpers import trie_pattern
+
+_FIELDS = ("date", "total", "tax", "subtotal", "bill_id", "line_item")
+# How often (seconds) the registry file is checked for changes
+_CHECK_SECONDS = 2.0
+
 
 @dataclass
 class ReceiptTemplate:
@@ -8,70 +37,147 @@ class ReceiptTemplate:
     Defines a regex-based template for a specific vendor layout.
     """
     name: str
-    vendor_pattern: str  # Regex to identify this vendor (e.g. "Walmart")
+    aliases: List[str]  # Lower-case strings identifying the vendor (e.g. "walmart")
     date_pattern: Optional[str] = None
     total_pattern: Optional[str] = None
     tax_pattern: Optional[str] = None
     subtotal_pattern: Optional[str] = None
     bill_id_pattern: Optional[str] = None
     line_item_pattern: Optional[str] = None
+    # Numeric dates read as DD/MM (US layouts are MM/DD)
+    day_first: bool = False
+    # "date", "total", ... -> compiled *_pattern, built once
+    compiled: Dict[str, Pattern] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.aliases = [a.lower() for a in self.aliases]
+        for name in _FIELDS:
+            pattern = getattr(self, f"{name}_pattern")
+            if pattern:
+                self.compiled[name] = re.compile(pattern)
+
+    def search(self, name: str, text: str) -> Optional[str]:
+        """First capture group of the `name` pattern in `text`, or None."""
+        pattern = self.compiled.get(name)
+        m = pattern.search(text) if pattern else None
+        return m.group(1) if m else None
+
+
+# ================= LOADING =================
+def load_templates(path: str) -> List[ReceiptTemplate]:
+    """Parses and compiles a registry file; ValueError says what is wrong with it."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml  # type: ignore
+            except ImportError:
+                raise ImportError(f"PyYAML is needed to read {path} (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    entries = data.get("templates") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a list of templates")
+    allowed = {"name", "aliases", "day_first"} | {f"{name}_pattern" for name in _FIELDS}
+    templates = []
+    for i, entry in enumerate(entries):
+        label = entry.get("name", f"#{i}") if isinstance(entry, dict) else f"#{i}"
+        if not isinstance(entry, dict) or not entry.get("name") or not entry.get("aliases"):
+            raise ValueError(f"{path}: template {label} needs a name and at least one alias")
+        unknown = set(entry) - allowed
+        if unknown:
+            raise ValueError(f"{path}: template {label}: unknown keys {sorted(unknown)}")
+        try:
+            templates.append(ReceiptTemplate(**entry))
+        except re.error as e:
+            raise ValueError(f"{path}: template {label}: bad pattern: {e}")
+    return templates
+
+
+def build_vendor_matcher(aliases: Iterable[str]) -> Optional[Pattern]:
+    """One regex matching any of `aliases` (a trie, see utils/helpers.trie_pattern)."""
+    aliases = list(aliases)
+    return re.compile(trie_pattern(aliases)) if aliases else None
+
+
+# ================= REGISTRY =================
+class _TemplateSet:
+    """An immutable snapshot: the templates, their alias lookup and the matcher."""
+
+    def __init__(self, templates: List[ReceiptTemplate]):
+        self.templates = templates
+        self.by_alias: Dict[str, ReceiptTemplate] = {}
+        for tmpl in templates:
+            for alias in tmpl.aliases:
+                # An alias claimed twice belongs to the first template listed
+                self.by_alias.setdefault(alias, tmpl)
+        self.matcher = build_vendor_matcher(self.by_alias)
+
+
+class TemplateRegistry:
+    """Templates loaded from `path`, re-read when the file changes."""
+
+    def __init__(self, path: str = RECEIPT_TEMPLATES, check_seconds: float = _CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._set = _TemplateSet([])
+        self.reload()
+
+    def reload(self) -> None:
+        """Loads the file now; raises if it is unreadable or invalid."""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            self._set = _TemplateSet(load_templates(self.path))
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+        try:
+            if os.stat(self.path).st_mtime_ns == self._mtime:
+                return
+            self.reload()
+        except Exception as e:
+            # Keep serving the last good templates until the file is fixed
+            print(f"Template reload failed, keeping {len(self._set.templates)} templates: {e}")
+            try:
+                self._mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                pass
+
+    @property
+    def templates(self) -> List[ReceiptTemplate]:
+        self._refresh()
+        return self._set.templates
+
+    def match(self, text: str) -> Optional[ReceiptTemplate]:
+        """The template of the vendor named earliest in `text`, or None."""
+        self._refresh()
+        current = self._set
+        m = current.matcher.search(text.lower()) if current.matcher else None
+        return current.by_alias[m.group(0)] if m else None
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
 
-# Define common templates
-TEMPLATES: List[ReceiptTemplate] = [
-    ReceiptTemplate(
-        name="Walmart",
-        vendor_pattern=r"(?i)walmart",
-        date_pattern=r"(\d{2}/\d{2}/\d{2,4})",  # MM/DD/YY
-        total_pattern=r"(?i)\btotal\s+due\s+\$?\s*(\d+\.\d{2})",
-        tax_pattern=r"(?i)tax\s+\d+\s*\$?\s*(\d+\.\d{2})",
-        bill_id_pattern=r"(?i)tc#\s*(\d+)"
-    ),
-    ReceiptTemplate(
-        name="Target",
-        vendor_pattern=r"(?i)target",
-        date_pattern=r"(\d{2}/\d{2}/\d{4})",
-        total_pattern=r"(?i)\btotal\s+\$?\s*(\d+\.\d{2})",
-        bill_id_pattern=r"(?i)receipt#\s*([a-zA-Z0-9-]+)"
-    ),
-    ReceiptTemplate(
-        name="Costco",
-        vendor_pattern=r"(?i)costco",
-        date_pattern=r"(\d{2}/\d{2}/\d{4})",
-        total_pattern=r"(?i)total\s+owned\s+\$?\s*(\d+\.\d{2})",
-    ),
-    ReceiptTemplate(
-        name="Amazon",
-        vendor_pattern=r"(?i)amazon",
-        date_pattern=r"(?i)shipped on\s+(\w+\s+\d{1,2},\s+\d{4})",
-        total_pattern=r"(?i)grand total:\s*\$?\s*(\d+\.\d{2})",
-        bill_id_pattern=r"(?i)order #\s*([0-9-]{10,})",
-    ),
-    ReceiptTemplate(
-        name="Wirral School Shops",
-        vendor_pattern=r"(?i)wirral school shops",
-        date_pattern=r"(\d{4}-\d{2}-\d{2})",
-        total_pattern=r"(?i)total\s+amount\s+₹?\s*(\d+\.\d{2})",
-        tax_pattern=r"(?i)tax\s+₹?\s*(\d+\.\d{2})"
-    ),
-    ReceiptTemplate(
-        name="Melaka Layout",
-        vendor_pattern=r"(?i)melaka|maas",
-        total_pattern=r"(?i)grand\s+total\s*[:\-\s]*(\d+[.,]\d{2,3})",
-        subtotal_pattern=r"(?i)subtotal\s*[:\-\s]*(\d+[.,]\d{2,3})",
-    ),
-    # Generic fallback templates if needed
-]
+def get_template_registry() -> TemplateRegistry:
+    """The process-wide registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry()
+        return _registry
 
 
 def get_matching_template(text: str) -> Optional[ReceiptTemplate]:
-    """Finds the first template that matches the vendor pattern in the text."""
-    text_lower = text.lower()
-    for tmpl in TEMPLATES:
-        # Standard regex match
-        if re.search(tmpl.vendor_pattern, text):
-            return tmpl
-        # Fuzzy fallback for known vendors (e.g. if 'Melaka' is read as 'MAAS')
-        if tmpl.name == "Melaka Layout":
-            if any(fuzzy in text_lower for fuzzy in ["maas", "mlaka", "melka", "meaka"]):
-                return tmpl
-    return None
+    """Finds the template whose vendor is named in the text."""
+    return get_template_registry().match(text)
@@ -0,0 +1,49 @@
+from functools import partial
+
+import pytesseract  # type: ignore
+from PIL import Image
+
+from ocr.ocr_result import OcrResult, OcrToken
+from ocr.tiling import is_tall, map_bands, ocr_tiled
+
+
+def extract_result_tesseract(pil_image: Image.Image, psm: int = 3) -> OcrResult:
+    """
+    Runs Tesseract via image_to_data, keeping per-word confidences and
+    boxes and rebuilding the line structure image_to_string would produce.
+    Very tall receipts are read as overlapping bands, one Tesseract process
+    per core.
+    """
+    if is_tall(pil_image):
+        return ocr_tiled(pil_image, partial(map_bands, partial(_run_tesseract, psm=psm)), f"tesseract-psm{psm}")
+    return _run_tesseract(pil_image, psm)
+
+
+def _run_tesseract(pil_image: Image.Image, psm: int) -> OcrResult:
+    data = pytesseract.image_to_data(
+        pil_image, config=f"--psm {psm}", output_type=pytesseract.Output.DICT
+    )
+
+    tokens = []
+    line_no = -1
+    current_key = None
+
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        conf = float(data["conf"][i])
+        # conf == -1 marks block / paragraph / line rows, not words
+        if not word or conf < 0:
+            continue
+
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if key != current_key:
+            line_no += 1
+            current_key = key
+        tokens.append(OcrToken(
+            text=word,
+            confidence=conf / 100.0,
+            box=(data["left"][i], data["top"][i], data["width"][i], data["height"][i]),
+            line=line_no,
+        ))
+
+    return OcrResult.from_tokens(f"tesseract-psm{psm}", tokens)
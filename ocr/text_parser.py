@@ -1,6 +1,105 @@
+import hashlib
+import math
 import re
+from dataclasses import dataclass, field
 from datetime import datetime
-import random
+from typing import Dict, List, Optional, Tuple, Union
+
+from ocr.categories import categorize
+from ocr.dates import find_date
+from ocr.templates import get_matching_template
+from ocr.layout import SUBTOTAL_WORDS, find_labeled_amounts
+from ocr.reconcile import accept, reconcile
+from ocr.vendors import known_vendor, match_key
+
+
+# ---------- COMPILED RULES ----------
+# Every pattern is compiled once at import; parse_receipt only runs them.
+
+# OCR autocorrect as translate tables (one pass instead of chained .replace())
+# Amounts: O/o -> 0, S/s -> 5, I/l/| -> 1, B -> 8, thousands separators dropped
+_AMOUNT_FIXES = str.maketrans({"o": "0", "s": "5", "i": "1", "l": "1", "|": "1", "b": "8", ",": None})
+# Whole text (for the reconciliation search): O/o -> 0, S/s -> 5
+_TEXT_FIXES = str.maketrans({"o": "0", "s": "5"})
+# Financial lines: O/o -> 0, S/s -> 5, I/i/| -> 1
+_LINE_FIXES = str.maketrans({"o": "0", "s": "5", "|": "1", "i": "1"})
+
+# (?<!\d): a match never starts inside a run of digits, so a long run is
+# tried once instead of from every position (quadratic)
+_NUMBER = re.compile(r"(?<!\d)\d+[.,]\d{2,3}\b|\b\d+\.\d+\b")
+_LOOSE_NUMBER = re.compile(r"\d+[.,]?\d*")
+
+# Reordered and added word boundaries to prevent partial matches like 'action' from 'Transaction'
+_BILL_PREFIXES = r"(?:transaction|invoice|receipt|order|ticket|bill|inv|rec|txn|trans)"
+_BILL_PATTERNS = [
+    re.compile(rf"(?i)\b{_BILL_PREFIXES}\b\s*(?:no|id|number|#)?\s*[:.-]?\s*([a-zA-Z0-9/-]+)"),
+    re.compile(r"(?i)#\s*([a-zA-Z0-9/-]+)"),
+    re.compile(r"(?i)\b(?:inv|rec|txn)\b\s*[:.-]?\s*([a-zA-Z0-9/-]+)"),
+]
+# A line can only hold a bill ID if it has one of the prefixes or a '#'
+_BILL_HINT = re.compile(rf"(?i)#|\b{_BILL_PREFIXES}\b")
+_BILL_ID_STOPWORDS = ("total", "tax", "date", "amount", "item")
+
+_GENERIC_HEADERS = {"tax invoice", "cash receipt", "bill of supply", "estimate", "original", "trans"}
+
+# TOTAL keywords: Prioritize "Grand Total" and handle fuzzy/corrupted labels
+_TOTAL_WORDS = r"grand\s*total|t[o0]t[a4]l|due|payable|amount|net\s*total"
+# TAX keywords: Exhaustive list (Service Charge, VAT, GST, Sales Tax, Cess, etc.)
+_TAX_WORDS = (r"tax|g\s*s\s*t|v\s*a\s*t|cgst|sgst|igst|utgst|sales\s*tax|service\s*charge|service\s*tax|"
+              r"luxury\s*tax|cess|hsn|sac|tva|iva|mwst|consumption\s*tax|tax\s*amount")
+# SUBTOTAL keywords: Fuzzy matching (the same alternation labels layout rows)
+_SUBTOTAL_WORDS = SUBTOTAL_WORDS
+_TOTAL_LABEL = re.compile(rf"(?i)\b({_TOTAL_WORDS})\b")
+_TAX_LABEL = re.compile(rf"(?i)\b({_TAX_WORDS})\b")
+_SUBTOTAL_LABEL = re.compile(rf"(?i)\b({_SUBTOTAL_WORDS})\b")
+# Matches exactly the lines at least one of the three labels matches
+_FINANCIAL_LABEL = re.compile(rf"(?i)\b(?:{_TOTAL_WORDS}|{_TAX_WORDS}|{_SUBTOTAL_WORDS})\b")
+
+# Identify item lines: [Quantity] [Name] [Price] or [Name] [Price]
+_NOT_AN_ITEM = re.compile(r"(?i)(total|subtotal|subttl|tax|vat|gst|change|cash|card|due|savings|discount|round|balance|items|summary|charge)")
+# Example: "2 Pizza 500.00" (a quantity of up to 9999). Names start and
+# end on a non-space and the rupee sign owns its spaces: with
+# "(.+?)\s+₹?\s*" a long run of spaces could be split three ways and
+# matching went cubic in the line length.
+_QTY_ITEM = re.compile(r"^(\d{1,4})\s+(\S(?:.*?\S)?)\s+(?:₹\s*)?(\d+[.,]\d{2}|\d+\.\d+)\s*$")
+# Example: "Pizza 250.00" (or a whole-number price)
+_ITEM = re.compile(r"^(.*?\S)\s+(?:₹\s*)?(\d+[.,]\d{2}|\d+\.\d+)\s*[*x]?$")
+_ITEM_WHOLE_PRICE = re.compile(r"^(.*?\S)\s+(?:₹\s*)?(\d+)\s*[*x]?$")
+
+
+# ---------- PROVENANCE ----------
+# Where a field's value came from, and how far it can be trusted
+SOURCE_CONFIDENCE = {
+    "template": 0.95,        # the vendor template's own pattern
+    "layout": 0.9,           # a label paired with its amount by position
+    "reconciliation": 0.85,  # printed numbers adding up to the total
+    "text": 0.85,            # a valid date found in the text
+    "keyword": 0.8,          # a labeled line ("Bill No", "TOTAL", "GST")
+    "known_vendor": 0.8,     # the first line matches a known vendor
+    "derived": 0.6,          # worked out from the other two amounts
+    "items": 0.5,            # the item prices summed
+    "first_line": 0.5,       # the first line, taken as the vendor name
+    "guess": 0.2,            # the largest number on the receipt
+    "fallback": 0.0,         # nothing found: content-hash bill ID, today, 0.00
+}
+# Fields whose confidence decides whether a receipt is worth a costlier read
+# (a missing tax line is usually a receipt without tax)
+KEY_FIELDS = ("bill_id", "vendor", "date", "amount")
+
+
+@dataclass(frozen=True)
+class FieldSource:
+    """Provenance of one parsed field."""
+    source: str
+
+    @property
+    def confidence(self) -> float:
+        return SOURCE_CONFIDENCE[self.source]
+
+
+def parse_confidence(provenance: Dict[str, FieldSource], fields: Tuple[str, ...] = KEY_FIELDS) -> float:
+    """Confidence of a parse: that of its least trusted key field."""
+    return min((provenance[f].confidence for f in fields if f in provenance), default=0.0)
 
 
 # ---------- HELPERS ----------
@@ -8,14 +107,12 @@ import random
 def _clean_amount(val):
     try:
         if not val: return 0.0
-        # OCR Autocorrect: Fix common misreadings
-        # O/o -> 0, S/s -> 5, I/l/| -> 1, B -> 8
-        clean_val = val.lower()
-        clean_val = clean_val.replace("o", "0").replace("s", "5").replace("i", "1").replace("l", "1").replace("|", "1").replace("b", "8")
-        clean_val = clean_val.replace(",", "")
+        clean_val = val.lower().translate(_AMOUNT_FIXES)
         # Remove any non-numeric characters except dots
         clean_val = "".join(c for c in clean_val if c.isdigit() or c == ".")
-        return float(clean_val)
+        value = float(clean_val)
+        # A run of hundreds of digits is no amount (and overflows in cents)
+        return value if value * 100 < math.inf else 0.0
     except Exception:
         return 0.0
 
@@ -27,286 +124,279 @@ def _round2(val):
     return int(val * 100 + 0.5) / 100.0
 
 
-def _default_bill_id():
-    return f"BILL-{random.randint(100000, 999999)}"
+def fallback_bill_id(vendor: Optional[str], date: Optional[str], amount: float,
+                     content: Union[str, bytes] = b"") -> str:
+    """
+    'BILL-' + 10 hex digits for a receipt without a printed bill ID, hashed
+    from its vendor, date, amount and content (OCR text or image bytes), so
+    the same receipt processed again gets the same ID.
+    """
+    if isinstance(content, str):
+        content = " ".join(content.lower().split()).encode()
+    h = hashlib.blake2b(f"{match_key(vendor)}|{date or ''}|{float(amount or 0.0):.2f}|".encode(), digest_size=5)
+    h.update(content)
+    return f"BILL-{h.hexdigest().upper()}"
 
 
-def _extract_date(text):
+def _extract_date(text, template_date=None, day_first=True):
     """
-    NLP-style date extraction (multiple formats)
+    (date, source): the template's date if it reads as one, else the first
+    date in the text (ocr/dates.py), else today.
     """
-    patterns = [
-        r"\b(\d{4}-\d{2}-\d{2})\b",          # 2024-01-27
-        r"\b(\d{2}/\d{2}/\d{4})\b",          # 27/01/2024
-        r"\b(\d{2}-\d{2}-\d{4})\b",          # 27-01-2024
-    ]
-
-    for p in patterns:
-        m = re.search(p, text)
+    date = find_date(template_date, day_first)
+    if date:
+        return date, "template"
+    date = find_date(text)
+    if date:
+        return date, "text"
+    return datetime.today().strftime("%Y-%m-%d"), "fallback"
+
+
+# ---------- LINE SCANNER ----------
+
+@dataclass
+class _LineScan:
+    """Candidates for every field, collected in one pass over the lines."""
+    bill_id: Optional[str] = None
+    # Every amount-like number on the receipt (for the reconciliation search)
+    numbers: List[float] = field(default_factory=list)
+    totals: List[float] = field(default_factory=list)
+    taxes: List[float] = field(default_factory=list)
+    subtotals: List[float] = field(default_factory=list)
+    # Per item-like line: ((name, qty, price) | None, (name, price) | None).
+    # Which one counts depends on the total, known only after the scan.
+    item_candidates: List[Tuple[Optional[Tuple[str, int, float]], Optional[Tuple[str, float]]]] = field(default_factory=list)
+
+
+def _match_bill_id(line: str) -> Optional[str]:
+    if not _BILL_HINT.search(line):
+        return None
+    for p in _BILL_PATTERNS:
+        m = p.search(line)
         if m:
-            raw = m.group(1)
-            try:
-                if "-" in raw and raw.count("-") == 2:
-                    return datetime.strptime(raw, "%Y-%m-%d").strftime("%Y-%m-%d")
-                if "/" in raw:
-                    return datetime.strptime(raw, "%d/%m/%Y").strftime("%Y-%m-%d")
-            except Exception:
-                pass
+            candidate = m.group(1)
+            if candidate and len(candidate) > 2 and not any(kw in candidate.lower() for kw in _BILL_ID_STOPWORDS):
+                return candidate
+    return None
 
-    # fallback → today
-    return datetime.today().strftime("%Y-%m-%d")
 
+def _line_amounts(cleaned: str) -> List[float]:
+    nums = _NUMBER.findall(cleaned)
+    if not nums:
+        nums = _LOOSE_NUMBER.findall(cleaned)
+    return [_clean_amount(n) for n in nums if len(n) > 1]
+
+
+def _scan_lines(lines: List[str], find_bill_id: bool, text_financials: bool) -> _LineScan:
+    """
+    Classifies every line once: bill ID (until one is found), amount-like
+    numbers, labeled total / tax / subtotal amounts (unless the layout
+    supplied all three) and item candidates.
+    """
+    scan = _LineScan()
+    first_index: Dict[str, int] = {}
+
+    for i, l in enumerate(lines):
+        first_index.setdefault(l, i)
+        lowered = l.lower()
+        # Clean text for labels and numbers (Noise reduction)
+        cleaned = lowered.translate(_TEXT_FIXES)
+        if "t[a4]x" in cleaned:
+            cleaned = cleaned.replace("t[a4]x", "tax")
+        scan.numbers.extend(_clean_amount(n) for n in _NUMBER.findall(cleaned))
+
+        if find_bill_id and scan.bill_id is None:
+            scan.bill_id = _match_bill_id(l)
+
+        if text_financials and _FINANCIAL_LABEL.search(l):
+            amounts = _line_amounts(lowered.translate(_LINE_FIXES))
+            if amounts and _TOTAL_LABEL.search(l):
+                scan.totals.append(amounts[-1])
+            if _TAX_LABEL.search(l) and "invoice" not in lowered:
+                if amounts:
+                    scan.taxes.append(amounts[-1])
+                else:
+                    # Multi-line association: the amount is on the line after the label
+                    nxt = first_index[l] + 1
+                    if nxt < len(lines):
+                        next_nums = _NUMBER.findall(lines[nxt])
+                        if next_nums:
+                            scan.taxes.append(_clean_amount(next_nums[0]))
+            if amounts and _SUBTOTAL_LABEL.search(l):
+                scan.subtotals.append(amounts[-1])
+
+        if _NOT_AN_ITEM.search(l):
+            continue
+        strict = loose = None
+        m = _QTY_ITEM.search(l)
+        if m:
+            strict = (m.group(2).strip(), int(m.group(1)), _clean_amount(m.group(3)))
+        m = _ITEM.search(l) or _ITEM_WHOLE_PRICE.search(l)
+        if m:
+            loose = (m.group(1).strip(), _clean_amount(m.group(2)))
+        if strict or loose:
+            scan.item_candidates.append((strict, loose))
+
+    return scan
+
+
+def _select_items(scan: _LineScan, total: float) -> List[dict]:
+    items = []
+    for strict, loose in scan.item_candidates:
+        if strict:
+            name, qty, price = strict
+            if 0 < price <= total and len(name) > 1:
+                items.append({"Item": name, "Quantity": qty, "Price": price})
+                continue
+        if loose:
+            name, price = loose
+            if 0 < price <= total and len(name) > 2:
+                items.append({"Item": name, "Price": price})
+    return items
 
-from ocr.templates import get_matching_template
 
 # ---------- MAIN PARSER ----------
 
-def parse_receipt(text: str):
+def parse_receipt(text: str, layout=None, provenance: Optional[Dict[str, FieldSource]] = None):
     """
     Returns structured data and item list from raw OCR text.
     First tries template-based parsing, then falls back to generic rules.
+    When `layout` (an OcrResult with token boxes) is given, financial labels
+    are paired with their right-aligned amounts geometrically instead; a
+    field the layout finds no label for still comes from the text rules.
+
+    The generic rules are precompiled and applied in a single pass over the
+    lines (_scan_lines), which collects candidates for every field at once.
+    If `provenance` is given, the source of every field (a FieldSource,
+    see SOURCE_CONFIDENCE) is stored in it.
     """
-    
+
     # Try template-based parsing first
     template = get_matching_template(text)
     template_data = {}
-    
+
     if template:
         # Extract fields using template patterns
-        if template.bill_id_pattern:
-            m = re.search(template.bill_id_pattern, text)
-            if m: template_data['bill_id'] = m.group(1)
-            
-        if template.date_pattern:
-            m = re.search(template.date_pattern, text)
-            if m: template_data['date'] = m.group(1) # Note: might need normalization
-            
-        if template.total_pattern:
-            m = re.search(template.total_pattern, text)
-            if m: template_data['amount'] = _clean_amount(m.group(1))
-
-        if template.tax_pattern:
-            m = re.search(template.tax_pattern, text)
-            if m: template_data['tax'] = _clean_amount(m.group(1))
-
-        if template.subtotal_pattern:
-            m = re.search(template.subtotal_pattern, text)
-            if m: template_data['subtotal'] = _clean_amount(m.group(1))
+        bill_id = template.search("bill_id", text)
+        if bill_id: template_data['bill_id'] = bill_id
+
+        date = template.search("date", text)
+        if date: template_data['date'] = date
+
+        for key, name in (("amount", "total"), ("tax", "tax"), ("subtotal", "subtotal")):
+            raw = template.search(name, text)
+            if raw: template_data[key] = _clean_amount(raw)
 
         template_data['vendor'] = template.name
 
     lines = [l.strip() for l in text.splitlines() if l.strip()]
 
-    # ---------- BILL ID ----------
-    bill_id = template_data.get('bill_id')
-    if not bill_id:
-        # Reordered and added word boundaries to prevent partial matches like 'action' from 'Transaction'
-        bill_prefixes = r"(?:transaction|invoice|receipt|order|ticket|bill|inv|rec|txn|trans)"
-        bill_patterns = [
-            rf"(?i)\b{bill_prefixes}\b\s*(?:no|id|number|#)?\s*[:.-]?\s*([a-zA-Z0-9/-]+)",
-            r"(?i)#\s*([a-zA-Z0-9/-]+)",
-            r"(?i)\b(?:inv|rec|txn)\b\s*[:.-]?\s*([a-zA-Z0-9/-]+)"
-        ]
-        
-        for l in lines:
-            for p in bill_patterns:
-                m = re.search(p, l)
-                if m:
-                    candidate = m.group(1)
-                    if candidate and len(candidate) > 2 and not any(kw in candidate.lower() for kw in ['total', 'tax', 'date', 'amount', 'item']):
-                        bill_id = candidate
-                        break
-            if bill_id:
-                break
+    # Layout-aware path: labels and amounts paired by row position
+    potential_totals = []
+    potential_taxes = []
+    potential_subtotals = []
+    if layout is not None and layout.has_layout:
+        labeled = find_labeled_amounts(layout)
+        potential_totals = [_clean_amount(a) for a in labeled["total"]]
+        potential_taxes = [_clean_amount(a) for a in labeled["tax"]]
+        potential_subtotals = [_clean_amount(a) for a in labeled["subtotal"]]
+
+    # Text path: fills in each field the layout found no label for
+    layout_found = {"amount": bool(potential_totals), "tax": bool(potential_taxes),
+                    "subtotal": bool(potential_subtotals)}
+    text_financials = not all(layout_found.values())
+    scan = _scan_lines(lines, find_bill_id='bill_id' not in template_data, text_financials=text_financials)
+    potential_totals = potential_totals or scan.totals
+    potential_taxes = potential_taxes or scan.taxes
+    potential_subtotals = potential_subtotals or scan.subtotals
+    all_numbers = scan.numbers
+    sources: Dict[str, str] = {}
 
-    if not bill_id:
-        bill_id = _default_bill_id()
+    # ---------- BILL ID ----------
+    # (if none is printed, one is derived from the final fields below)
+    bill_id = template_data.get('bill_id') or scan.bill_id
+    sources["bill_id"] = "template" if 'bill_id' in template_data else "keyword"
 
     # ---------- VENDOR ----------
-    vendor = template_data.get('vendor')
+    vendor = printed_vendor = template_data.get('vendor')
+    sources["vendor"] = "template"
     if not vendor:
-        vendor = "Unknown Vendor"
-        generic_headers = ["tax invoice", "cash receipt", "bill of supply", "estimate", "original", "trans"]
-        
-        # Using simple loop to avoid slice indexing lint errors
-        for i, line_text in enumerate(lines):
-            if i >= 3:
-                break
-            if line_text.lower().strip() not in generic_headers and len(line_text) > 3:
-                vendor = line_text
+        vendor = printed_vendor = "Unknown Vendor"
+        sources["vendor"] = "fallback"
+        for line_text in lines[:3]:
+            if line_text.lower().strip() not in _GENERIC_HEADERS and len(line_text) > 3:
+                # "D-Mart Ready" -> "DMart" when that vendor is known
+                known = known_vendor(line_text)
+                vendor, printed_vendor = known or line_text, line_text
+                sources["vendor"] = "known_vendor" if known else "first_line"
                 break
 
     # ---------- DATE ----------
-    date = template_data.get('date')
-    if not date:
-        date = _extract_date(text)
-    else:
-        # Basic normalization for template dates
-        try:
-            # Try some common formats or just return as is if it looks okay
-            if re.match(r"\d{4}-\d{2}-\d{2}", date):
-                pass 
-            elif "/" in date:
-                parts = date.split("/")
-                if len(parts) == 3:
-                    if len(parts[2]) == 2: parts[2] = "20" + parts[2]
-                    # Default: Assume MM/DD/YYYY structure for US templates
-                    # parts[0]=MM, parts[1]=DD, parts[2]=YYYY
-                    mm, dd, yyyy = parts[0], parts[1], parts[2]
-                    
-                    # If MM > 12, swap to DD/MM/YYYY
-                    if int(mm) > 12:
-                         mm, dd = dd, mm
-                         
-                    date = f"{yyyy}-{mm}-{dd}"
-        except:
-             date = _extract_date(text)
+    date, sources["date"] = _extract_date(text, template_data.get('date'), template.day_first if template else True)
 
     # ---------- FINANCIALS ----------
-    total = 0.0
-    tax = 0.0
-    subtotal = 0.0
-    
-    potential_totals = []
-    potential_taxes = []
-    potential_subtotals = []
-
-    # Clean text globally for labels and numbers (Noise reduction)
-    clean_text = text.lower().replace("o", "0").replace("s", "5").replace("t[a4]x", "tax")
-    all_numbers = [_clean_amount(n) for n in re.findall(r"\d+[.,]\d{2,3}\b|\b\d+\.\d+\b", clean_text)]
-    
-    for l in lines:
-        # Normalize the line for better matching
-        l_clean = l.lower().replace("o", "0").replace("s", "5").replace("|", "1").replace("i", "1")
-        nums = re.findall(r"\d+[.,]\d{2,3}\b|\b\d+\.\d+\b", l_clean)
-        if not nums:
-            nums = re.findall(r"\d+[.,]?\d*", l_clean)
-            
-        current_nums = [_clean_amount(n) for n in nums if len(n) > 1]
-        
-        # TOTAL keywords: Prioritize "Grand Total" and handle fuzzy/corrupted labels
-        if re.search(r"(?i)\b(grand\s*total|t[o0]t[a4]l|due|payable|amount|net\s*total)\b", l):
-            if current_nums:
-                potential_totals.append(current_nums[-1])
-        
-        # TAX keywords: Exhaustive list (Service Charge, VAT, GST, Sales Tax, Cess, etc.)
-        tax_keywords = r"(?i)\b(tax|g\s*s\s*t|v\s*a\s*t|cgst|sgst|igst|utgst|sales\s*tax|service\s*charge|service\s*tax|luxury\s*tax|cess|hsn|sac|tva|iva|mwst|consumption\s*tax|tax\s*amount)\b"
-        if re.search(tax_keywords, l):
-            if "invoice" not in l.lower():
-                if current_nums:
-                    potential_taxes.append(current_nums[-1])
-                else:
-                    # Multi-line association: Check the next line if the current line has a tax label but no number
-                    try:
-                        next_line = lines[lines.index(l) + 1]
-                        next_nums = re.findall(r"\d+[.,]\d{2,3}\b|\b\d+\.\d+\b", next_line)
-                        if next_nums:
-                            potential_taxes.append(_clean_amount(next_nums[0]))
-                    except (IndexError, ValueError):
-                        pass
-
-        # SUBTOTAL keywords: Fuzzy matching
-        if re.search(r"(?i)\b(sub\s*t[o0]t[a4]l|sub\s*ttl|sub\s*tot|stot|net\s*amount|net\s*amt|taxable|sub)\b", l):
-            if current_nums:
-                potential_subtotals.append(current_nums[-1])
-
     # Initial guesses
+    for key, found in (("amount", potential_totals), ("tax", potential_taxes), ("subtotal", potential_subtotals)):
+        sources[key] = ("template" if template_data.get(key) else "layout" if layout_found[key]
+                        else "keyword" if found else "fallback")
     total = template_data.get('amount') or (potential_totals[-1] if potential_totals else 0.0)
     tax = template_data.get('tax') or (potential_taxes[-1] if potential_taxes else 0.0)
     subtotal = template_data.get('subtotal') or (potential_subtotals[-1] if potential_subtotals else 0.0)
 
     # --- VERIFICATION ENGINE (PHASE 4) ---
     # Goal: Subtotal + Tax = Total
-    
-    # 1. Check if we found valid data already
-    if total > 0 and abs((subtotal + tax) - total) < 0.1:
-        pass # All good
-    
-    # 2. Try to find Total from all_numbers if missing
+
+    # 1. Try to find Total from all_numbers if missing
     if total == 0 and all_numbers:
         total = max(all_numbers)
-        
-    # 3. Explicit "No Tax" Case: If Subtotal and Total are near identical
+        sources["amount"] = "guess"
+
+    # 2. Explicit "No Tax" Case: If Subtotal and Total are near identical
     if total > 0 and tax == 0 and subtotal > 0:
         if abs(subtotal - total) < 1.0:
             subtotal = total
             tax = 0.0
-            
-    # 4. Solve for missing field if we have 2 out of 3
+            sources["tax"] = "derived"
+
+    # 3. Solve for missing field if we have 2 out of 3
     if total > 0:
         if subtotal == 0 and tax > 0:
             subtotal = total - tax
+            sources["subtotal"] = "derived"
         elif tax == 0 and subtotal > 0 and subtotal != total:
             tax = total - subtotal
+            sources["tax"] = "derived"
 
-    # 5. Advanced Brute Force Search
-    if abs((subtotal + tax) - total) > 0.5:
-        best_fit = None
-        unique_nums = sorted(list(set(all_numbers)), reverse=True)
-        
-        # Priority: Match with existing Total
-        if total > 0:
-            for a in unique_nums:
-                if a >= total: continue
-                # Search for a tax that completes the total
-                for b in unique_nums:
-                    if abs((a + b) - total) < 0.1:
-                        best_fit = (a, b, total)
-                        break
-                if best_fit: break
-        
-        if best_fit:
-            subtotal, tax, total = best_fit
+    # 4. Reconciliation: which printed numbers add up to the total (ocr/reconcile.py)
+    items: Optional[List[dict]] = None
+    if total > 0 and abs((subtotal + tax) - total) > 0.5:
+        items = _select_items(scan, total)
+        solution = accept(reconcile(all_numbers, total, [i["Price"] for i in items]))
+        if solution:
+            subtotal, tax = solution.subtotal, solution.tax
+            sources["subtotal"] = sources["tax"] = "reconciliation"
 
     # Final Fallbacks
     if total == 0.0 and all_numbers:
         total = max(all_numbers)
-        
+        sources["amount"] = "guess"
+
     if subtotal == 0.0 and total > 0:
         subtotal = total - tax
+        sources["subtotal"] = "derived"
     elif subtotal > total: # Sanity check
-        subtotal = total 
+        subtotal = total
         tax = 0.0
-    
-    if subtotal < 0: subtotal = total
+        sources["subtotal"] = sources["tax"] = "derived"
 
-    # ---------- ITEMS ----------
-    items = []
-    # Identify item lines: [Quantity] [Name] [Price] or [Name] [Price]
-    item_keywords_ignore = r"(?i)(total|subtotal|subttl|tax|vat|gst|change|cash|card|due|savings|discount|round|balance|items|summary|charge)"
-    
-    for l in lines:
-        if re.search(r"(\d+\s*x\s*\d+)", l): # Skip multiplier lines for now or handle them
-            pass
-            
-        if re.search(item_keywords_ignore, l):
-            continue
+    if subtotal < 0:
+        subtotal = total
+        sources["subtotal"] = "derived"
 
-        # Pattern 1: [Quantity] [Name] ... [Price]
-        # Example: "2 Pizza 500.00"
-        m = re.search(r"^(\d+)\s+(.+?)\s+₹?\s*(\d+[.,]\d{2}|\d+\.\d+)\s*$", l)
-        if m:
-            qty = int(m.group(1))
-            name = m.group(2).strip()
-            total_price = _clean_amount(m.group(3))
-            if 0 < total_price <= total and len(name) > 1:
-                items.append({"Item": name, "Quantity": qty, "Price": total_price})
-                continue
-                
-        # Pattern 2: [Name] ... [Price]
-        # Example: "Pizza 250.00"
-        m = re.search(r"^(.+?)\s+₹?\s*(\d+[.,]\d{2}|\d+\.\d+)\s*[*x]?$", l)
-        if not m:
-            m = re.search(r"^(.+?)\s+₹?\s*(\d+)\s*[*x]?$", l)
-            
-        if m:
-            name = m.group(1).strip()
-            price = _clean_amount(m.group(2))
-            if 0 < price <= total and len(name) > 2:
-                items.append({
-                    "Item": name,
-                    "Price": price
-                })
+    # ---------- ITEMS ----------
+    # The total is settled by now, so items picked for reconciliation still hold
+    if items is None:
+        items = _select_items(scan, total)
 
     # --- ITEM SUM VERIFICATION ---
     # If subtotal is 0 but we have items, use their sum
@@ -314,40 +404,22 @@ def parse_receipt(text: str):
     if subtotal == 0 and item_sum > 0:
         if total == 0 or abs(item_sum - total) < 0.5:
              subtotal = item_sum
-             if total == 0: total = subtotal + tax
-    elif subtotal > 0 and item_sum > 0:
-        # If item sum is very close to subtotal, we have high confidence
-        if abs(item_sum - subtotal) < 0.1:
-            pass # High confidence
+             sources["subtotal"] = "items"
+             if total == 0:
+                 total = subtotal + tax
+                 sources["amount"] = "items"
+
+    # ---------- FALLBACK BILL ID ----------
+    # Hashed from what is printed (not the learned canonical vendor, nor
+    # today's date standing in for a missing one), so a re-read of the same
+    # receipt gets the same ID whenever it is processed
+    if not bill_id:
+        bill_id = fallback_bill_id(printed_vendor, date if sources["date"] != "fallback" else None,
+                                   _round2(total), text)
+        sources["bill_id"] = "fallback"
 
     # ---------- CATEGORY DETECTION (Rule-based) ----------
-    def _extract_category(text, vendor):
-        text_lower = text.lower()
-        vendor_lower = vendor.lower()
-        
-        keywords = {
-            "Utility": ["power", "electricity", "water", "gas", "bescom", "tata power", "bill", "supply", "electric", "broadband", "mobile", "recharge"],
-            "Food": ["restaurant", "cafe", "kitchen", "hotel", "dining", "burger", "pizza", "swiggy", "zomato", "coffee", "tea", "bistro", "foods", "bakery", "canteen"],
-            "Grocery": ["mart", "super market", "fresh", "store", "vegetable", "fruit", "market", "grocer", "kirana", "basket", "reliance", "dmart", "bigbasket"],
-            "Medical": ["pharmacy", "hospital", "clinic", "doctor", "dr.", "medplus", "apollo", "pharma", "health", "medical", "diagnostic", "lab"],
-            "Travel": ["fuel", "petrol", "diesel", "station", "pump", "uber", "ola", "rapido", "ride", "trip", "travel", "fastag", "toll"],
-            "Shopping": ["retail", "fashion", "clothing", "trends", "zudio", "apparel", "garment", "mall", "shoe", "footwear", "lifestyle", "westside", "hm", "zara", "school shop"],
-            "Entertainment": ["movie", "cinema", "theatre", "show", "entertainment", "game", "fun", "club", "resort"]
-        }
-        
-        # Check vendor name first (higher priority)
-        for cat, kw_list in keywords.items():
-            if any(k in vendor_lower for k in kw_list):
-                return cat
-                
-        # Check entire text
-        for cat, kw_list in keywords.items():
-            if any(k in text_lower for k in kw_list):
-                return cat
-                
-        return "Uncategorized"
-
-    category = _extract_category(text, vendor)
+    category = categorize(text, vendor)
 
     # ---------- FINAL DATA ----------
     data = {
@@ -359,5 +431,7 @@ def parse_receipt(text: str):
         "subtotal": _round2(subtotal),
         "category": category
     }
+    if provenance is not None:
+        provenance.update((f, FieldSource(src)) for f, src in sources.items())
 
-    return data, items
\ No newline at end of file
+    return data, items
@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+from PIL import Image
+
+from ocr.ocr_result import OcrResult, OcrToken
+
+# Band height (px) long receipts are cut into
+BAND_HEIGHT = 1600
+# Rows shared by neighbouring bands; must exceed the tallest text line so
+# every line is whole in at least one band
+BAND_OVERLAP = 160
+# Only receipts at least this tall (and this much taller than wide) are tiled
+_MIN_TILED_HEIGHT = 2 * BAND_HEIGHT
+_MIN_ASPECT = 3.0
+
+
+def is_tall(img: Image.Image) -> bool:
+    return img.height >= _MIN_TILED_HEIGHT and img.height >= _MIN_ASPECT * img.width
+
+
+def split_bands(img: Image.Image) -> List[Tuple[int, Image.Image]]:
+    """Cuts an image into overlapping full-width bands: [(top, band), ...]."""
+    step = BAND_HEIGHT - BAND_OVERLAP
+    tops = list(range(0, max(1, img.height - BAND_OVERLAP), step))
+    return [(top, img.crop((0, top, img.width, min(img.height, top + BAND_HEIGHT)))) for top in tops]
+
+
+def stitch_bands(bands: List[Tuple[int, int, OcrResult]], engine: str) -> OcrResult:
+    """
+    Merges per-band results ([(top, bottom, result), ...], top to bottom)
+    into one result in page coordinates. Each overlap is split at its middle
+    and a line belongs to the band whose half holds its vertical centre, so
+    lines read twice are kept once and the fragments a band edge cuts
+    through (always close to that edge) are dropped.
+    """
+    tokens: List[OcrToken] = []
+    line_offset = 0
+
+    for i, (top, bottom, result) in enumerate(bands):
+        own_from = top + BAND_OVERLAP / 2 if i > 0 else float("-inf")
+        own_to = bottom - BAND_OVERLAP / 2 if i < len(bands) - 1 else float("inf")
+
+        for line in result.lines:
+            boxed = [t for t in line.tokens if t.box]
+            if boxed:
+                center = top + sum(t.center_y for t in boxed) / len(boxed)
+                if not (own_from <= center < own_to):
+                    continue
+            for t in line.tokens:
+                box = (t.box[0], t.box[1] + top, t.box[2], t.box[3]) if t.box else None
+                tokens.append(OcrToken(text=t.text, confidence=t.confidence, box=box,
+                                       line=line_offset + t.line))
+        line_offset += max((t.line for t in result.tokens), default=-1) + 1
+
+    return OcrResult.from_tokens(engine, tokens)
+
+
+def ocr_tiled(img: Image.Image, ocr_many: Callable[[List[Image.Image]], List[OcrResult]],
+              engine: str) -> OcrResult:
+    """OCRs a tall image band by band with `ocr_many` and stitches the result."""
+    bands = split_bands(img)
+    results = ocr_many([band for _, band in bands])
+    return stitch_bands([(top, top + band.height, r) for (top, band), r in zip(bands, results)], engine)
+
+
+def map_bands(fn: Callable[[Image.Image], OcrResult], bands: List[Image.Image]) -> List[OcrResult]:
+    """Runs `fn` over the bands on one thread per core (for engines that release the GIL)."""
+    workers = min(len(bands), os.cpu_count() or 1)
+    if workers <= 1:
+        return [fn(b) for b in bands]
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(fn, bands))
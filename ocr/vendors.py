@@ -0,0 +1,304 @@
+"""
+Vendor name canonicalization.
+
+The parser takes the vendor from the first non-header line, so one shop
+arrives as "DMART", "D-Mart Ready" and "DMart Avenue". Known canonical
+names (template names, vendors of saved receipts, merge targets) are kept
+in a trigram inverted index: a name is matched by counting the trigrams it
+shares with each canonical name through the posting lists, never by
+comparing against every name. Names are compared on a compact key (case,
+punctuation and spaces dropped, OCR look-alike digits read as letters).
+
+A line matches a canonical name when its leading words cover the whole
+name: the words left over at the end may only be legal or branch suffixes
+from a short list ("Ready", "Avenue", "Ltd", "Store", store numbers), and
+what remains needs a trigram Dice overlap of at least MATCH_THRESHOLD
+with the name. So "D-Mart Ready" and "Reliance Fresh Ltd" match "DMart"
+and "Reliance Fresh", but a name that merely starts with a shorter one
+("Starbucks" / "Star", "Shell Select" / "Shell") does not; very short
+names only match exactly. Parsing only looks names up; a saved receipt
+registers its vendor as canonical, and aliases (variant -> canonical) come
+only from the merge job:
+
+    python -m services.merge_vendors --dry-run   # cluster and rewrite stored vendors
+"""
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ocr.categories import vendor_key
+
+# A fuzzy match needs at least this score (1.0 = same key)
+MATCH_THRESHOLD = 0.85
+# Words a vendor line may carry after the name it matches (store numbers too)
+_SUFFIX_WORDS = frozenset({
+    "ready", "avenue", "supermarts", "ltd", "limited", "pvt", "private", "india", "store", "stores",
+    "outlet", "branch",
+})
+# Keys shorter than this only match exactly ("ola" must not absorb "olam")
+_MIN_FUZZY_KEY = 4
+# Aliases written by other processes are picked up this often
+_REFRESH_SECONDS = 60
+_MEMO_SIZE = 10_000
+
+# Read the way OCR confuses them, on both sides of every comparison
+# (i, l and 1 are one letter)
+_LOOKALIKES = str.maketrans({"0": "o", "1": "l", "i": "l", "5": "s", "8": "b", "7": "t"})
+
+
+def match_key(vendor: Optional[str]) -> str:
+    """Compact comparison key: 'D-Mart  Ready' -> 'dmartready' ('' if unusable)."""
+    return vendor_key(vendor).replace(" ", "").translate(_LOOKALIKES)
+
+
+def match_heads(vendor: Optional[str]) -> List[str]:
+    """
+    Keys of the name with 0, 1, ... trailing suffix words dropped:
+    'DMart Avenue Ltd' -> ['dmartavenueltd', 'dmartavenue', 'dmart'].
+    """
+    words = vendor_key(vendor).split()
+    heads = ["".join(words).translate(_LOOKALIKES)] if words else []
+    while len(words) > 1 and (words[-1] in _SUFFIX_WORDS or words[-1].isdigit()):
+        words.pop()
+        heads.append("".join(words).translate(_LOOKALIKES))
+    return heads
+
+
+def trigrams(key: str) -> Set[str]:
+    # Padded at both ends: "star" ends where "starbucks" goes on, so the two
+    # do not share every trigram of the shorter name
+    padded = f"${key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _score(shared: int, grams: int, canonical_grams: int) -> float:
+    """Match score (Dice) of a name with `grams` trigrams, `shared` of them with a canonical name."""
+    return 2 * shared / (grams + canonical_grams)
+
+
+class VendorIndex:
+    """In-memory canonical names with a trigram inverted index and an alias map."""
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._keys: List[str] = []
+        self._target: List[int] = []                 # id -> id it was merged into (itself if not)
+        self._grams: List[int] = []                  # trigram count per canonical name
+        self._postings: Dict[str, List[int]] = {}    # trigram -> canonical ids
+        self._exact: Dict[str, int] = {}             # key of a canonical name or alias -> id
+        self._memo: Dict[str, Optional[Tuple[int, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def add(self, name: str) -> str:
+        """Registers `name` as canonical; returns the canonical name already holding its key, if any."""
+        key = match_key(name)
+        if not key:
+            return name
+        if key in self._exact:
+            return self._names[self._resolve(self._exact[key])]
+        cid = len(self._names)
+        self._names.append(name)
+        self._keys.append(key)
+        self._target.append(cid)
+        self._exact[key] = cid
+        grams = trigrams(key)
+        self._grams.append(len(grams))
+        if len(key) >= _MIN_FUZZY_KEY:
+            for g in grams:
+                self._postings.setdefault(g, []).append(cid)
+        self._memo.clear()
+        return name
+
+    def _resolve(self, cid: int) -> int:
+        while self._target[cid] != cid:
+            cid = self._target[cid]
+        return cid
+
+    def alias(self, variant: str, canonical: str) -> None:
+        """
+        Maps `variant` (a name or a key) to `canonical`, registering it if
+        new. A canonical name made an alias redirects its fuzzy matches too.
+        """
+        key = match_key(variant)
+        canonical_key = match_key(canonical)
+        if not key or not canonical_key or key == canonical_key:
+            return
+        self.add(canonical)
+        cid = self._exact[canonical_key]
+        if self._keys[cid] == canonical_key:
+            self._target[cid] = cid                  # an explicit merge target is canonical again
+        target = self._resolve(cid)
+        old = self._exact.get(key)
+        if old is not None and self._keys[old] == key and old != target:
+            self._target[old] = target
+        self._exact[key] = target
+        self._memo.clear()
+
+    def match(self, name: Optional[str], threshold: float = MATCH_THRESHOLD,
+              exclude_self: bool = False) -> Optional[Tuple[str, float]]:
+        """
+        (canonical name, score) for `name`, or None below `threshold`.
+        `exclude_self` ignores the canonical name with exactly this key
+        (to find what a registered name should merge into).
+        """
+        key = match_key(name)
+        if not key:
+            return None
+        if not exclude_self and key in self._exact:
+            return self._names[self._resolve(self._exact[key])], 1.0
+
+        heads = match_heads(name)
+        memo_key = f"{int(exclude_self)}{' '.join(heads)}"
+        if memo_key in self._memo:
+            best = self._memo[memo_key]
+        else:
+            best = self._best(heads, self._exact.get(key) if exclude_self else None)
+            if len(self._memo) >= _MEMO_SIZE:
+                self._memo.clear()
+            self._memo[memo_key] = best
+        if best is None or best[1] < threshold:
+            return None
+        return self._names[self._resolve(best[0])], best[1]
+
+    def _best(self, heads: List[str], skip: Optional[int]) -> Optional[Tuple[int, float]]:
+        best = None
+        for i, head in enumerate(heads):
+            if i and head in self._exact:
+                hits = [(self._exact[head], 1.0)]
+            elif len(head) >= _MIN_FUZZY_KEY:
+                grams = trigrams(head)
+                shared: Counter = Counter()
+                for g in grams:
+                    postings = self._postings.get(g)
+                    if postings:
+                        shared.update(postings)
+                hits = [(cid, _score(n, len(grams), self._grams[cid])) for cid, n in shared.items()]
+            else:
+                continue
+            for cid, score in hits:
+                if cid == skip:
+                    continue
+                # Ties go to the shorter (more general) canonical name
+                if best is None or (score, -self._grams[cid]) > (best[1], -self._grams[best[0]]):
+                    best = (cid, score)
+        return best
+
+
+def template_index() -> VendorIndex:
+    """A VendorIndex of the template names (always canonical)."""
+    from ocr.templates import get_template_registry
+    index = VendorIndex()
+    for template in get_template_registry().templates:
+        index.add(template.name)
+    return index
+
+
+# ================= PERSISTED CANONICALIZER =================
+class VendorCanonicalizer:
+    """The index over template names and the vendor_aliases table, write-through."""
+
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        self._index = template_index()
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self, force: bool = False) -> None:
+        if not self.persist or (not force and time.time() - self._loaded_at < _REFRESH_SECONDS):
+            return
+        from database.vendor_aliases import load_vendor_aliases
+        try:
+            rows = load_vendor_aliases()
+        except sqlite3.OperationalError as e:
+            # No vendor_aliases table (init_db not run): learn in memory only
+            print(f"Vendor aliases unavailable ({e}); not persisting")
+            self.persist = False
+            rows = []
+        index = template_index()
+        for alias_key, canonical, _source in rows:
+            index.add(canonical)
+            index.alias(alias_key, canonical)
+        self._index = index
+        self._loaded_at = time.time()
+
+    def lookup(self, vendor: Optional[str], threshold: float = MATCH_THRESHOLD) -> Optional[str]:
+        """The canonical name `vendor` matches, or None."""
+        with self._lock:
+            self._refresh()
+            hit = self._index.match(vendor, threshold)
+        return hit[0] if hit else None
+
+    def canonicalize(self, vendor: Optional[str], threshold: float = MATCH_THRESHOLD) -> Optional[str]:
+        """The canonical name `vendor` matches, or `vendor` itself."""
+        return self.lookup(vendor, threshold) or vendor
+
+    def learn(self, vendors: Iterable[Optional[str]]) -> None:
+        """
+        Registers vendors of saved receipts as canonical names. The first
+        spelling stays, and a vendor matching a known name is left to the
+        merge job rather than becoming a canonical name of its own.
+        """
+        from database.vendor_aliases import SAVED, learn_vendor_aliases
+
+        learned = []
+        with self._lock:
+            for vendor in vendors:
+                key = match_key(vendor)
+                if key and key not in self._index and self._index.match(vendor) is None:
+                    self._index.add(vendor)
+                    learned.append((key, vendor))
+        if learned and self.persist:
+            try:
+                learn_vendor_aliases(learned, SAVED)
+            except sqlite3.Error as e:
+                print(f"Could not persist vendor aliases: {e}")
+
+    def merge(self, aliases: Iterable[Tuple[Optional[str], str]]) -> None:
+        """Maps (variant, canonical) pairs; a merge overrides what saves registered."""
+        from database.vendor_aliases import MERGED, learn_vendor_aliases
+
+        learned = []
+        with self._lock:
+            for variant, canonical in aliases:
+                key = match_key(variant)
+                if key and match_key(canonical):
+                    self._index.alias(key, canonical)
+                    learned.append((key, canonical))
+        if learned and self.persist:
+            try:
+                learn_vendor_aliases(learned, MERGED)
+            except sqlite3.Error as e:
+                print(f"Could not persist vendor aliases: {e}")
+
+    def reload(self) -> None:
+        with self._lock:
+            self._refresh(force=True)
+
+
+_canonicalizer: Optional[VendorCanonicalizer] = None
+_canonicalizer_lock = threading.Lock()
+
+
+def get_vendor_canonicalizer() -> VendorCanonicalizer:
+    """The process-wide canonicalizer."""
+    global _canonicalizer
+    with _canonicalizer_lock:
+        if _canonicalizer is None:
+            _canonicalizer = VendorCanonicalizer()
+        return _canonicalizer
+
+
+def known_vendor(vendor: Optional[str]) -> Optional[str]:
+    """The canonical name of `vendor` if it is a known vendor, else None."""
+    return get_vendor_canonicalizer().lookup(vendor)
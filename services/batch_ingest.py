@@ -0,0 +1,246 @@
+"""
+Headless batch ingestion for directories or archives of scanned receipts.
+
+Walks a directory, .zip or .tar(.gz) archive, runs the OCR → parse pipeline
+in a process pool and saves results in bulk transactions. A JSONL manifest
+records every finished file, so an interrupted run resumes where it left
+off.
+
+    python -m services.batch_ingest /scans/2023 --workers 8 --user-email me@example.com
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from config.config import ALLOWED_EXTENSIONS
+from database.db import init_db
+from database.queries import save_receipts_bulk
+from ocr.pipeline import extract_receipt_ocr, load_receipt_image, needs_escalation
+from utils.helpers import lap
+
+# (manifest key, file or archive path, archive member or None)
+Task = Tuple[str, str, Optional[str]]
+
+# Manifest statuses that are never re-processed (errors always are)
+_DONE_STATUSES = {"saved", "duplicate"}
+_STAGES = ["load_ms", "crop_ms", "ocr_ms", "parse_ms"]
+
+
+# ================= SOURCES =================
+def is_receipt(name: str) -> bool:
+    return name.rsplit(".", 1)[-1].lower() in ALLOWED_EXTENSIONS
+
+
+def iter_tasks(source: str) -> Iterator[Task]:
+    """Yields one task per receipt file in a directory tree or archive."""
+    path = Path(source)
+    if path.is_dir():
+        for f in sorted(path.rglob("*")):
+            if f.is_file() and is_receipt(f.name):
+                yield str(f.relative_to(path)), str(f), None
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for member in zf.namelist():
+                if not member.endswith("/") and is_receipt(member):
+                    yield f"{path.name}!{member}", str(path), member
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path) as tf:
+            for member in tf.getmembers():
+                if member.isfile() and is_receipt(member.name):
+                    yield f"{path.name}!{member.name}", str(path), member.name
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+# ================= WORKER SIDE =================
+# Archives stay open for the lifetime of a worker process
+_ARCHIVES: Dict[str, Any] = {}
+
+
+def _read(path: str, member: Optional[str]) -> bytes:
+    if member is None:
+        return Path(path).read_bytes()
+    archive = _ARCHIVES.get(path)
+    if archive is None:
+        archive = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else tarfile.open(path)
+        _ARCHIVES[path] = archive
+    if isinstance(archive, zipfile.ZipFile):
+        return archive.read(member)
+    fobj = archive.extractfile(member)
+    return fobj.read() if fobj else b""
+
+
+def init_worker():
+    """Pool initializer: loads the OCR models once per worker process."""
+    from ocr.paddle_engine import warm_up_paddle
+    warm_up_paddle()
+
+
+def ingest_one(task: Task) -> Dict[str, Any]:
+    """OCRs and parses one file; never raises, errors are reported in the outcome."""
+    key, path, member = task
+    timings: Dict[str, float] = {}
+    outcome: Dict[str, Any] = {"key": key, "status": "error", "data": None, "error": None,
+                               "passes": 0, "paddle": False, "low_confidence": False, "timings": timings}
+    try:
+        t = lap(timings, None)
+        img = load_receipt_image(_read(path, member), member or path)
+        lap(timings, "load_ms", t)
+
+        data, _items, err, report = extract_receipt_ocr(img, timings)
+        outcome.update(passes=report.pass_count, paddle=report.paddle_used)
+        if err or data is None:
+            outcome.update(status="unreadable", error=err)
+        else:
+            outcome.update(status="parsed", data=data, low_confidence=needs_escalation(data, report))
+    except Exception as e:
+        outcome["error"] = f"{type(e).__name__}: {e}"
+    return outcome
+
+
+# ================= MANIFEST =================
+def load_manifest(path: Path, retry_unreadable: bool = False) -> Set[str]:
+    """Keys already finished by a previous run."""
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    skip = _DONE_STATUSES if retry_unreadable else _DONE_STATUSES | {"unreadable"}
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a killed run
+            if entry.get("status") in skip:
+                done.add(entry["key"])
+            else:
+                done.discard(entry.get("key"))
+    return done
+
+
+def _write_manifest(manifest, outcomes: List[Dict[str, Any]]):
+    for o in outcomes:
+        manifest.write(json.dumps({
+            "key": o["key"],
+            "status": o["status"],
+            "bill_id": (o["data"] or {}).get("bill_id"),
+            "error": o["error"],
+        }) + "\n")
+    manifest.flush()
+    os.fsync(manifest.fileno())
+
+
+# ================= DRIVER =================
+def ingest(source: str, workers: int, user_email: Optional[str], manifest_path: Path,
+           commit_every: int = 200, retry_unreadable: bool = False) -> Dict[str, Any]:
+    """Runs the ingestion and returns the summary report."""
+    init_db()
+    done = load_manifest(manifest_path, retry_unreadable)
+    tasks = [t for t in iter_tasks(source) if t[0] not in done]
+
+    counts = {"saved": 0, "duplicate": 0, "conflict": 0, "unreadable": 0, "error": 0}
+    stage_totals = {s: 0.0 for s in _STAGES}
+    passes = paddle_runs = low_confidence = 0
+    failures: List[Tuple[str, str]] = []
+    pending: List[Dict[str, Any]] = []
+
+    def _flush(manifest):
+        if not pending:
+            return
+        # Rows hit the database before the manifest marks them done
+        statuses = save_receipts_bulk([o["data"] for o in pending], user_email)
+        for o, status in zip(pending, statuses):
+            o["status"] = status
+            counts[status] += 1
+            if status == "conflict":
+                o["error"] = f"bill ID {o['data']['bill_id']} belongs to another user's receipt"
+                failures.append((o["key"], o["error"]))
+        _write_manifest(manifest, pending)
+        pending.clear()
+
+    start = time.perf_counter()
+    chunksize = max(1, min(16, len(tasks) // (workers * 4) or 1))
+    ctx = mp.get_context("spawn")
+
+    with manifest_path.open("a", encoding="utf-8") as manifest, \
+            ctx.Pool(workers, initializer=init_worker) as pool:
+        for i, o in enumerate(pool.imap_unordered(ingest_one, tasks, chunksize=chunksize), start=1):
+            passes += o["passes"]
+            paddle_runs += o["paddle"]
+            low_confidence += o["low_confidence"]
+            for s in _STAGES:
+                stage_totals[s] += o["timings"].get(s, 0.0)
+
+            if o["status"] == "parsed":
+                pending.append(o)
+                if len(pending) >= commit_every:
+                    _flush(manifest)
+            else:
+                counts[o["status"]] += 1
+                failures.append((o["key"], o["error"] or o["status"]))
+                _write_manifest(manifest, [o])
+
+            if i % 100 == 0:
+                rate = i / (time.perf_counter() - start)
+                print(f"  {i}/{len(tasks)} files · {rate:.1f} receipts/s", flush=True)
+        _flush(manifest)
+
+    elapsed = time.perf_counter() - start
+    processed = len(tasks)
+    return {
+        "skipped": len(done),
+        "processed": processed,
+        **counts,
+        "elapsed_s": round(elapsed, 2),
+        "receipts_per_s": round(processed / elapsed, 2) if elapsed else 0.0,
+        "mean_stage_ms": {s: round(v / processed, 1) if processed else 0.0 for s, v in stage_totals.items()},
+        "mean_ocr_passes": round(passes / processed, 2) if processed else 0.0,
+        "paddle_runs": paddle_runs,
+        "low_confidence": low_confidence,
+        "failures": failures,
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    print("\n=== Ingestion report ===")
+    print(f"Skipped (already in manifest): {report['skipped']}")
+    print(f"Processed: {report['processed']} in {report['elapsed_s']} s "
+          f"({report['receipts_per_s']} receipts/s)")
+    print(f"Saved: {report['saved']} · Duplicates: {report['duplicate']} · "
+          f"Bill ID conflicts: {report['conflict']} · "
+          f"Unreadable: {report['unreadable']} · Errors: {report['error']}")
+    print(f"Mean OCR passes per receipt: {report['mean_ocr_passes']} · "
+          f"PaddleOCR needed for {report['paddle_runs']} of {report['processed']}")
+    print(f"Low-confidence parses (a key field guessed, worth a Gemini pass): {report['low_confidence']}")
+    print("Mean per-stage time: " + ", ".join(f"{k[:-3]} {v} ms" for k, v in report["mean_stage_ms"].items()))
+    if report["failures"]:
+        print(f"\nFailures ({len(report['failures'])}):")
+        for key, error in report["failures"][:50]:
+            print(f"  {key}: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a directory or archive of receipts.")
+    parser.add_argument("source", help="directory, .zip or .tar(.gz) archive")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="OCR processes")
+    parser.add_argument("--user-email", help="owner of the ingested receipts")
+    parser.add_argument("--manifest", help="resume manifest (default: <source>.manifest.jsonl)")
+    parser.add_argument("--commit-every", type=int, default=200, help="receipts per database transaction")
+    parser.add_argument("--retry-unreadable", action="store_true",
+                        help="re-OCR files a previous run could not read")
+    args = parser.parse_args()
+
+    manifest = Path(args.manifest or f"{args.source.rstrip('/')}.manifest.jsonl")
+    report = ingest(args.source, args.workers, args.user_email, manifest,
+                    args.commit_every, args.retry_unreadable)
+    _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Bounded-memory streaming pipeline for interactive batch uploads.
+
+Files move through four stages connected by queues, each on its own
+thread(s):
+
+    decode → preprocess (crop + quality gate) → extract (OCR, then Gemini if unsure) → save
+
+At most `window` files are between "decoded" and "handed to the caller" at
+any time, so memory stays flat however many files a batch has. Every stage
+drops the pixels it no longer needs; what reaches the caller is the
+extracted data plus a small JPEG thumbnail for the preview.
+"""
+import io
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from ocr.pipeline import extract_receipt_ocr, load_receipt_image, needs_escalation, prepare_receipt_image
+from ocr.quality import QualityReport
+from utils.helpers import lap
+
+# Longest side (px) and JPEG quality of the preview thumbnails
+THUMBNAIL_SIDE = 320
+_THUMBNAIL_QUALITY = 70
+# End-of-stream marker passed down the stage queues
+_DONE = object()
+
+
+@dataclass
+class BatchItem:
+    """One file on its way through the pipeline."""
+    index: int
+    name: str
+    # "saved", "duplicate", "conflict" (another user's receipt holds the bill
+    # ID) or "failed" once it leaves the pipeline
+    status: str = "pending"
+    thumbnail: Optional[bytes] = None
+    data: Optional[Dict[str, Any]] = None
+    items: List[dict] = field(default_factory=list)
+    error: Optional[str] = None
+    # "gemini" or "ocr"
+    engine: Optional[str] = None
+    # Confidence of the OCR parse (see ocr/text_parser.parse_confidence), and
+    # whether it was low enough to send the receipt to Gemini
+    confidence: float = 0.0
+    escalated: bool = False
+    validation: Optional[Dict[str, Any]] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Stage-to-stage payloads, released as soon as the next stage is done with them
+    source: Any = field(default=None, repr=False)
+    image: Optional[Image.Image] = field(default=None, repr=False)
+    quality: Optional[QualityReport] = field(default=None, repr=False)
+
+    def release(self) -> None:
+        self.source = self.image = None
+
+
+def make_thumbnail(img: Image.Image, side: int = THUMBNAIL_SIDE) -> bytes:
+    """Small JPEG preview of a receipt image."""
+    thumb = img.copy()
+    thumb.thumbnail((side, side))
+    if thumb.mode not in ("RGB", "L"):
+        thumb = thumb.convert("RGB")
+    buf = io.BytesIO()
+    thumb.save(buf, format="JPEG", quality=_THUMBNAIL_QUALITY)
+    return buf.getvalue()
+
+
+# ================= STAGES =================
+def decode_stage(item: BatchItem) -> None:
+    t = lap(item.timings, None)
+    source = item.source
+    if hasattr(source, "seek"):
+        source.seek(0)
+    item.image = load_receipt_image(source, item.name)
+    item.source = None
+    item.thumbnail = make_thumbnail(item.image)
+    lap(item.timings, "load_ms", t)
+
+
+def preprocess_stage(item: BatchItem) -> None:
+    # The cropped receipt replaces the full photo
+    item.image, item.quality = prepare_receipt_image(item.image, item.timings)
+    if not item.quality.usable:
+        item.error = item.quality.message
+        item.release()
+
+
+def make_extract_stage(api_key: Optional[str] = None) -> Callable[[BatchItem], None]:
+    """
+    The OCR cascade; with an API key, receipts it reads with a low-confidence
+    key field (ocr/pipeline.needs_escalation) go to Gemini as well. Gemini
+    calls are made one at a time for the API quota.
+    """
+    client = None
+    gemini_lock = threading.Lock()
+
+    def extract_stage(item: BatchItem) -> None:
+        nonlocal client
+        data, item.items, item.error, report = extract_receipt_ocr(
+            item.image, item.timings, quality=item.quality)
+        item.engine = "ocr"
+        item.confidence = report.parse_confidence
+        if api_key and needs_escalation(data, report):
+            item.escalated = True
+            t = lap(item.timings, None)
+            try:
+                with gemini_lock:
+                    if client is None:
+                        from ai.gemini_client import GeminiClient  # type: ignore
+                        client = GeminiClient(api_key)
+                    result = client.extract_receipt(item.image)
+                if result:
+                    item.items = result.pop("items", [])
+                    data, item.engine, item.error = result, "gemini", None
+            except Exception as e:
+                print(f"Gemini extraction failed for {item.name}: {e}")
+            lap(item.timings, "gemini_ms", t)
+        item.data = data
+        item.image = None
+        if data is None and not item.error:
+            item.error = "No readable text detected"
+
+    return extract_stage
+
+
+def make_save_stage(user_email: Optional[str] = None,
+                    validate: Optional[Callable[[dict], dict]] = None) -> Callable[[BatchItem], None]:
+    """Saves each receipt, telling duplicates from bill IDs held by other users."""
+    from database.queries import save_receipts_bulk
+
+    def save_stage(item: BatchItem) -> None:
+        t = lap(item.timings, None)
+        item.status = save_receipts_bulk([item.data], user_email)[0]
+        if item.status == "saved" and validate:
+            item.validation = validate(item.data)
+        elif item.status == "conflict":
+            item.error = f"bill ID {item.data['bill_id']} belongs to another user's receipt"
+        lap(item.timings, "save_ms", t)
+
+    return save_stage
+
+
+# ================= PIPELINE =================
+class _Stage:
+    """`workers` threads applying `fn` to items from `inbox` and passing them on."""
+
+    def __init__(self, name: str, fn: Callable[[BatchItem], None], inbox: queue.Queue,
+                 outbox: queue.Queue, stop: threading.Event, workers: int = 1):
+        self.fn = fn
+        self.stop = stop
+        self.inbox = inbox
+        self.outbox = outbox
+        self._running = workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, name=f"batch-{name}-{i}", daemon=True)
+                        for i in range(workers)]
+
+    def _run(self) -> None:
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                with self._lock:
+                    self._running -= 1
+                    last = self._running == 0
+                # The last worker out closes the next stage, the others pass the marker on
+                (self.outbox if last else self.inbox).put(_DONE)
+                return
+            if item.error is None and self.stop.is_set():
+                item.error = "Cancelled"
+            if item.error is None:
+                try:
+                    self.fn(item)
+                except Exception as e:
+                    item.error = f"{type(e).__name__}: {e}"
+            if item.error is not None:
+                item.release()
+            self.outbox.put(item)
+
+
+def stream_batch(files: Iterable[Tuple[str, Any]],
+                 extract: Callable[[BatchItem], None],
+                 save: Optional[Callable[[BatchItem], None]] = None,
+                 workers: int = 1,
+                 window: Optional[int] = None,
+                 prepare_thread: Optional[Callable[[threading.Thread], Any]] = None
+                 ) -> Iterator[BatchItem]:
+    """
+    Runs (name, bytes | file-like) pairs through the pipeline and yields
+    each BatchItem as it finishes, in completion order. `extract` runs on
+    `workers` threads; `save` (if given) on one, so database writes stay
+    serial. `prepare_thread` is called on every stage thread before it
+    starts (the Streamlit UI attaches its script context there).
+    """
+    window = window or max(2, workers * 2)
+    slots = threading.Semaphore(window)
+    stop = threading.Event()
+    to_preprocess: queue.Queue = queue.Queue()
+    to_extract: queue.Queue = queue.Queue()
+    to_save: queue.Queue = queue.Queue()
+    done: queue.Queue = queue.Queue()
+
+    def _save(item: BatchItem) -> None:
+        if save is not None:
+            save(item)
+        else:
+            item.status = "saved"
+
+    stages = [
+        _Stage("preprocess", preprocess_stage, to_preprocess, to_extract, stop),
+        _Stage("extract", extract, to_extract, to_save, stop, workers),
+        _Stage("save", _save, to_save, done, stop),
+    ]
+
+    def _decode() -> None:
+        for index, (name, source) in enumerate(files):
+            # Wait for a free slot; a caller that stopped reading frees none
+            while not slots.acquire(timeout=0.2):
+                if stop.is_set():
+                    break
+            if stop.is_set():
+                break
+            item = BatchItem(index=index, name=name, source=source)
+            try:
+                decode_stage(item)
+            except Exception as e:
+                item.error = f"Could not read {name}: {e}"
+                item.release()
+            to_preprocess.put(item)
+        to_preprocess.put(_DONE)
+
+    threads = [threading.Thread(target=_decode, name="batch-decode", daemon=True)]
+    threads += [t for stage in stages for t in stage.threads]
+    for t in threads:
+        if prepare_thread:
+            prepare_thread(t)
+        t.start()
+
+    try:
+        while True:
+            item = done.get()
+            if item is _DONE:
+                return
+            if item.error is not None and item.status == "pending":
+                item.status = "failed"
+            item.release()
+            item.quality = None
+            slots.release()
+            yield item
+    finally:
+        stop.set()
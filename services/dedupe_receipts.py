@@ -0,0 +1,188 @@
+"""
+Migration: re-key receipts saved under random fallback bill IDs and
+collapse the duplicates among them.
+
+Receipts without a printed bill ID used to be saved as BILL-<6 random
+digits> (and Gemini extractions as UNKNOWN), so processing a receipt again
+stored it again. Fallback IDs are now hashed from the receipt's content
+(ocr/text_parser.fallback_bill_id: the OCR text, or the image bytes for
+Gemini). A receipt with a stored OCR read is re-parsed
+(ocr/batch_parse.py), which yields exactly the ID a re-upload of that read
+gets, and is re-keyed to it.
+
+When the new ID is already held by a receipt of the same user with the
+same date and amount, the receipt is a duplicate and is deleted (the copy
+holding the ID, or the earliest saved, stays); when another user or a
+different receipt holds it, the receipt keeps its old ID. Afterwards a
+re-processed receipt is caught by the bill_id primary key alone.
+
+A receipt without a stored read (Gemini, or saved before reads were kept)
+has no content to hash: it keeps its ID and is never deleted. Other
+receipts of the same user with its vendor, date and amount are listed as
+possible duplicates for manual review, since two coffees on one day are
+as likely as one receipt saved twice. Receipts are processed in rowid
+order, one transaction per chunk.
+
+    python -m services.dedupe_receipts [--dry-run] [--user-email me@example.com]
+                                       [--workers 8] [--chunk-size 2000]
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database.db import get_db, init_db
+from ocr.batch_parse import ParsePool
+
+# Bill IDs the old fallbacks produced
+_LEGACY_IDS = "(bill_id GLOB 'BILL-[0-9][0-9][0-9][0-9][0-9][0-9]' OR bill_id = 'UNKNOWN')"
+
+
+def _new_ids(pool: ParsePool, rows: List[Any]) -> List[Optional[str]]:
+    """The bill ID each row's stored read gets today (None if it no longer parses)."""
+    return [None if error or data is None else data["bill_id"]
+            for data, _items, error in pool.parse({"ocr_source": r["ocr_source"]} for r in rows)]
+
+
+def _same_receipt(a: Any, b: Any) -> bool:
+    return a["date"] == b["date"] and round(float(a["amount"] or 0.0), 2) == round(float(b["amount"] or 0.0), 2)
+
+
+def _look_alikes(db, r: Any) -> List[str]:
+    """Bill IDs of the other receipts of r's user with its vendor, date and amount."""
+    rows = db.execute(
+        "SELECT bill_id FROM receipts WHERE user_email IS ? AND vendor = ? AND date = ? "
+        "AND ROUND(amount, 2) = ROUND(?, 2) AND rowid != ? ORDER BY rowid",
+        (r["user_email"], r["vendor"], r["date"], r["amount"], r["rowid"]),
+    ).fetchall()
+    return [row["bill_id"] for row in rows]
+
+
+def dedupe_receipts(user_email: Optional[str] = None, dry_run: bool = False, workers: Optional[int] = None,
+                    chunk_size: int = 2000, progress: bool = True) -> Dict[str, Any]:
+    """
+    Re-keys every receipt (of `user_email`, if given) with a legacy random
+    bill ID and a stored read, and deletes the duplicates this uncovers.
+    Returns a report: receipts scanned, re-keyed, deleted as duplicates,
+    left under their old ID (the new one belongs to another user or
+    receipt, or the read failed to parse), receipts without a read, a few
+    examples and, for review, each receipt without a read with the bill IDs
+    that look like it.
+    """
+    db = get_db()
+    where, params = ("AND user_email = ?", [user_email]) if user_email else ("", [])
+    total = db.execute(f"SELECT COUNT(*) FROM receipts WHERE {_LEGACY_IDS} {where}", params).fetchone()[0]
+
+    scanned, rekeyed, deleted, conflicts, failed, unread = 0, 0, 0, 0, 0, 0
+    examples: List[Tuple[str, str, str]] = []
+    review: List[Tuple[str, List[str]]] = []
+    reviewed: Set[str] = set()
+    # new ID -> the row it went to, for IDs this run has handed out (a dry run writes none)
+    claimed: Dict[str, Any] = {}
+    start = time.perf_counter()
+    last = 0
+    with ParsePool(workers) as pool:
+        while True:
+            rows = db.execute(
+                f"SELECT rowid, bill_id, user_email, vendor, date, amount, ocr_source FROM receipts "
+                f"WHERE rowid > ? AND {_LEGACY_IDS} {where} ORDER BY rowid LIMIT ?",
+                [last, *params, chunk_size],
+            ).fetchall()
+            if not rows:
+                break
+
+            # Without a read there is no content to hash: list look-alikes, never delete
+            for r in rows:
+                if r["ocr_source"]:
+                    continue
+                unread += 1
+                if r["bill_id"] in reviewed:
+                    continue
+                others = _look_alikes(db, r)
+                if others:
+                    review.append((r["bill_id"], others))
+                    reviewed.update(others)
+
+            renames: List[Tuple[str, int]] = []
+            duplicates: List[Tuple[int]] = []
+            reads = [r for r in rows if r["ocr_source"]]
+            for r, new_id in zip(reads, _new_ids(pool, reads)):
+                if new_id is None:
+                    failed += 1
+                    continue
+                if new_id == r["bill_id"]:
+                    continue
+                held = claimed.get(new_id) or db.execute(
+                    "SELECT user_email, date, amount FROM receipts WHERE bill_id = ?", (new_id,)).fetchone()
+                if held is None:
+                    claimed[new_id] = r
+                    renames.append((new_id, r["rowid"]))
+                    rekeyed += 1
+                    action = "re-keyed"
+                elif held["user_email"] == r["user_email"] and _same_receipt(held, r):
+                    duplicates.append((r["rowid"],))
+                    deleted += 1
+                    action = "duplicate of"
+                else:
+                    conflicts += 1
+                    continue
+                if len(examples) < 10:
+                    examples.append((r["bill_id"], action, new_id))
+            if not dry_run and (renames or duplicates):
+                with db:
+                    db.executemany("DELETE FROM receipts WHERE rowid = ?", duplicates)
+                    db.executemany("UPDATE receipts SET bill_id = ? WHERE rowid = ?", renames)
+
+            scanned += len(rows)
+            last = rows[-1]["rowid"]
+            if progress:
+                rate = scanned / (time.perf_counter() - start)
+                print(f"  {scanned}/{total} receipts · {rekeyed} re-keyed · {deleted} duplicates · "
+                      f"{rate:.0f} receipts/s", flush=True)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "scanned": scanned,
+        "rekeyed": rekeyed,
+        "deleted": deleted,
+        "conflicts": conflicts,
+        "failed": failed,
+        "unread": unread,
+        "examples": examples,
+        "review": review,
+        "elapsed_s": round(elapsed, 2),
+        "receipts_per_s": round(scanned / elapsed, 1) if elapsed else 0.0,
+        "dry_run": dry_run,
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    verb = "Would" if report["dry_run"] else "Did"
+    print("\n=== Bill ID migration report ===")
+    print(f"Scanned: {report['scanned']} receipts with random bill IDs in {report['elapsed_s']} s "
+          f"({report['receipts_per_s']} receipts/s)")
+    print(f"{verb} re-key {report['rekeyed']} · delete {report['deleted']} duplicates")
+    print(f"Kept their old ID: {report['conflicts']} (new ID held by another user or receipt) · "
+          f"{report['failed']} (read failed to parse) · {report['unread']} (no stored read)")
+    for old, action, new in report["examples"]:
+        print(f"  {old} {action} {new}")
+    if report["review"]:
+        print(f"\nPossible duplicates to review (same user, vendor, date and amount; nothing deleted): "
+              f"{len(report['review'])}")
+        for bill_id, others in report["review"]:
+            print(f"  {bill_id}: " + ", ".join(others))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-key receipts with random fallback bill IDs and drop duplicates.")
+    parser.add_argument("--user-email", help="only this user's receipts")
+    parser.add_argument("--workers", type=int, help="parser processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="receipts per database transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report the changes without writing them")
+    args = parser.parse_args()
+
+    init_db()
+    _print_report(dedupe_receipts(args.user_email, args.dry_run, args.workers, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Bulk vendor merge: clusters the vendor names stored so far and rewrites
+every receipt to its cluster's canonical name.
+
+Names are clustered most-receipts-first with the trigram index of
+ocr/vendors.py: a name that matches an earlier cluster joins it, anything
+else starts a new one, so the spelling a vendor is saved under most often
+becomes its canonical name. Template names and earlier merges (including
+--alias) are always canonical. The merges are stored as aliases, so new
+receipts are matched to the same names, and the receipts table is rewritten
+in rowid-ordered chunks, one transaction per chunk.
+
+    python -m services.merge_vendors [--user-email me@example.com] [--dry-run]
+                                     [--alias "D-Mart Ready" DMart] [--threshold 0.85]
+"""
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from database.db import get_db, init_db
+from database.vendor_aliases import MERGED, load_vendor_aliases
+from ocr.vendors import MATCH_THRESHOLD, get_vendor_canonicalizer, match_key, template_index
+
+
+def plan_merges(vendors: Sequence[Tuple[str, int]], threshold: float = MATCH_THRESHOLD,
+                pinned: Sequence[Tuple[str, str]] = ()) -> Dict[str, str]:
+    """
+    variant -> canonical for (vendor, receipt count) pairs, most receipts
+    first. `pinned` (variant, canonical) aliases are applied before clustering.
+    """
+    index = template_index()
+    for alias_key, canonical, source in load_vendor_aliases():
+        if source == MERGED:
+            index.alias(alias_key, canonical)
+    for variant, canonical in pinned:
+        index.alias(variant, canonical)
+
+    merges = {}
+    for vendor, _count in sorted(vendors, key=lambda vc: -vc[1]):
+        if not match_key(vendor):
+            continue
+        hit = index.match(vendor, threshold)
+        if hit is None:
+            index.add(vendor)
+        elif hit[0] != vendor:
+            merges[vendor] = hit[0]
+    return merges
+
+
+def merge_vendors(user_email: Optional[str] = None, chunk_size: int = 500, dry_run: bool = False,
+                  threshold: float = MATCH_THRESHOLD,
+                  pinned: Sequence[Tuple[str, str]] = ()) -> Tuple[int, Dict[str, str], Dict[str, int]]:
+    """
+    Merges the vendors of every receipt (of `user_email`, if given).
+    Returns (receipts scanned, variant -> canonical, receipts rewritten per
+    variant); with `dry_run` nothing is written.
+    """
+    canonicalizer = get_vendor_canonicalizer()
+    canonicalizer.reload()
+    db = get_db()
+    where, params = ("WHERE user_email = ?", [user_email]) if user_email else ("", [])
+    vendors = [(r["vendor"], r["n"]) for r in db.execute(
+        f"SELECT vendor, COUNT(*) AS n FROM receipts {where} GROUP BY vendor", params)]
+    merges = plan_merges(vendors, threshold, pinned)
+    if not dry_run:
+        canonicalizer.merge([*pinned, *merges.items()])
+
+    where = "AND user_email = ?" if user_email else ""
+    scanned, rewritten = 0, {v: 0 for v in merges}
+    last = 0
+    while True:
+        rows = db.execute(
+            f"SELECT rowid, vendor FROM receipts WHERE rowid > ? {where} ORDER BY rowid LIMIT ?",
+            [last, *params, chunk_size],
+        ).fetchall()
+        if not rows:
+            break
+        updates: List[Tuple[str, int]] = []
+        for r in rows:
+            canonical = merges.get(r["vendor"])
+            if canonical:
+                updates.append((canonical, r["rowid"]))
+                rewritten[r["vendor"]] += 1
+        if updates and not dry_run:
+            with db:
+                db.executemany("UPDATE receipts SET vendor = ? WHERE rowid = ?", updates)
+        scanned += len(rows)
+        last = rows[-1]["rowid"]
+    return scanned, merges, rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge variant spellings of stored vendor names.")
+    parser.add_argument("--user-email", help="only this user's receipts")
+    parser.add_argument("--chunk-size", type=int, default=500, help="receipts per transaction")
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD, help="match score needed to merge")
+    parser.add_argument("--alias", nargs=2, action="append", default=[], metavar=("VARIANT", "CANONICAL"),
+                        help="always merge VARIANT into CANONICAL (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="report the merges without writing them")
+    args = parser.parse_args()
+
+    init_db()
+    scanned, merges, rewritten = merge_vendors(args.user_email, args.chunk_size, args.dry_run,
+                                               args.threshold, [tuple(a) for a in args.alias])
+    verb = "would rewrite" if args.dry_run else "rewrote"
+    print(f"{scanned} receipts scanned, {len(merges)} vendor names merged, {verb} {sum(rewritten.values())}")
+    for variant, canonical in sorted(merges.items(), key=lambda vc: (vc[1], vc[0])):
+        print(f"  {rewritten[variant]:>6}  {variant} -> {canonical}")
+
+
+if __name__ == "__main__":
+    main()
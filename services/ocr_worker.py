@@ -0,0 +1,143 @@
+"""
+Background OCR workers for queued batch uploads.
+
+Each worker process keeps a warm OCR engine, claims jobs from the
+`ocr_jobs` table with a lease, runs the headless extraction pipeline and
+writes the outcome back. Jobs of crashed workers are reclaimed once their
+lease lapses.
+
+    python -m services.ocr_worker --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.db import init_db
+from database.jobs import LEASE_SECONDS, claim_job, complete_job, fail_job, renew_lease
+from database.queries import save_receipts_bulk
+from ocr.pipeline import extract_receipt_ocr, load_receipt_image
+
+# How long an idle worker sleeps before polling the queue again
+POLL_INTERVAL = 1.0
+# Longest wait between claims while the database keeps failing (locked, busy)
+MAX_BACKOFF = 30.0
+
+
+class _LeaseKeeper:
+    """Renews a job's lease in the background while the worker is busy with it."""
+
+    def __init__(self, job_id: int, worker_id: str):
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(LEASE_SECONDS / 3):
+            if not renew_lease(self._job_id, self._worker_id):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_job(job: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Optional[str]]:
+    """
+    Runs one job end to end. Returns (status, result, error) where status is
+    'done', 'duplicate', 'conflict' (another user's receipt holds the bill
+    ID) or 'failed' (unreadable receipts are not retried).
+    """
+    img = load_receipt_image(Path(job["payload_path"]).read_bytes(), job["filename"])
+    data, items, err, report = extract_receipt_ocr(img)
+    result: Dict[str, Any] = {
+        "passes": report.pass_count,
+        "ocr_ms": round(report.total_ms, 1),
+        "confidence": round(report.confidence, 3),
+        "parse_confidence": round(report.parse_confidence, 3),
+    }
+    if err or data is None:
+        return "failed", result, err
+
+    result.update(data=data, items=items)
+    status = save_receipts_bulk([data], job["user_email"])[0]
+    if status == "conflict":
+        return "conflict", result, f"bill ID {data['bill_id']} belongs to another user's receipt"
+    return ("done" if status == "saved" else status), result, None
+
+
+def run_worker(worker_id: Optional[str] = None, stop_event=None) -> None:
+    """Claims and processes jobs until `stop_event` is set (forever by default)."""
+    from ocr.paddle_engine import warm_up_paddle
+
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    init_db()
+    warm_up_paddle()
+
+    backoff = POLL_INTERVAL
+    while stop_event is None or not stop_event.is_set():
+        try:
+            job = claim_job(worker_id)
+        except sqlite3.Error as e:
+            # A locked database is transient: back off instead of ending the worker
+            print(f"Claiming a job failed ({e}); retrying in {backoff:.0f} s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+            continue
+        backoff = POLL_INTERVAL
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        try:
+            with _LeaseKeeper(job["id"], worker_id):
+                status, result, error = process_job(job)
+            complete_job(job["id"], worker_id, status, result, error)
+        except Exception as e:
+            try:
+                fail_job(job["id"], worker_id, str(e))
+            except sqlite3.Error:
+                pass  # the lease lapses and the job is reclaimed
+
+
+def start_worker_pool(count: int, stop_event=None) -> List[mp.Process]:
+    """Starts `count` daemon worker processes and returns them."""
+    ctx = mp.get_context("spawn")
+    procs = []
+    for i in range(count):
+        proc = ctx.Process(target=run_worker, kwargs={"stop_event": stop_event}, daemon=True,
+                           name=f"ocr-worker-{i}")
+        proc.start()
+        procs.append(proc)
+    return procs
+
+
+def main():
+    from config.config import OCR_WORKERS
+
+    parser = argparse.ArgumentParser(description="Run background OCR workers.")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS, help="number of worker processes")
+    args = parser.parse_args()
+
+    procs = start_worker_pool(args.workers)
+    print(f"Started {len(procs)} OCR worker(s). Press Ctrl+C to stop.")
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        for proc in procs:
+            proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
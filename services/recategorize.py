@@ -0,0 +1,100 @@
+"""
+Bulk re-categorization of stored receipts.
+
+Re-applies the current categorization (ocr/categories.py) to the receipts
+table in rowid-ordered chunks, one transaction per chunk, so a large table
+is never locked for long and an interrupted run can simply be restarted.
+Older receipts keep no OCR text (services/reparse.py re-parses the ones
+that do), so a receipt's category is decided by its vendor:
+
+  1. a category the receipt's user set by editing a receipt of that vendor
+  2. the keyword rules on the vendor name
+  3. for uncategorized receipts, the category learned from saves
+  4. otherwise the category stays as it is
+
+Categories learned from saves that the rules now disagree with are
+replaced too, so new receipts of those vendors follow the same rules.
+
+    python -m services.recategorize [--user-email me@example.com] [--chunk-size 500] [--dry-run]
+"""
+import argparse
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from database.db import get_db, init_db
+from database.vendor_categories import EDITED
+from ocr.categories import UNCATEGORIZED, VendorCategoryCache, get_category_cache, keyword_category
+
+
+def recategorized(vendor: str, current: Optional[str], cache: VendorCategoryCache,
+                  user_email: Optional[str] = None) -> str:
+    """The category a stored receipt (of `user_email`) should have now."""
+    learned = cache.entry(vendor, user_email)
+    if learned and learned[1] == EDITED:
+        return learned[0]
+    by_rules = keyword_category(vendor or "")
+    if by_rules:
+        return by_rules
+    if (not current or current == UNCATEGORIZED) and learned:
+        return learned[0]
+    return current or UNCATEGORIZED
+
+
+def recategorize(user_email: Optional[str] = None, chunk_size: int = 500,
+                 dry_run: bool = False) -> Tuple[int, Counter]:
+    """
+    Updates every receipt (of `user_email`, if given) whose category
+    changed. Returns (receipts scanned, Counter of (old, new) changes);
+    with `dry_run` nothing is written.
+    """
+    cache = get_category_cache()
+    cache.reload()
+    db = get_db()
+    where, params = ("AND user_email = ?", [user_email]) if user_email else ("", [])
+    scanned, changes = 0, Counter()
+    last = 0
+    while True:
+        rows = db.execute(
+            f"SELECT rowid, user_email, vendor, category FROM receipts WHERE rowid > ? {where} ORDER BY rowid LIMIT ?",
+            [last, *params, chunk_size],
+        ).fetchall()
+        if not rows:
+            break
+        updates, relearn = [], []
+        for r in rows:
+            new = recategorized(r["vendor"], r["category"], cache, r["user_email"])
+            if new != r["category"]:
+                updates.append((new, r["rowid"]))
+                changes[(r["category"], new)] += 1
+            learned = cache.entry(r["vendor"])
+            by_rules = keyword_category(r["vendor"] or "")
+            if learned and by_rules and learned[0] != by_rules:
+                relearn.append((r["vendor"], by_rules))
+        if not dry_run:
+            if updates:
+                with db:
+                    db.executemany("UPDATE receipts SET category = ? WHERE rowid = ?", updates)
+            cache.learn(relearn)
+        scanned += len(rows)
+        last = rows[-1]["rowid"]
+    return scanned, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-apply the categorization rules to stored receipts.")
+    parser.add_argument("--user-email", help="only this user's receipts")
+    parser.add_argument("--chunk-size", type=int, default=500, help="receipts per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report the changes without writing them")
+    args = parser.parse_args()
+
+    init_db()
+    scanned, changes = recategorize(args.user_email, args.chunk_size, args.dry_run)
+    verb = "would change" if args.dry_run else "changed"
+    print(f"{scanned} receipts scanned, {verb} {sum(changes.values())}")
+    moves: Dict[str, int] = {f"{old or UNCATEGORIZED} -> {new}": n for (old, new), n in changes.most_common()}
+    for move, n in moves.items():
+        print(f"  {n:>6}  {move}")
+
+
+if __name__ == "__main__":
+    main()
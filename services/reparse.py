@@ -0,0 +1,156 @@
+"""
+Backfill: re-parse stored receipts with the current parser and templates.
+
+Every receipt saved from OCR keeps the read it was parsed from
+(receipts.ocr_source). This re-parses those reads in a process pool
+(ocr/batch_parse.py) and diffs the result against the stored fields. By
+default the changes are only reported; with --apply they are written in
+one transaction per chunk. Receipts extracted by Gemini have no stored
+read and are left alone, as is the bill ID (the receipt's key).
+
+A re-parse never undoes a correction: fields the user edited
+(receipts.edited_fields) are kept, the parsed vendor goes through the
+vendor canonicalizer (so merges stick) and the category follows the same
+rules as services/recategorize.py (a category the receipt's user edited for
+the vendor wins).
+
+    python -m services.reparse [--apply] [--user-email me@example.com] [--workers 8]
+                               [--fields amount tax subtotal] [--chunk-size 2000]
+"""
+import argparse
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from database.db import get_db, init_db
+from ocr.batch_parse import ParsePool
+from ocr.categories import get_category_cache
+from ocr.vendors import get_vendor_canonicalizer
+from services.recategorize import recategorized
+
+# Stored fields a re-parse may change
+FIELDS = ("vendor", "date", "amount", "tax", "subtotal", "category")
+_AMOUNTS = {"amount", "tax", "subtotal"}
+
+
+def diff_fields(stored: Dict[str, Any], parsed: Dict[str, Any], fields: Sequence[str] = FIELDS) -> Dict[str, Any]:
+    """Fields whose parsed value differs from the stored one (amounts to the cent)."""
+    changed = {}
+    for f in fields:
+        old, new = stored.get(f), parsed.get(f)
+        if f in _AMOUNTS:
+            if round(float(old or 0.0), 2) != round(float(new or 0.0), 2):
+                changed[f] = round(float(new or 0.0), 2)
+        elif new is not None and old != new:
+            changed[f] = new
+    return changed
+
+
+def reparse(user_email: Optional[str] = None, fields: Sequence[str] = FIELDS, apply: bool = False,
+            workers: Optional[int] = None, chunk_size: int = 2000, progress: bool = True) -> Dict[str, Any]:
+    """
+    Re-parses every stored read (of `user_email`, if given) and diffs the
+    `fields`; only with `apply` are the changes written. Returns a report:
+    receipts scanned, changed and failed, per-field change counts, edited
+    fields kept, a few example changes and throughput.
+    """
+    canonicalizer = get_vendor_canonicalizer()
+    canonicalizer.reload()
+    cache = get_category_cache()
+    cache.reload()
+    db = get_db()
+    where, params = ("AND user_email = ?", [user_email]) if user_email else ("", [])
+    total = db.execute(f"SELECT COUNT(*) FROM receipts WHERE ocr_source IS NOT NULL {where}", params).fetchone()[0]
+    columns = ", ".join(FIELDS)
+
+    scanned, changed, failed = 0, 0, 0
+    field_counts: Counter = Counter()
+    kept: Counter = Counter()
+    examples: List[Tuple[str, Dict[str, Tuple[Any, Any]]]] = []
+    start = time.perf_counter()
+    last = 0
+    with ParsePool(workers) as pool:
+        while True:
+            rows = db.execute(
+                f"SELECT rowid, bill_id, user_email, ocr_source, edited_fields, {columns} FROM receipts "
+                f"WHERE rowid > ? AND ocr_source IS NOT NULL {where} ORDER BY rowid LIMIT ?",
+                [last, *params, chunk_size],
+            ).fetchall()
+            if not rows:
+                break
+            outcomes = pool.parse({"ocr_source": r["ocr_source"]} for r in rows)
+
+            updates: List[Tuple[Dict[str, Any], int]] = []
+            for r, (data, _items, error) in zip(rows, outcomes):
+                if error or data is None:
+                    failed += 1
+                    continue
+                stored = dict(r)
+                data["vendor"] = canonicalizer.canonicalize(data["vendor"])
+                data["category"] = recategorized(data["vendor"], data["category"], cache, r["user_email"])
+                change = diff_fields(stored, data, fields)
+                edited = set((r["edited_fields"] or "").split(",")) & change.keys()
+                kept.update(edited)
+                change = {f: v for f, v in change.items() if f not in edited}
+                if change:
+                    updates.append((change, r["rowid"]))
+                    field_counts.update(change.keys())
+                    if len(examples) < 10:
+                        examples.append((r["bill_id"], {f: (stored[f], v) for f, v in change.items()}))
+            if updates and apply:
+                with db:
+                    for change, rowid in updates:
+                        assignments = ", ".join(f"{f} = ?" for f in change)
+                        db.execute(f"UPDATE receipts SET {assignments} WHERE rowid = ?", [*change.values(), rowid])
+
+            changed += len(updates)
+            scanned += len(rows)
+            last = rows[-1]["rowid"]
+            if progress:
+                rate = scanned / (time.perf_counter() - start)
+                print(f"  {scanned}/{total} receipts · {changed} changed · {rate:.0f} receipts/s", flush=True)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "scanned": scanned,
+        "changed": changed,
+        "failed": failed,
+        "fields": dict(field_counts),
+        "kept_edits": dict(kept),
+        "examples": examples,
+        "elapsed_s": round(elapsed, 2),
+        "receipts_per_s": round(scanned / elapsed, 1) if elapsed else 0.0,
+        "applied": apply,
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    verb = "Changed" if report["applied"] else "Would change"
+    print("\n=== Re-parse report ===")
+    print(f"Scanned: {report['scanned']} in {report['elapsed_s']} s ({report['receipts_per_s']} receipts/s)")
+    print(f"{verb}: {report['changed']} · Parse failures: {report['failed']}")
+    if report["fields"]:
+        print("By field: " + ", ".join(f"{f} {n}" for f, n in sorted(report["fields"].items(), key=lambda kv: -kv[1])))
+    if report["kept_edits"]:
+        print("Kept user edits: " + ", ".join(f"{f} {n}" for f, n in sorted(report["kept_edits"].items(), key=lambda kv: -kv[1])))
+    for bill_id, change in report["examples"]:
+        print(f"  {bill_id}: " + ", ".join(f"{f} {old!r} → {new!r}" for f, (old, new) in change.items()))
+    if not report["applied"] and report["changed"]:
+        print("Nothing written; re-run with --apply to write these changes.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse stored receipts with the current parser.")
+    parser.add_argument("--user-email", help="only this user's receipts")
+    parser.add_argument("--fields", nargs="+", choices=FIELDS, default=list(FIELDS), help="fields to update")
+    parser.add_argument("--workers", type=int, help="parser processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="receipts per database transaction")
+    parser.add_argument("--apply", action="store_true", help="write the changes (default: only report them)")
+    args = parser.parse_args()
+
+    init_db()
+    _print_report(reparse(args.user_email, args.fields, args.apply, args.workers, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
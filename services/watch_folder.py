@@ -0,0 +1,358 @@
+"""
+Watch-folder ingestion daemon for scanner drop folders.
+
+New files are picked up via inotify (when the optional `inotify_simple`
+package is installed) or by polling, held back until their size and mtime
+stop changing, grouped into micro-batches and OCR'd by a bounded process
+pool. Results are bulk-saved, and each file is moved to `processed/` or
+`failed/` so a restart never re-reads it. The files of a batch whose
+worker died are retried one at a time in a fresh pool (a file that keeps
+killing workers goes to `failed/`), and a save that hits a locked database
+is retried later; files whose save kept failing are read again by the
+periodic full rescan. Queue depth and lag are written to
+`.watch_metrics.json` in the watched folder.
+
+    python -m services.watch_folder /srv/scans --workers 4 --user-email me@example.com
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from database.db import init_db
+from database.queries import save_receipts_bulk
+from services.batch_ingest import ingest_one, init_worker, is_receipt
+
+try:
+    from inotify_simple import INotify, flags  # type: ignore
+except ImportError:
+    INotify = None
+
+METRICS_FILE = ".watch_metrics.json"
+# Tries per file when its worker dies, and per batch save when the database fails
+MAX_ATTEMPTS = 3
+SAVE_RETRY_SECONDS = 5.0
+# Full rescan even when inotify reports nothing: picks up files left behind
+RESCAN_SECONDS = 60.0
+
+
+# ================= FILE WATCHERS =================
+class _PollingWatcher:
+    """Fallback: report nothing and let the daemon rescan the folder."""
+
+    def wait(self, timeout: float) -> Optional[Set[Path]]:
+        time.sleep(timeout)
+        return None
+
+
+class _InotifyWatcher:
+    """Wakes up as soon as a file is written or moved into the folder."""
+
+    def __init__(self, folder: Path):
+        self._folder = folder
+        self._inotify = INotify()
+        self._inotify.add_watch(str(folder), flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+
+    def wait(self, timeout: float) -> Optional[Set[Path]]:
+        events = self._inotify.read(timeout=int(timeout * 1000))
+        return {self._folder / e.name for e in events if e.name}
+
+
+def _process_batch(tasks: List[Tuple[str, str, None]]) -> List[Dict[str, Any]]:
+    return [ingest_one(t) for t in tasks]
+
+
+# ================= DAEMON =================
+class WatchFolderDaemon:
+    """
+    Debounced, micro-batched ingestion of one folder.
+
+    A file becomes ready once it has kept the same size and mtime for
+    `settle_seconds`. Ready files are submitted in batches of up to
+    `batch_size` (or sooner, once the oldest has waited `max_batch_wait`).
+    At most `workers * 2` batches are in flight; beyond that, files wait
+    in the folder, which is the back-pressure.
+    """
+
+    def __init__(self, folder: str, workers: int = 2, user_email: Optional[str] = None,
+                 batch_size: int = 8, max_batch_wait: float = 2.0, settle_seconds: float = 2.0,
+                 poll_interval: float = 1.0):
+        self.folder = Path(folder)
+        self.workers = workers
+        self.user_email = user_email
+        self.batch_size = batch_size
+        self.max_batch_wait = max_batch_wait
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+
+        self.processed_dir = self.folder / "processed"
+        self.failed_dir = self.folder / "failed"
+        self.max_in_flight = workers * 2
+
+        # path -> (size, mtime, unchanged since, first seen)
+        self._settling: Dict[Path, Tuple[int, float, float, float]] = {}
+        # (path, first seen) in arrival order
+        self._ready: Deque[Tuple[Path, float]] = deque()
+        self._queued: Set[Path] = set()
+        # Files of crashed batches, each retried alone with nothing else in flight
+        self._suspects: Deque[Tuple[Path, float]] = deque()
+        # future -> (batch, generation of the pool it was submitted to, ran alone)
+        self._in_flight: Dict[Future, Tuple[List[Tuple[Path, float]], int, bool]] = {}
+        # path -> times its worker died while it ran alone
+        self._attempts: Dict[Path, int] = {}
+        # (batch, outcomes, retry at, save attempts) for saves the database refused
+        self._unsaved: List[Tuple[List[Tuple[Path, float]], List[Dict[str, Any]], float, int]] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+
+        self._metrics: Dict[str, Any] = {"completed": 0, "saved": 0, "duplicate": 0, "conflict": 0, "failed": 0,
+                                         "retried": 0, "pool_restarts": 0, "lag_last_s": 0.0, "lag_max_s": 0.0}
+        self._started = time.time()
+        self._stopping = False
+
+    # ---------- discovery ----------
+    def _candidates(self, changed: Optional[Set[Path]]):
+        paths = changed if changed is not None else self.folder.iterdir()
+        for p in paths:
+            if p.name.startswith(".") or not is_receipt(p.name):
+                continue
+            if p in self._queued or p in self._settling:
+                continue
+            if p.parent == self.folder and p.is_file():
+                yield p
+
+    def _scan(self, changed: Optional[Set[Path]]):
+        now = time.time()
+        for p in self._candidates(changed):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                # Moved or deleted since it was listed
+                continue
+            self._settling[p] = (st.st_size, st.st_mtime, now, now)
+
+        # Debounce: a file is ready once it stopped growing for settle_seconds
+        for p, (size, mtime, since, first_seen) in list(self._settling.items()):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                del self._settling[p]
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                self._settling[p] = (st.st_size, st.st_mtime, now, first_seen)
+            elif st.st_size > 0 and now - since >= self.settle_seconds:
+                del self._settling[p]
+                self._ready.append((p, first_seen))
+                self._queued.add(p)
+
+    # ---------- dispatch ----------
+    def _start_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._metrics["pool_restarts"] += 1
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=mp.get_context("spawn"), initializer=init_worker)
+        self._generation += 1
+
+    def _submit(self):
+        if self._suspects:
+            # Alone in the pool, a crash can only be this file's fault
+            if not self._in_flight:
+                self._submit_batch([self._suspects.popleft()], alone=True)
+            return
+
+        now = time.time()
+        while self._ready and len(self._in_flight) < self.max_in_flight:
+            oldest_wait = now - self._ready[0][1]
+            if len(self._ready) < self.batch_size and oldest_wait < self.max_batch_wait and not self._stopping:
+                return
+            batch = [self._ready.popleft() for _ in range(min(self.batch_size, len(self._ready)))]
+            self._submit_batch(batch)
+
+    def _submit_batch(self, batch: List[Tuple[Path, float]], alone: bool = False):
+        tasks = [(p.name, str(p), None) for p, _ in batch]
+        try:
+            future = self._pool.submit(_process_batch, tasks)
+        except BrokenProcessPool:
+            # A worker died since the last submit
+            (self._suspects if alone else self._ready).extendleft(reversed(batch))
+            self._start_pool()
+            return
+        self._in_flight[future] = (batch, self._generation, alone)
+
+    def _collect(self):
+        broken = False
+        for future in [f for f in self._in_flight if f.done()]:
+            batch, generation, alone = self._in_flight.pop(future)
+            try:
+                outcomes = future.result()
+            except BrokenProcessPool:
+                # The worker process died (killed, out of memory, a crashing
+                # decoder): every batch in that pool is retried in a new one
+                broken = broken or generation == self._generation
+                self._retry(batch, alone)
+                continue
+            except Exception as e:
+                outcomes = [{"status": "error", "data": None, "error": str(e)} for _ in batch]
+            self._save(batch, outcomes)
+        if broken:
+            self._start_pool()
+
+        now = time.time()
+        unsaved, self._unsaved = self._unsaved, []
+        for batch, outcomes, retry_at, attempts in unsaved:
+            if now < retry_at:
+                self._unsaved.append((batch, outcomes, retry_at, attempts))
+            else:
+                self._save(batch, outcomes, attempts)
+
+    def _retry(self, batch: List[Tuple[Path, float]], alone: bool):
+        if not alone:
+            # Any file of the batch (or of another batch in the pool) may be
+            # the culprit: retry each alone before blaming one
+            self._metrics["retried"] += len(batch)
+            self._suspects.extend(batch)
+            return
+
+        path, first_seen = batch[0]
+        self._attempts[path] = self._attempts.get(path, 0) + 1
+        if self._attempts[path] >= MAX_ATTEMPTS:
+            self._finish(path, first_seen, "failed", self.failed_dir)
+        else:
+            self._metrics["retried"] += 1
+            self._suspects.appendleft((path, first_seen))
+
+    def _save(self, batch: List[Tuple[Path, float]], outcomes: List[Dict[str, Any]], attempts: int = 0):
+        parsed = [o for o in outcomes if o["status"] == "parsed"]
+        try:
+            statuses = iter(save_receipts_bulk([o["data"] for o in parsed], self.user_email) if parsed else [])
+        except sqlite3.Error as e:
+            if attempts + 1 < MAX_ATTEMPTS:
+                print(f"Saving {len(parsed)} receipts failed ({e}); retrying in {SAVE_RETRY_SECONDS:.0f} s")
+                self._unsaved.append((batch, outcomes, time.time() + SAVE_RETRY_SECONDS, attempts + 1))
+            else:
+                # Left in the folder: the next full rescan (or restart) reads them again
+                print(f"Saving {len(parsed)} receipts failed ({e}); leaving their files in place")
+                for path, _ in batch:
+                    self._queued.discard(path)
+                    self._attempts.pop(path, None)
+            return
+
+        for (path, first_seen), o in zip(batch, outcomes):
+            if o["status"] == "parsed":
+                status = next(statuses)
+                # A bill ID held by another user's receipt was not stored
+                target = self.failed_dir if status == "conflict" else self.processed_dir
+            else:
+                status = "failed"
+                target = self.failed_dir
+            self._finish(path, first_seen, status, target)
+
+    def _finish(self, path: Path, first_seen: float, status: str, target: Path):
+        self._move(path, target)
+        self._queued.discard(path)
+        self._attempts.pop(path, None)
+
+        lag = time.time() - first_seen
+        self._metrics[status] += 1
+        self._metrics["completed"] += 1
+        self._metrics["lag_last_s"] = round(lag, 2)
+        self._metrics["lag_max_s"] = round(max(self._metrics["lag_max_s"], lag), 2)
+
+    def _move(self, path: Path, target: Path):
+        target.mkdir(exist_ok=True)
+        dest = target / path.name
+        if dest.exists():
+            dest = target / f"{path.stem}-{int(time.time() * 1000)}{path.suffix}"
+        try:
+            shutil.move(str(path), str(dest))
+        except FileNotFoundError:
+            pass
+
+    # ---------- metrics ----------
+    def metrics(self) -> Dict[str, Any]:
+        now = time.time()
+        queued = list(self._ready) + list(self._suspects)
+        waiting = [first for _, first in queued] + [v[3] for v in self._settling.values()]
+        in_flight_files = sum(len(b) for b, _, _ in self._in_flight.values())
+        elapsed_min = max((now - self._started) / 60, 1e-9)
+        return {
+            **self._metrics,
+            "settling": len(self._settling),
+            "ready": len(queued),
+            "in_flight": in_flight_files,
+            "queue_depth": len(self._settling) + len(queued) + in_flight_files,
+            "oldest_waiting_s": round(now - min(waiting), 2) if waiting else 0.0,
+            "throughput_per_min": round(self._metrics["completed"] / elapsed_min, 2),
+            "updated_at": now,
+        }
+
+    def _publish_metrics(self):
+        path = self.folder / METRICS_FILE
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.metrics(), indent=2))
+        os.replace(tmp, path)
+
+    # ---------- main loop ----------
+    def run(self, stop_event=None):
+        init_db()
+        watcher = _InotifyWatcher(self.folder) if INotify is not None else _PollingWatcher()
+        print(f"Watching {self.folder} ({'inotify' if INotify is not None else 'polling'}), "
+              f"{self.workers} worker(s)")
+
+        self._start_pool()
+        changed: Optional[Set[Path]] = None  # full scan on startup
+        last_metrics = last_rescan = 0.0
+        try:
+            while stop_event is None or not stop_event.is_set():
+                if time.time() - last_rescan >= RESCAN_SECONDS:
+                    changed = None
+                if changed is None:
+                    last_rescan = time.time()
+                self._scan(changed)
+                self._submit()
+                self._collect()
+                if time.time() - last_metrics >= 5:
+                    self._publish_metrics()
+                    last_metrics = time.time()
+                # Keep polling while files settle, batches run or saves wait; otherwise wait for events
+                busy = self._settling or self._ready or self._suspects or self._in_flight or self._unsaved
+                changed = watcher.wait(min(self.poll_interval, 0.25) if busy else self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+
+        # Drain: flush partial batches, wait for in-flight work and pending saves
+        self._stopping = True
+        try:
+            while self._ready or self._suspects or self._in_flight or self._unsaved:
+                self._submit()
+                self._collect()
+                time.sleep(0.1)
+        finally:
+            self._pool.shutdown(wait=True)
+            self._publish_metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder and ingest receipts dropped into it.")
+    parser.add_argument("folder")
+    parser.add_argument("--workers", type=int, default=2, help="OCR processes")
+    parser.add_argument("--user-email", help="owner of the ingested receipts")
+    parser.add_argument("--batch-size", type=int, default=8, help="files per micro-batch")
+    parser.add_argument("--max-batch-wait", type=float, default=2.0, help="seconds before a partial batch is sent")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged")
+    args = parser.parse_args()
+
+    WatchFolderDaemon(args.folder, args.workers, args.user_email, args.batch_size,
+                      args.max_batch_wait, args.settle).run()
+
+
+if __name__ == "__main__":
+    main()
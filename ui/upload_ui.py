@@ -291,7 +291,8 @@ def _to_image(uploaded_file, lang: str):
         except Exception as e:
             return None, f"PDF Processing Error: {e}"
     else:
-        return Image.open(uploaded_file), None
+        from ocr.intake import open_receipt_image, normalize_resolution  # type: ignore
+        return normalize_resolution(open_receipt_image(uploaded_file)), None
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -300,81 +301,64 @@ def _to_image(uploaded_file, lang: str):
 def _extract(img, lang: str, api_key):
     """Return (data dict | None, items list, error_message | None).
 
-    Priority:  1. Gemini AI  →  2. Tesseract OCR fallback
+    Priority:  0. quality gate  →  1. OCR (Tesseract → PaddleOCR)  →
+               2. Gemini AI, only when OCR left a key field to a guess
     """
-    data, items = None, []
+    # 0 + 1 — Quality gate on the cropped receipt, then the non-AI engines
+    # (Tesseract + PaddleOCR)
+    from ocr.pipeline import (  # type: ignore
+        NO_TEXT_ERROR, extract_receipt_ocr, low_confidence_fields, needs_escalation,
+    )
+
+    data, items, err, report = extract_receipt_ocr(img)
+    st.session_state["LAST_OCR_REPORT"] = report
+
+    # Neither Gemini nor OCR gets hopeless photos
+    if report.quality is not None and not report.quality.usable:
+        return (
+            None, [],
+            (
+                f"❌ <strong>{report.quality.message}.</strong><br><br>"
+                "Retake the photo in good light, hold the camera steady and let the receipt "
+                "fill the frame."
+            ),
+        )
+    if report.passes:
+        st.caption(
+            f"🔍 OCR: {report.pass_count} pass{'es' if report.pass_count != 1 else ''} · "
+            f"{report.total_ms:.0f} ms · {report.confidence:.0%} confidence"
+        )
 
-    # 1 — Gemini AI
-    if api_key:
+    # 2 — Gemini AI, only for receipts OCR could not read with confidence
+    if api_key and needs_escalation(data, report):
+        if data is not None:
+            st.caption(f"🤖 Asking Gemini: {', '.join(low_confidence_fields(report))}")
         try:
             from ai.gemini_client import GeminiClient  # type: ignore
             client = GeminiClient(api_key)
             result = client.extract_receipt(img)
             if result:
                 items = result.pop("items", [])
-                data  = result
+                data, err = result, None
                 st.success(get_text(lang, "ai_success"))
         except Exception as e:
-            st.warning(f"⚠️ AI extraction failed: {e}. Falling back to Tesseract OCR…")
-
-    # 2 — Non-AI Engine Fallbacks (Tesseract + PaddleOCR)
-    if not data:
-        from ocr.image_preprocessing import preprocess_image  # type: ignore
-        from ocr.paddle_engine import extract_text_paddle # type: ignore
-        
-        # Fallback modes in priority order
-        modes = ["simple", "advanced", "original"]
-        best_text = ""
-        
-        # Attempt 1: Tesseract with multiple preprocessing and PSM modes
-        for mode in modes:
-            try:
-                if mode == "original":
-                    preprocessed = img.convert("L")
-                else:
-                    preprocessed = preprocess_image(img, mode=mode)
-                
-                # Try PSM 3 (Standard) first
-                text = pytesseract.image_to_string(preprocessed, config="--psm 3")
-                
-                # If sparse text found, try PSM 6 (Uniform Block) or PSM 11 (Sparse)
-                if len(text.strip()) < 50:
-                    text_v2 = pytesseract.image_to_string(preprocessed, config="--psm 6")
-                    if len(text_v2.strip()) > len(text.strip()):
-                        text = text_v2
-                
-                if len(text.strip()) > 50: # Better heuristic for meaningful text
-                    best_text = text
-                    break
-                if len(text.strip()) > len(best_text.strip()):
-                    best_text = text
-            except Exception:
-                continue
-
-        # Attempt 2: PaddleOCR (The "Heavy Hitter")
-        if len(best_text.strip()) < 20: 
-            try:
-                paddle_text = extract_text_paddle(img)
-                if len(paddle_text.strip()) > len(best_text.strip()):
-                    best_text = paddle_text
-            except Exception as e:
-                print(f"PaddleOCR fallback failed: {e}")
-
-        if not best_text.strip():
-            return (
-                None, [],
-                (
-                    "❌ <strong>No readable text detected.</strong><br><br>"
-                    "Tesseract and PaddleOCR failed to find text. This usually happens if the image "
-                    "is extremely blurry, dark, or contains no writing.<br><br>"
-                    "Alternatively, enter a <strong>Gemini API key</strong> in the sidebar for AI extraction."
-                ),
-            )
-
-        try:
-            data, items = parse_receipt(best_text)
-        except Exception as e:
-            return None, [], f"❌ Receipt parsing error: {e}"
+            st.warning(f"⚠️ AI extraction failed: {e}. Keeping the OCR result…")
+    elif api_key:
+        st.caption(f"🤖 Gemini not needed: OCR read every key field "
+                   f"({report.parse_confidence:.0%} confidence)")
+
+    if err == NO_TEXT_ERROR:
+        return (
+            None, [],
+            (
+                "❌ <strong>No readable text detected.</strong><br><br>"
+                "Tesseract and PaddleOCR failed to find text. This usually happens if the image "
+                "is extremely blurry, dark, or contains no writing.<br><br>"
+                "Alternatively, enter a <strong>Gemini API key</strong> in the sidebar for AI extraction."
+            ),
+        )
+    if err:
+        return None, [], f"❌ {err}"
 
     return data, items, None
 
@@ -458,7 +442,7 @@ def _render_single(lang: str):
     </div>
     <div style="color:#94a3b8;font-size:0.85rem;">
         Supports <strong style="color:#a78bfa;">PNG · JPG · JPEG · PDF</strong>
-        &nbsp;·&nbsp; AI extraction with Gemini &nbsp;·&nbsp; OCR fallback
+        &nbsp;·&nbsp; OCR &nbsp;·&nbsp; Gemini AI for receipts OCR is unsure of
     </div>
 </div>
 """, unsafe_allow_html=True)
@@ -513,7 +497,7 @@ def _render_single(lang: str):
         _show_error(tesseract_err)
         st.info("💡 **Tip:** Enter a **Gemini API Key** in the top-right menu to use AI extraction instead.")
     else:
-        method_label = "🤖 AI (Gemini)" if api_key else "🔍 OCR (Tesseract)"
+        method_label = "🔍 OCR + 🤖 Gemini when unsure" if api_key else "🔍 OCR (Tesseract)"
         method_color = "#a78bfa"        if api_key else "#38bdf8"
         st.markdown(f"""
 <div style="display:flex;align-items:center;gap:0.6rem;margin-bottom:1rem;">
@@ -628,7 +612,124 @@ def _render_single(lang: str):
 # ─────────────────────────────────────────────────────────────────────────────
 # Batch / multi-file mode
 # ─────────────────────────────────────────────────────────────────────────────
+def _batch_counters_html(saved_count: int, dup_count: int, fail_count: int) -> str:
+    return f"""
+<div style="display:flex;gap:1rem;margin:0.6rem 0;">
+    <div style="background:rgba(16,185,129,0.10);border:1px solid rgba(16,185,129,0.3);
+                border-radius:10px;padding:0.6rem 1.2rem;text-align:center;flex:1;">
+        <div style="font-size:1.3rem;font-weight:900;color:#10b981;">{saved_count}</div>
+        <div style="font-size:0.7rem;color:#94a3b8;font-weight:600;text-transform:uppercase;">Saved</div>
+    </div>
+    <div style="background:rgba(245,158,11,0.08);border:1px solid rgba(245,158,11,0.28);
+                border-radius:10px;padding:0.6rem 1.2rem;text-align:center;flex:1;">
+        <div style="font-size:1.3rem;font-weight:900;color:#f59e0b;">{dup_count}</div>
+        <div style="font-size:0.7rem;color:#94a3b8;font-weight:600;text-transform:uppercase;">Duplicates</div>
+    </div>
+    <div style="background:rgba(239,68,68,0.07);border:1px solid rgba(239,68,68,0.28);
+                border-radius:10px;padding:0.6rem 1.2rem;text-align:center;flex:1;">
+        <div style="font-size:1.3rem;font-weight:900;color:#ef4444;">{fail_count}</div>
+        <div style="font-size:0.7rem;color:#94a3b8;font-weight:600;text-transform:uppercase;">Failed</div>
+    </div>
+</div>
+"""
+
+
+@st.cache_resource
+def _background_workers():
+    """Starts the OCR worker pool once per server process."""
+    from config.config import OCR_WORKERS  # type: ignore
+    from services.ocr_worker import start_worker_pool  # type: ignore
+    return start_worker_pool(OCR_WORKERS)
+
+
+def _stream_batch(uploaded_files, api_key):
+    """
+    Runs the upload through the bounded-memory decode → preprocess →
+    extract → save pipeline (services/batch_stream.py), yielding finished
+    BatchItems. OCR_WORKERS files are extracted at once so their PaddleOCR
+    fallbacks share detector/recognizer batches; receipts OCR is unsure of
+    go to Gemini one at a time, for the API quota.
+    """
+    from functools import partial
+    from streamlit.runtime.scriptrunner import add_script_run_ctx  # type: ignore
+    from config.config import OCR_WORKERS  # type: ignore
+    from services.batch_stream import make_extract_stage, make_save_stage, stream_batch  # type: ignore
+
+    user_email = st.session_state.get("user_email")
+    return stream_batch(
+        ((f.name, f) for f in uploaded_files),
+        extract=make_extract_stage(api_key),
+        save=make_save_stage(user_email, partial(validate_receipt, skip_duplicate=True)),
+        workers=OCR_WORKERS,
+        prepare_thread=add_script_run_ctx,
+    )
+
+
+def _enqueue_batch(uploaded_files) -> str:
+    """Queues every uploaded file for the background workers; returns the batch id."""
+    from database.jobs import enqueue_job, new_batch_id  # type: ignore
+    batch_id = new_batch_id()
+    user_email = st.session_state.get("user_email")
+    for uploaded in uploaded_files:
+        enqueue_job(batch_id, uploaded.name, uploaded.getvalue(), user_email)
+    return batch_id
+
+
+def _render_batch_progress(lang: str, batch_id: str):
+    """Polls a queued batch; survives browser refreshes via the ?batch= query param."""
+    import time
+    from database.jobs import get_batch_progress, list_batch_jobs  # type: ignore
+
+    progress = get_batch_progress(batch_id)
+    if not progress["total"]:
+        del st.query_params["batch"]
+        return
+
+    _background_workers()
+
+    total, finished = progress["total"], progress["finished"]
+    st.progress(finished / total, text=f"Background batch {batch_id}: {finished}/{total} processed")
+    st.markdown(_batch_counters_html(progress["done"], progress["duplicate"],
+                                     progress["failed"] + progress["conflict"]),
+                unsafe_allow_html=True)
+
+    summary_rows = []
+    for job in list_batch_jobs(batch_id):
+        data = (job["result"] or {}).get("data") or {}
+        status = {
+            "queued": "⏳ Queued", "running": "⚙️ Processing", "done": "✅ Saved",
+            "duplicate": "⚠️ Duplicate", "conflict": "⛔ Bill ID conflict", "failed": "❌ Failed",
+        }.get(job["status"], job["status"])
+        summary_rows.append({
+            "File": job["filename"],
+            "Status": status,
+            "Bill ID": data.get("bill_id", "—"),
+            "Vendor": data.get("vendor", "—"),
+            "Amount": f"₹{data['amount']:.2f}" if "amount" in data else "—",
+            "Note": str(job["error"] or "")[:60],
+        })
+    st.dataframe(pd.DataFrame(summary_rows), use_container_width=True, hide_index=True)
+
+    if not progress["complete"]:
+        time.sleep(1.5)
+        st.rerun()
+
+    if progress["done"] and not progress["failed"] and not progress["duplicate"] and not progress["conflict"]:
+        st.success(get_text(lang, "batch_done"))
+    else:
+        st.info(get_text(lang, "batch_done"))
+    if st.button("Start a new batch", key="clear_background_batch"):
+        del st.query_params["batch"]
+        st.rerun()
+
+
 def _render_multi(lang: str):
+    # A queued batch in the URL takes over the page until it finishes
+    batch_id = st.query_params.get("batch")
+    if batch_id:
+        _render_batch_progress(lang, batch_id)
+        return
+
     st.markdown("""
 <div class="upload-hint-card">
     <div style="font-size:3rem;margin-bottom:0.7rem;">📦</div>
@@ -667,13 +768,25 @@ def _render_multi(lang: str):
 </div>
 """, unsafe_allow_html=True)
 
+    api_key    = st.session_state.get("GEMINI_API_KEY")
+    background = st.toggle(
+        "🛰️ Process in background",
+        value=not api_key,
+        help="Queue the batch for OCR worker processes (Tesseract / PaddleOCR). "
+             "Progress survives a browser refresh. Gemini AI is only used in the foreground.",
+    )
+
     if not st.button(f"⚡ Process Batch ({total} files)",
                      type="primary", use_container_width=True):
         return
 
+    if background:
+        st.query_params["batch"] = _enqueue_batch(uploaded_files)
+        st.rerun()
+
     # ── Batch processing ──────────────────────────────────────────────────
-    api_key    = st.session_state.get("GEMINI_API_KEY")
     saved_count = dup_count = fail_count = 0
+    escalated_count = ocr_count = 0
     summary_rows: list = []
 
     # Live counter display
@@ -681,66 +794,46 @@ def _render_multi(lang: str):
     progress_bar = st.progress(0.0, text="Starting batch…")
 
     def _update_counters():
-        counter_ph.markdown(f"""
-<div style="display:flex;gap:1rem;margin:0.6rem 0;">
-    <div style="background:rgba(16,185,129,0.10);border:1px solid rgba(16,185,129,0.3);
-                border-radius:10px;padding:0.6rem 1.2rem;text-align:center;flex:1;">
-        <div style="font-size:1.3rem;font-weight:900;color:#10b981;">{saved_count}</div>
-        <div style="font-size:0.7rem;color:#94a3b8;font-weight:600;text-transform:uppercase;">Saved</div>
-    </div>
-    <div style="background:rgba(245,158,11,0.08);border:1px solid rgba(245,158,11,0.28);
-                border-radius:10px;padding:0.6rem 1.2rem;text-align:center;flex:1;">
-        <div style="font-size:1.3rem;font-weight:900;color:#f59e0b;">{dup_count}</div>
-        <div style="font-size:0.7rem;color:#94a3b8;font-weight:600;text-transform:uppercase;">Duplicates</div>
-    </div>
-    <div style="background:rgba(239,68,68,0.07);border:1px solid rgba(239,68,68,0.28);
-                border-radius:10px;padding:0.6rem 1.2rem;text-align:center;flex:1;">
-        <div style="font-size:1.3rem;font-weight:900;color:#ef4444;">{fail_count}</div>
-        <div style="font-size:0.7rem;color:#94a3b8;font-weight:600;text-transform:uppercase;">Failed</div>
-    </div>
-</div>
-""", unsafe_allow_html=True)
+        counter_ph.markdown(_batch_counters_html(saved_count, dup_count, fail_count),
+                            unsafe_allow_html=True)
 
     _update_counters()
 
-    for i, uploaded in enumerate(uploaded_files, start=1):
-        fname = uploaded.name
-        pct   = i / total
-        progress_bar.progress(pct, text=f"Processing {i}/{total}: {fname}")
+    from services.batch_stream import THUMBNAIL_SIDE  # type: ignore
+    for i, item in enumerate(_stream_batch(uploaded_files, api_key), start=1):
+        fname = item.name
+        progress_bar.progress(i / total, text=f"Processed {i}/{total}: {fname}")
+        if item.engine:
+            ocr_count += 1
+            escalated_count += item.escalated
 
         with st.expander(f"📄 {fname}", expanded=False):
-            img, err = _to_image(uploaded, lang)
-            if err:
-                _show_error(err)
+            # Mini preview (a small thumbnail; the decoded image is already released)
+            if item.thumbnail:
+                st.image(item.thumbnail, width=THUMBNAIL_SIDE)
+
+            if item.status == "failed":
+                _show_error(f"❌ {item.error or get_text(lang, 'no_text_error')}")
                 fail_count += 1
-                summary_rows.append({"File": fname, "Status": "❌ Error",
+                summary_rows.append({"File": fname, "Status": "❌ Failed",
                                       "Bill ID": "—", "Vendor": "—", "Amount": "—",
-                                      "Note": str(err)[:60]})
+                                      "Note": str(item.error or "No text detected")[:60]})
                 _update_counters()
                 continue
 
-            # Mini preview
-            c1, c2 = st.columns(2)
-            with c1:
-                st.markdown('<div class="img-label">🖼️ Original</div>', unsafe_allow_html=True)
-                st.image(img, use_container_width=True)
-            with c2:
-                st.markdown('<div class="img-label">⚙️ Greyscale</div>', unsafe_allow_html=True)
-                st.image(img.convert("L"), use_container_width=True)
-
-            with st.spinner(get_text(lang, "extracting_data")):
-                data, items, err = _extract(img, lang, api_key)
-
-            if err or data is None:
-                _show_error(err or get_text(lang, "no_text_error"))
+            data = item.data
+            if item.status == "conflict":
+                _show_error(f"⛔ {item.error}")
                 fail_count += 1
-                summary_rows.append({"File": fname, "Status": "❌ Failed",
-                                      "Bill ID": "—", "Vendor": "—", "Amount": "—",
-                                      "Note": str(err or "No text detected")[:60]})
+                summary_rows.append({"File": fname, "Status": "⛔ Bill ID conflict",
+                                      "Bill ID": data["bill_id"],
+                                      "Vendor": data["vendor"],
+                                      "Amount": f"₹{data['amount']:.2f}",
+                                      "Note": "Bill ID belongs to another account"})
                 _update_counters()
                 continue
 
-            if receipt_exists(data["bill_id"]):
+            if item.status == "duplicate":
                 st.markdown('<div class="batch-card-dup">⚠️ Duplicate — already in database</div>',
                             unsafe_allow_html=True)
                 dup_count += 1
@@ -752,8 +845,7 @@ def _render_multi(lang: str):
                 _update_counters()
                 continue
 
-            validation = validate_receipt(data)
-            save_receipt(data)
+            validation = item.validation
             st.session_state["LAST_EXTRACTED_RECEIPT"] = data
             st.session_state["LAST_VALIDATION_REPORT"] = validation
             saved_count += 1
@@ -765,6 +857,8 @@ def _render_multi(lang: str):
                 f' — <strong>{data.get("vendor","?")}</strong> · ₹{data.get("amount",0):.2f}</div>',
                 unsafe_allow_html=True
             )
+            st.caption(f"{'🤖 Gemini AI' if item.engine == 'gemini' else '🔍 OCR'} · "
+                       f"{sum(item.timings.values()):.0f} ms · {item.confidence:.0%} OCR parse confidence")
             _receipt_summary_card(lang, data)
             summary_rows.append({"File": fname, "Status": "✅ Saved",
                                   "Bill ID": data["bill_id"],
@@ -783,6 +877,9 @@ def _render_multi(lang: str):
 ">{get_text(lang,'batch_summary_header')}</div>
 """, unsafe_allow_html=True)
     _update_counters()
+    if api_key and ocr_count:
+        st.caption(f"🤖 Gemini was needed for {escalated_count} of {ocr_count} receipts; "
+                   f"OCR read the other {ocr_count - escalated_count} with confidence")
 
     if summary_rows:
         st.dataframe(
@@ -1,5 +1,7 @@
 import re
+import time
 from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
 
 
 # -------------------------------------------------
@@ -43,26 +45,13 @@ def clean_amount(text: str):
 def clean_date(text: str):
     """
     Try to parse a date from OCR text.
-    Supports common receipt formats.
+    Supports common receipt formats (see ocr/dates.py).
     """
-    if not text:
-        return None
-
-    formats = [
-        "%d/%m/%Y",
-        "%d-%m-%Y",
-        "%Y-%m-%d",
-        "%d %b %Y",
-        "%d %B %Y"
-    ]
+    # Imported here: ocr.dates builds its month pattern with trie_pattern below
+    from ocr.dates import find_date
 
-    for fmt in formats:
-        try:
-            return datetime.strptime(text.strip(), fmt).date()
-        except ValueError:
-            continue
-
-    return None
+    iso = find_date(text)
+    return datetime.fromisoformat(iso).date() if iso else None
 
 
 # -------------------------------------------------
@@ -83,4 +72,46 @@ def normalize_items(items):
     if isinstance(items, list):
         return [i for i in items if isinstance(i, dict)]
 
-    return []
\ No newline at end of file
+    return []
+
+
+# -------------------------------------------------
+# KEYWORD MATCHING
+# -------------------------------------------------
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex source matching any of `words`, shaped as a trie ("mel(?:aka|ka)")
+    so the regex engine never tries more than one word per position. Where
+    a shorter word ends inside a longer one, the longer one is preferred.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # a word ends here
+
+    def _emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + _emit(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return _emit(trie)
+
+
+# -------------------------------------------------
+# STAGE TIMING
+# -------------------------------------------------
+
+def lap(timings: Optional[Dict[str, float]], key: Optional[str], start: Optional[float] = None) -> float:
+    """
+    Adds the milliseconds elapsed since `start` to timings[key] and returns
+    a new start mark. A None `timings` dict makes this a plain clock read.
+    """
+    now = time.perf_counter()
+    if timings is not None and key and start is not None:
+        timings[key] = timings.get(key, 0.0) + (now - start) * 1000
+    return now